@@ -1,2 +1,19 @@
 from .pytic2 import *
-from .pyi2c import *
\ No newline at end of file
+from .pyi2c import *
+from .i2cdev import *
+from .busworker import *
+from .asynctic import *
+from .scheduler import *
+from .telemetry import *
+from .emulator import *
+from .trajectory import *
+from .group import *
+from .metrics import *
+from .retry import *
+from .discovery import *
+from .cluster import *
+from .recorder import *
+from .units import *
+from .stateserver import *
+from .setpoint import *
+from .heartbeat import *
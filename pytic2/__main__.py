@@ -0,0 +1,24 @@
+'''Command line tools of pytic2: ``python -m pytic2 <command> --help``.'''
+import sys
+
+_COMMANDS = {
+    'monitor': 'stream variables of Tics as JSON Lines or CSV',
+    'benchmark': 'throughput and latency benchmarks against a fake bus',
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in _COMMANDS:
+        print('usage: python -m pytic2 <command> [options]\n\ncommands:', file=sys.stderr)
+        for command, description in _COMMANDS.items():
+            print('  {:<12} {}'.format(command, description), file=sys.stderr)
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    command, argv = argv[0], argv[1:]
+    if command == 'monitor':
+        from .monitor import main as monitor
+        return monitor(argv)
+    from .benchmark import main as benchmark
+    return benchmark(argv)
+
+if __name__ == '__main__':
+    sys.exit(main())
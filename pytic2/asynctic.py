@@ -0,0 +1,58 @@
+import asyncio
+import functools
+
+from .busworker import busWorker
+from .pytic2 import pytic2, _MotionWait
+
+class AsyncTic():
+    '''asyncio front end for pytic2.
+
+    Every command and getter of pytic2 is available as a coroutine with the
+    same name and arguments. The calls are executed by the shared worker
+    thread of the bus, which serializes the transactions of all devices on
+    that bus and serves the devices in turn.
+    '''
+
+    def __init__(self, bus, address, tic=None):
+        '''
+        :param bus: SMBus object
+        :param address: Device number of the Tic
+        :param tic: Optional existing pytic2 object to wrap
+        '''
+        self.tic = tic if tic is not None else pytic2(bus, address)
+        self.address = address
+        self._worker = busWorker(bus)
+
+    async def _call(self, fn, *args, **kwargs):
+        future = self._worker.submit(self.address, fn, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+
+    async def waitUntilReached(self, target=None, timeout=None, pollInterval=0.005):
+        '''Waits until the motor has stopped at the target position without
+        blocking the event loop or the bus worker; see pytic2.waitUntilReached.'''
+
+        wait = _MotionWait(self.address, target, timeout, pollInterval)
+        delay = wait.next(await self._call(self.tic._getMotionState))
+        while delay is not None:
+            await asyncio.sleep(delay)
+            delay = wait.next(await self._call(self.tic._getMotionState))
+        return wait.polls
+
+    async def waitUntilStopped(self, timeout=None, pollInterval=0.005):
+        '''Waits until the motor has stopped; see pytic2.waitUntilStopped.'''
+
+        return await self.waitUntilReached(None, timeout, pollInterval)
+
+def _asyncMethod(name):
+    method = getattr(pytic2, name)
+
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        return await self._call(getattr(self.tic, name), *args, **kwargs)
+
+    return call
+
+for _name in dir(pytic2):
+    if not _name.startswith('_') and callable(getattr(pytic2, _name)) and _name not in AsyncTic.__dict__:
+        setattr(AsyncTic, _name, _asyncMethod(_name))
+del _name
@@ -0,0 +1,203 @@
+'''Throughput and latency benchmarks of pytic2 against an in-process FakeSMBus.
+
+Run with ``python -m pytic2.benchmark``. For every benchmark it reports the
+calls per second, the p50/p99 latency, the memory blocks a call leaves
+allocated and the peak memory allocated during one call, so regressions in
+the hot paths show up without hardware.
+'''
+import argparse
+import inspect
+import json
+import time
+import tracemalloc
+
+from .emulator import FakeSMBus, TicEmulator
+from .i2cdev import I2CDev, I2CDevInterface
+from .pyi2c import pyi2c, BusBatch
+from .pytic2 import *
+
+# Arguments used for the pytic2 methods that take arguments
+_ARGUMENTS = {
+    'goHome': (0,),
+    'getVariable': (TIC_CURRENTPOSITION_VAR, 4),
+    'getErrorsOccurred': (TIC_ERRORSOCCURRED_VAR, 4),
+    'getVariableBlock': (TIC_CURRENTPOSITION_VAR, 16),
+    'getSetting': (TIC_MAXSPEED_SETTING, 4),
+    'getSettingBlock': (TIC_MAXSPEED_SETTING, 16),
+    'verifySettings': ({'stepMode': 0},),
+}
+
+# Methods that do not return within a bounded number of transactions
+_SKIP = {'waitUntilReached', 'waitUntilStopped'}
+
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+def measure(fn, iterations=1000, warmup=50):
+    '''Measures a callable.
+
+    :param fn: Callable without arguments
+    :param iterations: Number of timed calls
+    :param warmup: Number of untimed calls before the measurement
+    :return: Dictionary with calls per second, p50/p99 latency in seconds,
+             the memory blocks per call still allocated after the calls and
+             the peak bytes allocated during one call, which also covers
+             memory that is freed again before the call returns
+    '''
+    for _ in range(warmup):
+        fn()
+    timer = time.perf_counter
+    latencies = []
+    start = timer()
+    for _ in range(iterations):
+        before = timer()
+        fn()
+        latencies.append(timer() - before)
+    total = timer() - start
+    latencies.sort()
+
+    # tracemalloc.reset_peak() needs Python 3.9; before, tracing is restarted for every call
+    resetPeak = getattr(tracemalloc, 'reset_peak', None)
+    calls = min(iterations, 100)
+    peak = 0
+    if resetPeak is not None:
+        tracemalloc.start()
+    try:
+        for _ in range(calls):
+            if resetPeak is not None:
+                resetPeak()
+            else:
+                tracemalloc.start()
+            current = tracemalloc.get_traced_memory()[0]
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            if resetPeak is None:
+                tracemalloc.stop()
+    finally:
+        tracemalloc.stop()
+
+    return {'rate': iterations / total,
+            'p50': _percentile(latencies, 0.50),
+            'p99': _percentile(latencies, 0.99),
+            'blocks': _allocatedBlocks(fn, calls),
+            'peakBytes': peak}
+
+def _allocatedBlocks(fn, calls):
+    '''Memory blocks allocated per call that are still alive after it, from
+    tracemalloc snapshots around a series of calls.'''
+
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        for _ in range(calls):
+            fn()
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+    finally:
+        tracemalloc.stop()
+    return sum(max(0, stat.count_diff) for stat in after.compare_to(before, 'lineno')) / calls
+
+def _makeBus(devices, latency):
+    bus = FakeSMBus(latency=latency)
+    for address in range(14, 14 + devices):
+        emulator = bus.add(TicEmulator(address, commandTimeout=0))
+        emulator.errorStatus = 0
+    return bus
+
+def pyi2cBenchmarks(bus, address=14, interface=pyi2c):
+    prefix = interface.__name__
+    interface = interface(bus)
+    benchmarks = {
+        'pyi2c.writeQuick': lambda: interface.writeQuick(address, TIC_RESETCOMMANDTIMEOUT_CMD),
+        'pyi2c.write7Bit': lambda: interface.write7Bit(address, TIC_SETSTEPMODE_CMD, 3),
+        'pyi2c.write32Bit': lambda: interface.write32Bit(address, TIC_SETTARGETVELOCITY_CMD, -100000),
+        'pyi2c.readBlock': lambda: interface.readBlock(address, [TIC_GETVARIABLE_CMD, TIC_CURRENTPOSITION_VAR], 4),
+        'pyi2c.readBlocks': lambda: interface.readBlocks(address, [([TIC_GETVARIABLE_CMD, 0], 15), ([TIC_GETVARIABLE_CMD, 15], 15)]),
+    }
+    return {prefix + name[len('pyi2c'):]: fn for name, fn in benchmarks.items()}
+
+def pytic2Benchmarks(bus, address=14):
+    tic = pytic2(bus, address)
+    benchmarks = {}
+    for name, method in inspect.getmembers(tic, inspect.ismethod):
+        if name.startswith('_') or name in _SKIP:
+            continue
+        if name in _ARGUMENTS:
+            args = _ARGUMENTS[name]
+        elif len(inspect.signature(method).parameters) == 0:
+            args = ()
+        else:
+            args = (1,)
+        benchmarks['pytic2.' + name] = (lambda method, args: lambda: method(*args))(method, args)
+    return benchmarks
+
+def pollBenchmarks(bus, devices):
+    '''Full status polls of all devices on the bus with different strategies.'''
+
+    tics = [pytic2(bus, address) for address in sorted(bus.devices)][:devices]
+    getters = [name for name, _ in inspect.getmembers(pytic2, inspect.isfunction)
+               if name.startswith('get') and name not in _ARGUMENTS and name != 'getSnapshot'
+               and len(inspect.signature(getattr(pytic2, name)).parameters) == 1]
+
+    def pollGetters():
+        for tic in tics:
+            for name in getters:
+                getattr(tic, name)()
+
+    def pollSnapshots():
+        for tic in tics:
+            tic.getSnapshot()
+
+    def pollBatch():
+        with BusBatch(bus) as batch:
+            for tic in tics:
+                batch.device(tic).getSnapshot()
+
+    return {
+        'poll.getters[{}]'.format(devices): pollGetters,
+        'poll.getSnapshot[{}]'.format(devices): pollSnapshots,
+        'poll.BusBatch[{}]'.format(devices): pollBatch,
+    }
+
+def run(iterations=1000, devices=12, latency=0.0, pattern=None):
+    '''Runs all benchmarks and returns their results by name.'''
+
+    bus = _makeBus(devices, latency)
+    benchmarks = {}
+    benchmarks.update(pyi2cBenchmarks(bus))
+    benchmarks.update(pyi2cBenchmarks(I2CDev(0, ioctl=bus.ioctl), interface=I2CDevInterface))
+    benchmarks.update(pytic2Benchmarks(bus))
+    benchmarks.update(pollBenchmarks(bus, devices))
+    results = {}
+    for name, fn in benchmarks.items():
+        if pattern is not None and pattern not in name:
+            continue
+        transactions = bus.transactions
+        results[name] = measure(fn, iterations, warmup=min(50, iterations))
+        calls = iterations + min(50, iterations) + 2 * min(iterations, 100)
+        results[name]['transactionsPerCall'] = (bus.transactions - transactions) / calls
+    return results
+
+def _format(results):
+    lines = ['{:<36} {:>12} {:>10} {:>10} {:>8} {:>8} {:>10}'.format(
+        'benchmark', 'calls/s', 'p50 us', 'p99 us', 'xfer', 'blocks', 'peak B')]
+    for name, result in results.items():
+        lines.append('{:<36} {:>12.0f} {:>10.1f} {:>10.1f} {:>8.2f} {:>8.2f} {:>10d}'.format(
+            name, result['rate'], result['p50'] * 1e6, result['p99'] * 1e6,
+            result['transactionsPerCall'], result['blocks'], result['peakBytes']))
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pytic2.benchmark', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=1000, help='timed calls per benchmark')
+    parser.add_argument('-d', '--devices', type=int, default=12, help='devices on the fake bus')
+    parser.add_argument('-l', '--latency', type=float, default=0.0, help='latency per bus transaction in seconds')
+    parser.add_argument('-k', '--filter', dest='pattern', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.devices, args.latency, args.pattern)
+    print(json.dumps(results, indent=2) if args.json else _format(results))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import collections
+import logging
+import threading
+import weakref
+from concurrent.futures import Future
+
+class BusWorker():
+    '''Single thread that owns all transactions on one bus.
+
+    Work is queued per device and served round-robin, so a device with
+    a long queue cannot starve the other devices on the same bus.
+    '''
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._logger = logging.getLogger(__name__)
+        self._queues = collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, key, fn, *args, **kwargs):
+        '''Queues a call on the bus thread.
+
+        :param key: Queue key, normally the device address
+        :param fn: Callable executed on the bus thread
+        :return: A concurrent.futures.Future for the result of the call
+        '''
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('bus worker is closed')
+            self._queues.setdefault(key, collections.deque()).append((future, fn, args, kwargs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='BusWorker', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future
+
+    def close(self, wait=True):
+        '''Stops the bus thread after the queued work has been done. The next
+        busWorker() call for the bus starts a new worker.'''
+
+        with _workersLock:
+            if _workers.get(self.bus) is self:
+                del _workers[self.bus]
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _next(self):
+        with self._condition:
+            while not self._queues:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            key, queue = self._queues.popitem(last=False)
+            item = queue.popleft()
+            if queue:
+                # Re-append at the end: the next device gets the next turn
+                self._queues[key] = queue
+            return item
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as error:
+                future.set_exception(error)
+
+_workers = weakref.WeakKeyDictionary()
+_workersLock = threading.Lock()
+
+def busWorker(bus):
+    '''Returns the shared BusWorker of a bus, creating it on first use.'''
+
+    with _workersLock:
+        worker = _workers.get(bus)
+        if worker is None:
+            worker = _workers[bus] = BusWorker(bus)
+        return worker
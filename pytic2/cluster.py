@@ -0,0 +1,108 @@
+from concurrent.futures import Future
+
+from .busworker import busWorker
+from .pyi2c import BusBatch
+
+class TicCluster():
+    '''Routes the calls of Tics on several buses to one worker thread per bus.
+
+    The workers are the shared BusWorker objects (see AsyncTic), so the
+    buses run in parallel while the transactions on each bus stay
+    serialized. Fan-out operations such as positions() or stopAll() send
+    one combined transaction per bus and finish when the slowest bus is
+    done.
+    '''
+
+    def __init__(self, tics=()):
+        '''
+        :param tics: pytic2 objects, e.g. a TicRegistry
+        '''
+        self.tics = []
+        self._buses = {}
+        for tic in tics:
+            self.add(tic)
+
+    def __iter__(self):
+        return iter(self.tics)
+
+    def __len__(self):
+        return len(self.tics)
+
+    def add(self, tic):
+        '''Adds a device to the cluster.'''
+
+        self.tics.append(tic)
+        self._buses.setdefault(tic._interface.bus, []).append(tic)
+
+    @property
+    def buses(self):
+        return list(self._buses)
+
+    def submit(self, tic, method, *args, **kwargs):
+        '''Runs a method of a device on the worker of its bus.
+
+        :param tic: pytic2 object of the cluster
+        :param method: Name of the pytic2 method
+        :return: A concurrent.futures.Future for the result
+        '''
+        return busWorker(tic._interface.bus).submit(tic.address, getattr(tic, method), *args, **kwargs)
+
+    def _runBatch(self, bus, tics, method, args, kwargs):
+        with BusBatch(bus) as batch:
+            results = [getattr(batch.device(tic), method)(*args, **kwargs) for tic in tics]
+        return [result.result() if isinstance(result, Future) else result for result in results]
+
+    def _runEach(self, tics, method, args, kwargs):
+        return [getattr(tic, method)(*args, **kwargs) for tic in tics]
+
+    def fanOut(self, method, *args, batch=True, tics=None, **kwargs):
+        '''Calls a method on all devices, in parallel across the buses.
+
+        :param method: Name of the pytic2 method
+        :param batch: Send the calls of a bus in one BusBatch; use False for
+                      methods that make several dependent transactions
+                      such as waitUntilReached
+        :param tics: Subset of the devices; all devices if None
+        :return: The results in the order of the devices
+        '''
+        selected = self.tics if tics is None else list(tics)
+        futures = []
+        for bus, busTics in self._buses.items():
+            members = [tic for tic in busTics if tic in selected]
+            if not members:
+                continue
+            if batch:
+                future = busWorker(bus).submit(None, self._runBatch, bus, members, method, args, kwargs)
+            else:
+                future = busWorker(bus).submit(None, self._runEach, members, method, args, kwargs)
+            futures.append((members, future))
+        results = {}
+        for members, future in futures:
+            results.update(zip(map(id, members), future.result()))
+        return [results[id(tic)] for tic in selected]
+
+    def positions(self):
+        '''Reads the current positions of all devices.'''
+
+        return self.fanOut('getCurrentPosition')
+
+    def snapshots(self):
+        '''Reads the complete variable blocks of all devices.'''
+
+        return self.fanOut('getSnapshot')
+
+    def stopAll(self):
+        '''Stops all motors abruptly with haltAndHold.'''
+
+        self.fanOut('haltAndHold')
+
+    def deenergizeAll(self):
+        '''De-energizes all motors.'''
+
+        self.fanOut('deenergize')
+
+    def close(self):
+        '''Stops the bus workers after the queued work has been done.'''
+
+        for bus in self._buses:
+            busWorker(bus).close()
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .pyi2c import pyi2c
+from .pytic2 import pytic2, TIC_GETVARIABLE_CMD, TIC_OPERATIONSTATE_VAR, TIC_UPTIME_VAR
+
+# Valid values of the "operation state" variable
+TIC_OPERATION_STATES = (0, 2, 4, 6, 8, 10)
+
+# 7-bit addresses that are not reserved by the I2C specification
+I2C_ADDRESSES = range(0x08, 0x78)
+
+_CACHE_VERSION = 1
+_PROBE = struct.Struct('<BI')
+
+_logger = logging.getLogger(__name__)
+
+def probe(bus, address):
+    '''Checks whether a Tic answers at an address.
+
+    Reads the operation state and the up time in one transaction.
+
+    :return: The up time in ms, or None if no Tic answered
+    '''
+    interface = pyi2c(bus)
+    try:
+        data = interface.readBlocks(address, [([TIC_GETVARIABLE_CMD, TIC_OPERATIONSTATE_VAR], 1),
+                                              ([TIC_GETVARIABLE_CMD, TIC_UPTIME_VAR], 4)], bytes)
+    except OSError:
+        return None
+    operationState, upTime = _PROBE.unpack(data)
+    if operationState not in TIC_OPERATION_STATES:
+        return None
+    return upTime
+
+class TicRegistry():
+    '''Discovered Tics by bus number and address.'''
+
+    def __init__(self):
+        self.buses = {}
+        self.devices = {}
+        self.bootTimes = {}
+
+    def __iter__(self):
+        return iter(self.tics())
+
+    def __len__(self):
+        return sum(len(devices) for devices in self.devices.values())
+
+    def add(self, number, bus, address, tic, bootTime=None):
+        self.buses[number] = bus
+        self.devices.setdefault(number, {})[address] = tic
+        self.bootTimes[(number, address)] = bootTime
+
+    def get(self, number, address):
+        '''Returns the pytic2 object of a device.'''
+
+        return self.devices[number][address]
+
+    def tics(self, number=None):
+        '''Returns the pytic2 objects of one bus or of all buses.'''
+
+        numbers = [number] if number is not None else sorted(self.devices)
+        return [self.devices[n][address] for n in numbers for address in sorted(self.devices.get(n, {}))]
+
+    def addresses(self):
+        '''Returns the addresses of the devices by bus number.'''
+
+        return {number: sorted(devices) for number, devices in self.devices.items()}
+
+def _loadCache(path):
+    try:
+        with open(path) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cache.get('version') != _CACHE_VERSION:
+        return None
+    return cache
+
+def _saveCache(path, registry, scanned):
+    cache = {'version': _CACHE_VERSION, 'buses': {}}
+    for number, devices in registry.devices.items():
+        cache['buses'][str(number)] = {
+            'scanned': scanned[number],
+            'devices': {str(address): registry.bootTimes[(number, address)] for address in devices},
+        }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+def _scanBus(bus, addresses, cached):
+    '''Probes the cached addresses first; falls back to a full scan when
+    one of them does not answer or there is no cache entry.'''
+
+    found = {}
+    if cached is not None:
+        for address in cached:
+            upTime = probe(bus, address)
+            if upTime is None:
+                _logger.info('cached device %d missing, rescanning the bus', address)
+                break
+            found[address] = upTime
+        else:
+            return found, False
+    found = {}
+    for address in addresses:
+        upTime = probe(bus, address)
+        if upTime is not None:
+            found[address] = upTime
+    return found, True
+
+def discover(buses, addresses=I2C_ADDRESSES, cachePath=None, maxAge=86400.0, rescan=False,
+             busFactory=None, **options):
+    '''Finds the Tics on several I2C buses in parallel, one worker per bus.
+
+    With a cache file only the devices found last time are probed; a bus is
+    scanned completely when one of them is missing, when its last full scan
+    is older than maxAge seconds, or with rescan=True.
+
+    :param buses: Bus numbers (opened with busFactory) or a dictionary of
+                  bus objects by bus number
+    :param addresses: Addresses probed by a full scan
+    :param cachePath: Optional path of the JSON registry cache
+    :param maxAge: Maximum age of a full scan in seconds
+    :param rescan: Ignore the cache
+    :param busFactory: Callable opening a bus by number; smbus2.SMBus if None
+    :param options: Keyword arguments for the pytic2 objects
+    :return: A TicRegistry
+    '''
+    if not isinstance(buses, dict):
+        if busFactory is None:
+            from smbus2 import SMBus as busFactory
+        buses = {number: busFactory(number) for number in buses}
+    cache = None if rescan or cachePath is None else _loadCache(cachePath)
+    now = time.time()
+
+    def scan(number):
+        entry = None if cache is None else cache['buses'].get(str(number))
+        cached = None
+        if entry is not None and now - entry.get('scanned', 0) <= maxAge:
+            cached = [int(address) for address in entry['devices']]
+        found, full = _scanBus(buses[number], addresses, cached)
+        return number, found, now if full else entry['scanned']
+
+    registry = TicRegistry()
+    scanned = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(buses))) as executor:
+        for number, found, lastScan in executor.map(scan, sorted(buses)):
+            scanned[number] = lastScan
+            registry.buses[number] = buses[number]
+            registry.devices.setdefault(number, {})
+            for address, upTime in sorted(found.items()):
+                registry.add(number, buses[number], address, pytic2(buses[number], address, **options),
+                             now - upTime / 1000)
+    if cachePath is not None:
+        _saveCache(cachePath, registry, scanned)
+    return registry
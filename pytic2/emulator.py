@@ -0,0 +1,474 @@
+import ctypes
+import errno
+import logging
+import math
+import random
+import struct
+import threading
+import time
+
+from smbus2.smbus2 import I2C_M_RD, I2C_RDWR, i2c_rdwr_ioctl_data
+
+from .pytic2 import *
+from .pytic2 import _SETTINGS_LAYOUT, _SNAPSHOT_LAYOUT, _compileLayout
+
+# Upper limit of motion phases in one update, against rounding loops
+_MAX_PHASES = 64
+# Relative tolerance of the speed comparisons of the motion planner
+_TOLERANCE = 1e-9
+
+# Bits of the "error status" variable
+TIC_ERROR_INTENTIONALLY_DEENERGIZED = 1 << 0
+TIC_ERROR_MOTOR_DRIVER_ERROR = 1 << 1
+TIC_ERROR_LOW_VIN = 1 << 2
+TIC_ERROR_KILL_SWITCH = 1 << 3
+TIC_ERROR_REQUIRED_INPUT_INVALID = 1 << 4
+TIC_ERROR_SERIAL_ERROR = 1 << 5
+TIC_ERROR_COMMAND_TIMEOUT = 1 << 6
+TIC_ERROR_SAFE_START_VIOLATION = 1 << 7
+TIC_ERROR_ERR_LINE_HIGH = 1 << 8
+
+# Bits of the "misc flags 1" variable
+TIC_MISC_FLAGS1_ENERGIZED = 1 << 0
+TIC_MISC_FLAGS1_POSITION_UNCERTAIN = 1 << 1
+TIC_MISC_FLAGS1_HOMING_ACTIVE = 1 << 4
+
+TIC_OPERATION_STATE_DEENERGIZED = 2
+TIC_OPERATION_STATE_SOFT_ERROR = 4
+TIC_OPERATION_STATE_NORMAL = 10
+
+TIC_PLANNING_MODE_OFF = 0
+TIC_PLANNING_MODE_TARGET_POSITION = 1
+TIC_PLANNING_MODE_TARGET_VELOCITY = 2
+
+class VirtualClock():
+    '''Manually advanced clock for emulators and fake buses.'''
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self._now
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += seconds
+
+class TicEmulator():
+    '''Software model of a Tic stepper motor controller behind the I2C interface.
+
+    It implements every command of the pytic2 command set, keeps the variable
+    block at the documented offsets and plans the motion of the motor from
+    the max speed, starting speed, acceleration and deceleration limits like
+    the Tic does. The state advances with the clock, which is the real
+    monotonic clock by default or a VirtualClock.
+    '''
+
+    DEFAULTS = {
+        'startingSpeed': 0,
+        'maxSpeed': 2000000,
+        'maxAcceleration': 40000,
+        'maxDeceleration': 40000,
+        'stepMode': 0,
+        'currentLimit': 10,
+        'decayMode': 0,
+    }
+
+    _struct = _compileLayout(_SNAPSHOT_LAYOUT)
+    _fields = tuple(name for name, _, _ in _SNAPSHOT_LAYOUT)
+    _settingsStruct = _compileLayout(_SETTINGS_LAYOUT)
+    _settingsFields = tuple(name for name, _, _ in _SETTINGS_LAYOUT)
+
+    def __init__(self, address, clock=None, commandTimeout=1000, settings=None):
+        '''
+        :param address: Device number of the emulated Tic
+        :param clock: Callable returning the time in seconds; time.monotonic if None
+        :param commandTimeout: Command timeout in ms, 0 disables it
+        :param settings: Optional dictionary overriding DEFAULTS
+        '''
+        self.address = address
+        self.clock = clock if clock is not None else time.monotonic
+        self.commandTimeout = commandTimeout
+        self.settings = dict(self.DEFAULTS)
+        if settings is not None:
+            self.settings.update(settings)
+        self._logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._bootTime = self.clock()
+        self._lastUpdate = self._bootTime
+        self._lastCommand = self._bootTime
+        self._lastStep = self._bootTime
+        self._pending = None
+        # An offline device does not acknowledge its address
+        self.offline = False
+        self.memory = bytearray(TIC_VARIABLES_LENGTH)
+        self.values = dict.fromkeys(self._fields, 0)
+        self.values.update({
+            'deviceReset': 0,
+            'vinVoltage': 12000,
+            'rcPulseWidth': 0xFFFF,
+            'analogReadingSCL': 0xFFFF,
+            'analogReadingSDA': 0xFFFF,
+            'analogReadingTX': 0xFFFF,
+            'analogReadingRX': 0xFFFF,
+            'inputAfterAveraging': 0xFFFF,
+            'inputAfterHysteresis': 0xFFFF,
+        })
+        self.position = 0.0
+        self.velocity = 0.0
+        self.errorStatus = TIC_ERROR_INTENTIONALLY_DEENERGIZED | TIC_ERROR_SAFE_START_VIOLATION
+        self.errorsOccurred = self.errorStatus
+        self.miscFlags1 = TIC_MISC_FLAGS1_POSITION_UNCERTAIN
+        self._reset()
+
+    def _reset(self):
+        self.values.update(self.settings)
+        self.planningMode = TIC_PLANNING_MODE_OFF
+        self.targetPosition = 0
+        self.targetVelocity = 0
+        self.velocity = 0.0
+
+    def _setError(self, bits):
+        self.errorStatus |= bits
+        self.errorsOccurred |= bits
+
+    def _halt(self):
+        self.velocity = 0.0
+        self.planningMode = TIC_PLANNING_MODE_OFF
+
+    # - Bus side -
+
+    def write(self, data):
+        '''Handles an I2C write transfer addressed to the device.'''
+
+        with self._lock:
+            self.update()
+            if not data:
+                return
+            if data[0] not in (TIC_GETVARIABLE_CMD, TIC_GETERROROCCURRED_CMD, TIC_GETSETTING_CMD):
+                # Every command except the reads restarts the command timeout
+                self._lastCommand = self.clock()
+                self.errorStatus &= ~TIC_ERROR_COMMAND_TIMEOUT
+            self._command(data[0], data[1:])
+
+    def read(self, length):
+        '''Handles an I2C read transfer addressed to the device.'''
+
+        with self._lock:
+            self.update()
+            if self._pending is None:
+                return bytes(length)
+            cmd, offset = self._pending
+            self._pending = None
+            if cmd == TIC_GETSETTING_CMD:
+                memory = self._packSettings()
+            else:
+                self._pack()
+                memory = self.memory
+            data = bytes(memory[offset:offset + length]).ljust(length, b'\0')
+            if cmd == TIC_GETERROROCCURRED_CMD:
+                self.errorsOccurred = 0
+            return data
+
+    def _command(self, cmd, payload):
+        value32 = struct.unpack('<i', bytes(payload[:4]).ljust(4, b'\0'))[0]
+        value7 = payload[0] & 0x7F if payload else 0
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('command: address = %d, cmd = %s', self.address, hex(cmd))
+        if cmd in (TIC_GETVARIABLE_CMD, TIC_GETERROROCCURRED_CMD, TIC_GETSETTING_CMD):
+            self._pending = (cmd, payload[0] if payload else 0)
+        elif cmd == TIC_SETTARGETPOSITION_CMD:
+            if not self.errorStatus:
+                self.planningMode = TIC_PLANNING_MODE_TARGET_POSITION
+                self.targetPosition = value32
+        elif cmd == TIC_SETTARGETVELOCITY_CMD:
+            if not self.errorStatus:
+                self.planningMode = TIC_PLANNING_MODE_TARGET_VELOCITY
+                self.targetVelocity = max(-500000000, min(500000000, value32))
+        elif cmd == TIC_HALTANDSETPOSITION_CMD:
+            self._halt()
+            self.position = float(value32)
+            self.miscFlags1 &= ~TIC_MISC_FLAGS1_POSITION_UNCERTAIN
+        elif cmd == TIC_HALTANDHOLD_CMD:
+            self._halt()
+            self.miscFlags1 |= TIC_MISC_FLAGS1_POSITION_UNCERTAIN
+        elif cmd == TIC_GOHOME_CMD:
+            # There are no limit switches: homing completes immediately
+            self._halt()
+            self.position = 0.0
+            self.miscFlags1 &= ~TIC_MISC_FLAGS1_POSITION_UNCERTAIN
+        elif cmd == TIC_DEENERGIZE_CMD:
+            self._halt()
+            self._setError(TIC_ERROR_INTENTIONALLY_DEENERGIZED)
+            self.miscFlags1 |= TIC_MISC_FLAGS1_POSITION_UNCERTAIN
+        elif cmd == TIC_ENERGIZE_CMD:
+            self.errorStatus &= ~TIC_ERROR_INTENTIONALLY_DEENERGIZED
+        elif cmd == TIC_EXITSAFESTART_CMD:
+            self.errorStatus &= ~TIC_ERROR_SAFE_START_VIOLATION
+        elif cmd == TIC_RESET_CMD:
+            self._reset()
+            self._setError(TIC_ERROR_SAFE_START_VIOLATION)
+        elif cmd == TIC_CLEARDRIVEERROR_CMD:
+            self.errorStatus &= ~TIC_ERROR_MOTOR_DRIVER_ERROR
+        elif cmd == TIC_SETMAXSPEED_CMD:
+            self.values['maxSpeed'] = max(0, min(500000000, value32))
+        elif cmd == TIC_SETSTARTTINGSPEED_CMD:
+            self.values['startingSpeed'] = max(0, min(500000000, value32))
+        elif cmd == TIC_SETMAXACCEL_CMD:
+            self.values['maxAcceleration'] = max(100, value32)
+        elif cmd == TIC_SETMAXDECEL_CMD:
+            self.values['maxDeceleration'] = max(100, value32)
+        elif cmd == TIC_SETSTEPMODE_CMD:
+            self.values['stepMode'] = value7
+        elif cmd == TIC_SETCURRENTLIMIT_CMD:
+            self.values['currentLimit'] = value7
+        elif cmd == TIC_SETDECAYMODE_CMD:
+            self.values['decayMode'] = value7
+        # Other commands, including resetCommandTimeout, only restart the command timeout
+        if self.errorStatus:
+            self._halt()
+
+    # - Motion planning -
+
+    def update(self):
+        '''Advances the emulated state to the current time of the clock.'''
+
+        with self._lock:
+            now = self.clock()
+            if self.commandTimeout and (now - self._lastCommand) * 1000 > self.commandTimeout:
+                if not self.errorStatus & TIC_ERROR_COMMAND_TIMEOUT:
+                    self._setError(TIC_ERROR_COMMAND_TIMEOUT)
+                    self._halt()
+            elapsed = now - self._lastUpdate
+            self._lastUpdate = now
+            # Every phase ends at an event (a speed reached, the target
+            # reached) or uses up the time, so a few phases cover any interval
+            for _ in range(_MAX_PHASES):
+                if elapsed <= 0:
+                    break
+                elapsed -= self._phase(elapsed)
+            if self.velocity:
+                self._lastStep = now
+
+    def _phase(self, limit):
+        '''Advances the motion through at most limit seconds of one phase of
+        constant acceleration, in closed form. Returns the duration.'''
+
+        # Speeds in microsteps per second, accelerations in microsteps per s²
+        values = self.values
+        maxSpeed = values['maxSpeed'] / 1e4
+        startingSpeed = values['startingSpeed'] / 1e4
+        accel = values['maxAcceleration'] / 100
+        decel = (values['maxDeceleration'] or values['maxAcceleration']) / 100
+        v = self.velocity / 1e4
+
+        if self.planningMode == TIC_PLANNING_MODE_TARGET_POSITION:
+            return self._positionPhase(limit, v, maxSpeed, startingSpeed, accel, decel)
+        if self.planningMode == TIC_PLANNING_MODE_TARGET_VELOCITY:
+            target = max(-maxSpeed, min(maxSpeed, self.targetVelocity / 1e4))
+        else:
+            target = 0.0
+        return self._ramp(limit, v, target, startingSpeed, accel, decel)
+
+    def _ramp(self, limit, v, target, startingSpeed, accel, decel):
+        if abs(target) <= startingSpeed and abs(v) <= startingSpeed:
+            v = target
+        if v == target:
+            self._move(v, 0.0, limit)
+            return limit
+        if target * v < 0:
+            # Slow down to a standstill before reversing
+            end, rate = 0.0, decel
+        elif abs(target) < abs(v):
+            end, rate = target, decel
+        else:
+            end, rate = target, accel
+        a = math.copysign(rate, end - v)
+        duration = (end - v) / a
+        if duration > limit:
+            self._move(v, a, limit)
+            return limit
+        self._move(v, a, duration)
+        self.velocity = end * 1e4
+        return duration
+
+    def _positionPhase(self, limit, v, maxSpeed, startingSpeed, accel, decel):
+        distance = self.targetPosition - self.position
+        if abs(distance) < 0.5 and abs(v) <= startingSpeed:
+            self._arrive()
+            return limit
+        direction = math.copysign(1.0, distance)
+        speed = v * direction
+        if speed < 0:
+            # Moving away from the target
+            return self._ramp(limit, v, 0.0, startingSpeed, accel, decel)
+        distance = abs(distance)
+        stopping = math.sqrt(2 * distance * decel)
+        target = min(maxSpeed, stopping)
+        if target <= startingSpeed and speed <= startingSpeed:
+            speed = target
+        if speed >= stopping * (1 - _TOLERANCE):
+            # On the stopping curve: decelerate to a standstill at the target
+            if speed <= 0:
+                self._arrive()
+                return limit
+            duration = 2 * distance / speed
+            if duration > limit:
+                self._move(direction * speed, -direction * speed * speed / (2 * distance), limit)
+                return limit
+            self._arrive()
+            return duration
+        if speed > maxSpeed * (1 + _TOLERANCE):
+            # The max speed was lowered during the move
+            duration = (speed - maxSpeed) / decel
+            acceleration, end = -decel, maxSpeed
+        elif speed >= maxSpeed * (1 - _TOLERANCE):
+            # Cruise until the stopping curve
+            speed = maxSpeed
+            duration = (distance - speed * speed / (2 * decel)) / speed
+            acceleration, end = 0.0, speed
+        else:
+            # Accelerate until the max speed or the stopping curve
+            a = accel * accel / (2 * decel) + accel / 2
+            b = speed * accel / decel + speed
+            c = speed * speed / (2 * decel) - distance
+            duration = min((maxSpeed - speed) / accel, (-b + math.sqrt(b * b - 4 * a * c)) / (2 * a))
+            acceleration = accel
+            end = speed + accel * duration
+        duration = max(0.0, duration)
+        if duration > limit:
+            self._move(direction * speed, direction * acceleration, limit)
+            return limit
+        self._move(direction * speed, direction * acceleration, duration)
+        self.velocity = direction * end * 1e4
+        return duration
+
+    def _move(self, v, a, duration):
+        self.position += v * duration + a * duration * duration / 2
+        self.velocity = (v + a * duration) * 1e4
+
+    def _arrive(self):
+        self.position = float(self.targetPosition)
+        self.velocity = 0.0
+
+    def _pack(self):
+        now = self.clock()
+        values = self.values
+        values['operationState'] = (TIC_OPERATION_STATE_NORMAL if not self.errorStatus
+                                    else TIC_OPERATION_STATE_DEENERGIZED if self.errorStatus & TIC_ERROR_INTENTIONALLY_DEENERGIZED
+                                    else TIC_OPERATION_STATE_SOFT_ERROR)
+        energized = 0 if self.errorStatus & TIC_ERROR_INTENTIONALLY_DEENERGIZED else TIC_MISC_FLAGS1_ENERGIZED
+        values['miscFlags1'] = (self.miscFlags1 & ~TIC_MISC_FLAGS1_ENERGIZED) | energized
+        values['errorStatus'] = self.errorStatus & 0xFFFF
+        values['errorsOccurred'] = self.errorsOccurred
+        values['planningMode'] = self.planningMode
+        values['targetPosition'] = self.targetPosition
+        values['targetVelocity'] = self.targetVelocity
+        values['currentPosition'] = _int32(round(self.position))
+        values['currentVelocity'] = int(self.velocity)
+        values['actingTargetPosition'] = self.targetPosition
+        values['timeSinceLastStep'] = min(0xFFFFFFFF, int((now - self._lastStep) * 3e6))
+        values['upTime'] = int((now - self._bootTime) * 1000) & 0xFFFFFFFF
+        self._struct.pack_into(self.memory, 0, *(values[name] for name in self._fields))
+
+    def _packSettings(self):
+        # The non-volatile settings: the emulated ones, the rest zero
+        values = dict.fromkeys(self._settingsFields, 0)
+        values.update((name, value) for name, value in self.settings.items() if name in values)
+        values['commandTimeout'] = self.commandTimeout
+        memory = bytearray(TIC_SETTINGS_LENGTH)
+        self._settingsStruct.pack_into(memory, 0, *(values[name] for name in self._settingsFields))
+        return memory
+
+    def snapshot(self):
+        '''Returns the current variable block as a TicSnapshot.'''
+
+        with self._lock:
+            self.update()
+            self._pack()
+            return TicSnapshot(bytes(self.memory))
+
+def _int32(value):
+    return (value + (1 << 31)) % (1 << 32) - (1 << 31)
+
+class FakeSMBus():
+    '''In-process replacement for smbus2.SMBus that routes i2c_rdwr
+    transactions to TicEmulator objects.
+
+    Transactions to an address without an emulator or with an offline
+    emulator fail with OSError(EREMOTEIO) like a NACK on a real bus, and
+    random transient errors can be injected with errorRate. Every transaction can be
+    given a fixed latency, which is slept on the real clock or added to a
+    VirtualClock.
+    '''
+
+    def __init__(self, devices=(), latency=0.0, clock=None, errorRate=0.0):
+        '''
+        :param devices: TicEmulator objects on the bus
+        :param latency: Latency of each transaction in seconds
+        :param clock: Optional VirtualClock shared with the emulators
+        :param errorRate: Probability that a transaction fails with EREMOTEIO
+        '''
+        self.devices = {}
+        self.latency = latency
+        self.clock = clock
+        self.errorRate = errorRate
+        self.transactions = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+        for device in devices:
+            self.add(device)
+
+    def add(self, device):
+        '''Attaches an emulator to the bus.'''
+
+        self.devices[device.address] = device
+        return device
+
+    def i2c_rdwr(self, *i2c_msgs):
+        with self._lock:
+            self.transactions += 1
+            self.messages += len(i2c_msgs)
+            if self.latency:
+                if isinstance(self.clock, VirtualClock):
+                    self.clock.advance(self.latency)
+                else:
+                    time.sleep(self.latency)
+            if self.errorRate and random.random() < self.errorRate:
+                raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+            for msg in i2c_msgs:
+                device = self.devices.get(msg.addr)
+                if device is None or device.offline:
+                    raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+                if msg.flags & I2C_M_RD:
+                    data = device.read(msg.len)
+                    ctypes.memmove(msg.buf, data, msg.len)
+                else:
+                    device.write(ctypes.string_at(msg.buf, msg.len))
+
+    def ioctl(self, fd, request, arg):
+        '''Fake of fcntl.ioctl for an I2CDev, handling I2C_RDWR with the
+        ioctl argument given as an i2c_rdwr_ioctl_data structure.
+
+        Like fcntl.ioctl, an int argument is taken as a C int value rather
+        than a pointer: an address does not fit and raises OverflowError,
+        any other int is a bad address for the kernel.'''
+
+        if request != I2C_RDWR:
+            raise OSError(errno.ENOTTY, 'Inappropriate ioctl for device')
+        if isinstance(arg, int):
+            if not -2**31 <= arg < 2**31:
+                raise OverflowError('signed integer is greater than maximum')
+            raise OSError(errno.EFAULT, 'Bad address')
+        data = arg if isinstance(arg, i2c_rdwr_ioctl_data) else i2c_rdwr_ioctl_data.from_buffer_copy(arg)
+        self.i2c_rdwr(*(data.msgs[i] for i in range(data.nmsgs)))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
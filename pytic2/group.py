@@ -0,0 +1,192 @@
+import struct
+import threading
+import time
+
+from .kinematics import moveTime
+from .pyi2c import BusBatch
+from .pytic2 import TIC_MAXSPEED_VAR, TIC_CURRENTPOSITION_VAR
+from .scheduler import wireTime
+
+# max speed, max decel, max accel and current position, starting at TIC_MAXSPEED_VAR
+_STATE = struct.Struct('<IIIi')
+
+# Lowest max acceleration and deceleration the Tic accepts
+_MIN_ACCEL = 100
+_MAX_ACCEL = 0x7FFFFFFF
+_MAX_SPEED = 500000000
+
+def _decodeState(data):
+    return _STATE.unpack(data)
+
+class MotorGroup():
+    '''Group of Tics that start coordinated moves together.
+
+    move() sends the setTargetPosition commands of all axes on one bus
+    back-to-back in one combined transaction; the transactions of
+    different buses are started at the same moment from one thread per
+    bus. With synchronize=True the max speed, acceleration and
+    deceleration of every axis are set in proportion to its distance, with
+    the whole group scaled down to the most limiting axis, so all axes
+    arrive at the same time. The scaling always starts from the base limits
+    of the axes: the limits given to the constructor, or else the limits an
+    axis has when it first takes part in a synchronized move. The scaled
+    limits stay in effect until restoreLimits() is called.
+    '''
+
+    def __init__(self, tics, clock=100000, limits=None):
+        '''
+        :param tics: pytic2 objects of the axes
+        :param clock: Bus clock in Hz, used to estimate the skew within a transaction
+        :param limits: Optional dictionary of the base (max speed, max accel,
+                       max decel) by pytic2 object
+        '''
+        self.tics = list(tics)
+        self.clock = clock
+        self.lastReport = None
+        self._limits = dict(limits or {})
+
+    def _targets(self, targets):
+        if isinstance(targets, dict):
+            return targets
+        targets = list(targets)
+        if len(targets) != len(self.tics):
+            raise ValueError('expected {} targets, got {}'.format(len(self.tics), len(targets)))
+        return dict(zip(self.tics, targets))
+
+    def _byBus(self, tics):
+        buses = {}
+        for tic in tics:
+            buses.setdefault(tic._interface.bus, []).append(tic)
+        return buses
+
+    def _readStates(self, tics):
+        '''Reads max speed, decel, accel and current position of the axes,
+        one transaction per bus.'''
+
+        length = TIC_CURRENTPOSITION_VAR + 4 - TIC_MAXSPEED_VAR
+        futures = {}
+        for bus, busTics in self._byBus(tics).items():
+            with BusBatch(bus) as batch:
+                for tic in busTics:
+                    futures[tic] = batch.device(tic).getVariableBlock(TIC_MAXSPEED_VAR, length, _decodeState)
+        return {tic: future.result() for tic, future in futures.items()}
+
+    def _synchronize(self, targets):
+        states = self._readStates(targets)
+        distances = {tic: abs(target - states[tic][3]) for tic, target in targets.items()}
+        moving = [tic for tic in targets if distances[tic]]
+        if not moving:
+            return {}, 0.0
+        for tic in moving:
+            if tic not in self._limits:
+                maxSpeed, decel, accel, _ = states[tic]
+                self._limits[tic] = (maxSpeed, accel, decel or accel)
+        # All axes follow one profile scaled by their distance; its speed,
+        # acceleration and deceleration per microstep of distance are set by
+        # the most limiting axis for each of them. The shortest move is held
+        # at the lowest limits the Tic accepts by scaling up the whole group,
+        # which keeps the arrival times equal.
+        shortest = min(distances[tic] for tic in moving)
+        speed = max(min(self._limits[tic][0] / distances[tic] for tic in moving), 1 / shortest)
+        accel = max(min(self._limits[tic][1] / distances[tic] for tic in moving), _MIN_ACCEL / shortest)
+        decel = max(min(self._limits[tic][2] / distances[tic] for tic in moving), _MIN_ACCEL / shortest)
+        limits = {tic: (min(_MAX_SPEED, max(1, round(speed * distances[tic]))),
+                        min(_MAX_ACCEL, max(_MIN_ACCEL, round(accel * distances[tic]))),
+                        min(_MAX_ACCEL, max(_MIN_ACCEL, round(decel * distances[tic]))))
+                  for tic in moving}
+        lead = max(moving, key=distances.get)
+        return limits, moveTime(distances[lead], *limits[lead])
+
+    def restoreLimits(self):
+        '''Sets the base max speed, acceleration and deceleration again on
+        the axes whose limits were scaled, one transaction per bus.'''
+
+        self._writeLimits(self._limits)
+
+    def _writeLimits(self, limits):
+        for bus, tics in self._byBus(limits).items():
+            with BusBatch(bus) as batch:
+                for tic in tics:
+                    device = batch.device(tic)
+                    device.setMaxSpeed(limits[tic][0])
+                    device.setMaxAccel(limits[tic][1])
+                    device.setMaxDecel(limits[tic][2])
+
+    def move(self, targets, synchronize=False):
+        '''Starts a coordinated move.
+
+        :param targets: Target positions in microsteps, either a sequence in
+                        the order of the group or a dictionary by pytic2 object
+        :param synchronize: Scale the speed and acceleration limits so all
+                            axes arrive at the same time
+        :return: Report dictionary with the measured start skew between the
+                 buses ('hostSkew'), the estimated skew within the
+                 transactions ('wireSkew'), their sum ('skew') in seconds and,
+                 when synchronized, the expected duration of the move
+        '''
+        targets = self._targets(targets)
+        limits, duration = self._synchronize(targets) if synchronize else ({}, None)
+
+        if limits:
+            # The limits go first in their own transactions, so the targets
+            # of a bus still fit into one
+            self._writeLimits(limits)
+
+        batches = []
+        wireSkew = 0.0
+        for bus, tics in self._byBus(targets).items():
+            batch = BusBatch(bus)
+            for tic in tics:
+                batch.device(tic).setTargetPosition(targets[tic])
+            msgs = [msg for transaction in batch._transactions[1:] for msg in transaction]
+            wireSkew = max(wireSkew, wireTime(msgs, self.clock) if msgs else 0.0)
+            batches.append(batch)
+
+        starts = self._flush(batches)
+        hostSkew = max(starts) - min(starts)
+        self.lastReport = {'hostSkew': hostSkew, 'wireSkew': wireSkew,
+                           'skew': hostSkew + wireSkew, 'duration': duration}
+        return self.lastReport
+
+    def _flush(self, batches):
+        if len(batches) == 1:
+            return [self._flushOne(batches[0])]
+        barrier = threading.Barrier(len(batches))
+        starts = [None] * len(batches)
+        errors = []
+
+        def flush(index, batch):
+            barrier.wait()
+            try:
+                starts[index] = self._flushOne(batch)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=flush, args=(index, batch)) for index, batch in enumerate(batches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return starts
+
+    @staticmethod
+    def _flushOne(batch):
+        start = time.perf_counter()
+        batch.flush()
+        return start
+
+    def stop(self):
+        '''Stops all axes abruptly with haltAndHold, one transaction per bus.'''
+
+        for bus, tics in self._byBus(self.tics).items():
+            with BusBatch(bus) as batch:
+                for tic in tics:
+                    batch.device(tic).haltAndHold()
+
+    def positions(self):
+        '''Reads the current positions of all axes, one transaction per bus.'''
+
+        states = self._readStates(self.tics)
+        return [states[tic][3] for tic in self.tics]
@@ -0,0 +1,188 @@
+import logging
+import math
+import threading
+import time
+
+from .pyi2c import BusBatch, commandTimes
+
+class _Entry():
+    __slots__ = ('tic', 'key', 'interval', 'tick', 'times')
+
+    def __init__(self, tic, interval):
+        self.tic = tic
+        self.key = (tic._interface.bus, tic.address)
+        self.interval = interval
+        self.tick = None
+        self.times = commandTimes(tic._interface.bus)
+
+class HeartbeatService():
+    '''Keeps the command timeout of registered Tics from expiring.
+
+    The devices are kept in a hashed timer wheel. When the heartbeat of a
+    device is due, it is skipped if any command has reached the device
+    within its interval, from any pyi2c object on the same bus, and the
+    device is rescheduled one interval after that command. The heartbeats
+    due on one bus are sent together in one BusBatch::
+
+        with HeartbeatService() as heartbeat:
+            for tic in tics:
+                heartbeat.register(tic)
+            ...
+    '''
+
+    def __init__(self, resolution=0.01, slots=512):
+        '''
+        :param resolution: Duration of one tick of the wheel in seconds
+        :param slots: Number of slots of the wheel; intervals longer than
+                      slots * resolution take several turns
+        '''
+        self.resolution = resolution
+        self._logger = logging.getLogger(__name__)
+        self._wheel = [set() for _ in range(slots)]
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = time.monotonic()
+        self._tick = 0
+        self.sent = 0
+        self.skipped = 0
+        self.errors = 0
+        self.batches = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def register(self, tic, interval=None):
+        '''Adds a device, or changes the interval of a registered one.
+
+        :param tic: pytic2 object
+        :param interval: Seconds between heartbeats; half the command
+                         timeout setting of the device if None
+        :return: The interval, or None if the command timeout of the device
+                 is disabled and it was not registered
+        '''
+        if interval is None:
+            timeout = tic.getSettings().commandTimeout
+            if not timeout:
+                self._logger.debug('register: address = %d, command timeout disabled', tic.address)
+                return None
+            interval = timeout / 2000
+        entry = _Entry(tic, interval)
+        with self._lock:
+            self._remove(entry.key)
+            self._entries[entry.key] = entry
+            now = time.monotonic()
+            self._schedule(entry, now, self._ticks(now))
+        return interval
+
+    def unregister(self, tic):
+        '''Removes a device.'''
+
+        with self._lock:
+            self._remove((tic._interface.bus, tic.address))
+
+    def start(self):
+        '''Starts sending heartbeats in a background thread.'''
+
+        if self._thread is not None:
+            raise RuntimeError('heartbeat service is already running')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='HeartbeatService', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''Stops the background thread.'''
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        '''Returns the counters of sent, skipped and failed heartbeats and of
+        the bus transactions they took.'''
+
+        with self._lock:
+            return {'devices': len(self._entries), 'sent': self.sent, 'skipped': self.skipped,
+                    'errors': self.errors, 'batches': self.batches}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._wheel[entry.tick % len(self._wheel)].discard(entry)
+
+    def _ticks(self, now):
+        return int((now - self._start) / self.resolution)
+
+    def _schedule(self, entry, deadline, current):
+        # Never in a slot that has already been visited
+        entry.tick = max(current + 1, math.ceil((deadline - self._start) / self.resolution))
+        self._wheel[entry.tick % len(self._wheel)].add(entry)
+
+    def _due(self, now):
+        '''Advances the wheel to now and returns the due entries, each
+        rescheduled one interval after now or after its last command.'''
+
+        due = []
+        current = self._ticks(now)
+        with self._lock:
+            # Every slot is visited once even when many ticks were missed
+            last = min(current, self._tick + len(self._wheel))
+            while self._tick < last:
+                self._tick += 1
+                slot = self._wheel[self._tick % len(self._wheel)]
+                for entry in [entry for entry in slot if entry.tick <= current]:
+                    slot.discard(entry)
+                    lastCommand = entry.times.get(entry.tic.address)
+                    if lastCommand is not None and now - lastCommand < entry.interval:
+                        self.skipped += 1
+                        self._schedule(entry, lastCommand + entry.interval, current)
+                    else:
+                        due.append(entry)
+                        self._schedule(entry, now + entry.interval, current)
+            self._tick = current
+        return due
+
+    def beat(self, now=None):
+        '''Sends the due heartbeats.'''
+
+        buses = {}
+        for entry in self._due(time.monotonic() if now is None else now):
+            buses.setdefault(entry.key[0], []).append(entry.tic)
+        for bus, tics in buses.items():
+            sent, errors = self._send(bus, tics)
+            with self._lock:
+                self.batches += 1
+                self.sent += sent
+                self.errors += errors
+
+    def _send(self, bus, tics):
+        batch = BusBatch(bus)
+        for tic in tics:
+            batch.device(tic).resetCommandTimeout()
+        try:
+            batch.flush()
+            return len(tics), 0
+        except OSError as error:
+            self._logger.debug('heartbeat: bus transaction failed: %s', error)
+        # The failing device aborts the batch: send the others on their own
+        sent = 0
+        for tic in tics:
+            try:
+                tic.resetCommandTimeout()
+                sent += 1
+            except OSError as error:
+                self._logger.debug('heartbeat: address = %d, error = %s', tic.address, error)
+        return sent, len(tics) - sent
+
+    def _run(self):
+        while not self._stop.wait(self.resolution - (time.monotonic() - self._start) % self.resolution):
+            self.beat()
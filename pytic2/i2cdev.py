@@ -0,0 +1,171 @@
+import ctypes
+import os
+import threading
+
+from smbus2 import i2c_msg
+from smbus2.smbus2 import I2C_M_RD, I2C_RDWR, i2c_rdwr_ioctl_data
+
+from .pyi2c import I2C_RDWR_MAX_MSGS, pyi2c
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Initial size of the buffer of each message slot, enough for any Tic command
+# and a maximal block read
+_SLOT_SIZE = 16
+
+class _Slots():
+    '''Persistent I2C_RDWR ioctl structure: a fixed array of messages with a
+    bound buffer each and the ioctl argument pointing to it.
+
+    The ioctl is given the argument structure itself, as smbus2 does:
+    fcntl.ioctl passes a buffer to the kernel, while an int argument is
+    passed as a C int and cannot hold an address.'''
+
+    def __init__(self):
+        self.array = (i2c_msg * I2C_RDWR_MAX_MSGS)()
+        self.data = i2c_rdwr_ioctl_data(msgs=self.array, nmsgs=0)
+        # Element views are created once so a transaction does not allocate
+        self.msgs = [self.array[i] for i in range(I2C_RDWR_MAX_MSGS)]
+        self.keys = [None] * I2C_RDWR_MAX_MSGS
+        self.buffers = []
+        for msg in self.msgs:
+            buffer = ctypes.create_string_buffer(_SLOT_SIZE)
+            msg.buf = buffer
+            self.buffers.append(buffer)
+
+    def bind(self, index, address, flags, length):
+        msg = self.msgs[index]
+        buffer = self.buffers[index]
+        key = (address, flags, length)
+        if self.keys[index] != key:
+            # Only a slot used for another message is rewritten
+            if length > len(buffer):
+                buffer = self.buffers[index] = ctypes.create_string_buffer(length)
+                msg.buf = buffer
+            msg.addr = address
+            msg.flags = flags
+            msg.len = length
+            self.keys[index] = key
+        return msg, buffer
+
+class I2CDev():
+    '''Linux i2c-dev bus opened directly, without smbus2.SMBus.
+
+    Transactions are sent with an I2C_RDWR ioctl structure that is prepared
+    once per thread and reused instead of being built for every call. The
+    object can replace an SMBus wherever only i2c_rdwr is used; the
+    full saving needs the I2CDevInterface transport, which encodes commands
+    directly in the message slots::
+
+        bus = I2CDev(1)
+        tic = pytic2(bus, 14, interface=I2CDevInterface)
+    '''
+
+    def __init__(self, bus, ioctl=None):
+        '''
+        :param bus: Bus number or path of the i2c-dev device file
+        :param ioctl: Optional replacement of fcntl.ioctl; the device file is
+                      not opened when given, e.g. FakeSMBus.ioctl
+        '''
+        self.path = bus if isinstance(bus, str) else '/dev/i2c-{}'.format(bus)
+        if ioctl is None:
+            if fcntl is None:
+                raise OSError('i2c-dev is only available on Linux')
+            self.fd = os.open(self.path, os.O_RDWR)
+            self.ioctl = fcntl.ioctl
+        else:
+            self.fd = -1
+            self.ioctl = ioctl
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def slots(self):
+        '''Returns the persistent ioctl structure of the calling thread.'''
+
+        try:
+            return self._local.slots
+        except AttributeError:
+            slots = self._local.slots = _Slots()
+            return slots
+
+    def transfer(self, count):
+        '''Sends the first count messages of the slots of the calling thread
+        as one combined transaction.'''
+
+        slots = self.slots()
+        slots.data.nmsgs = count
+        self.ioctl(self.fd, I2C_RDWR, slots.data)
+
+    def i2c_rdwr(self, *i2c_msgs):
+        '''Sends i2c_msg objects as one combined transaction, like
+        SMBus.i2c_rdwr, by copying them into the slots.'''
+
+        if len(i2c_msgs) > I2C_RDWR_MAX_MSGS:
+            raise ValueError('transaction has more than {} messages'.format(I2C_RDWR_MAX_MSGS))
+        slots = self.slots()
+        array = slots.array
+        for index, msg in enumerate(i2c_msgs):
+            if msg is not slots.msgs[index]:
+                array[index] = msg
+                slots.keys[index] = None
+        try:
+            self.transfer(len(i2c_msgs))
+        finally:
+            # Rebind the slot buffers the copied messages replaced
+            for index, msg in enumerate(i2c_msgs):
+                if msg is not slots.msgs[index]:
+                    slots.msgs[index].buf = slots.buffers[index]
+
+class I2CDevInterface(pyi2c):
+    '''Transport plug-compatible with pyi2c for an I2CDev bus.
+
+    Commands and block reads are encoded straight into the persistent message
+    slots of the bus and sent without building any ctypes object.
+    '''
+
+    def __init__(self, bus, metrics=None, retry=None, breaker=None):
+        '''
+        :param bus: I2CDev object, or a bus number or path to open one
+        :param metrics: Optional BusMetrics object recording every transaction
+        :param retry: Optional RetryPolicy for transient errors
+        :param breaker: Optional CircuitBreaker rejecting calls to failing devices
+        '''
+        if not isinstance(bus, I2CDev):
+            bus = I2CDev(bus)
+        super().__init__(bus, metrics, retry, breaker)
+
+    def _message(self, address, flags, length, slot=0):
+        # Every block of a transaction has its write and read in adjacent
+        # slots, so the messages of a transaction are a prefix of the array
+        index = 2 * slot + (1 if flags & I2C_M_RD else 0)
+        if index >= I2C_RDWR_MAX_MSGS:
+            raise ValueError('transaction has more than {} messages'.format(I2C_RDWR_MAX_MSGS))
+        return self.bus.slots().bind(index, address, flags, length)
+
+    def _offsetMessage(self, address, offset, slot=0):
+        write, buffer = self._message(address, 0, len(offset), slot)
+        buffer[:len(offset)] = bytes(offset)
+        return write
+
+    def _send(self, msgs):
+        bus = self.bus
+        slots = bus.slots()
+        if msgs[-1] is slots.msgs[len(msgs) - 1]:
+            # Built by _message: the slots already hold the transaction
+            slots.data.nmsgs = len(msgs)
+            bus.ioctl(bus.fd, I2C_RDWR, slots.data)
+        else:
+            bus.i2c_rdwr(*msgs)
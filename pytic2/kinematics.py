@@ -0,0 +1,53 @@
+import math
+
+def stopTime(velocity, maxDecel):
+    '''Time the Tic needs to stop from a velocity.
+
+    :param velocity: Velocity in microsteps per 10,000 s
+    :param maxDecel: Max deceleration in microsteps per 100 s²
+    :return: Duration in seconds
+    '''
+    if velocity == 0:
+        return 0.0
+    if maxDecel <= 0:
+        return math.inf
+    return abs(velocity) / 1e4 / (maxDecel / 100)
+
+def moveTime(distance, maxSpeed, maxAccel, maxDecel, velocity=0):
+    '''Duration of a move to a target with the trapezoidal speed profile of
+    the Tic's position planner.
+
+    :param distance: Signed distance to the target in microsteps
+    :param maxSpeed: Max speed in microsteps per 10,000 s
+    :param maxAccel: Max acceleration in microsteps per 100 s²
+    :param maxDecel: Max deceleration in microsteps per 100 s²; 0 means
+                     the same as the acceleration
+    :param velocity: Current velocity in microsteps per 10,000 s
+    :return: Duration in seconds
+    '''
+    speed = maxSpeed / 1e4
+    accel = maxAccel / 100
+    decel = (maxDecel or maxAccel) / 100
+    v = velocity / 1e4
+    if distance < 0:
+        distance, v = -distance, -v
+    if distance == 0 and v == 0:
+        return 0.0
+    if speed <= 0 or accel <= 0:
+        return math.inf
+
+    if v < 0:
+        # Moving away from the target: stop first, then move from standstill
+        reverse = v * v / (2 * decel)
+        return -v / decel + moveTime(distance + reverse, maxSpeed, maxAccel, maxDecel)
+    braking = v * v / (2 * decel)
+    if braking >= distance:
+        # Overshoots or just reaches the target while braking
+        return v / decel + moveTime(braking - distance, maxSpeed, maxAccel, maxDecel)
+
+    v = min(v, speed)
+    peak = math.sqrt((2 * distance + v * v / accel) / (1 / accel + 1 / decel))
+    if peak <= speed:
+        return (peak - v) / accel + peak / decel
+    ramps = (speed * speed - v * v) / (2 * accel) + speed * speed / (2 * decel)
+    return (speed - v) / accel + speed / decel + (distance - ramps) / speed
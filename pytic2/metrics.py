@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+import weakref
+
+from smbus2.smbus2 import I2C_M_RD
+
+from .scheduler import wireTime
+
+# Upper bounds of the transaction latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, float('inf'))
+
+class _Shard():
+    '''Aggregates of one thread. Only the owning thread writes to it.'''
+
+    def __init__(self):
+        self.commands = {}
+        self.latency = {}
+        self.bytes = {}
+        self.errors = {}
+        self.busy = 0.0
+        self.wire = 0.0
+
+    def merge(self, other):
+        '''Adds the aggregates of another shard.'''
+
+        for key, count in other.commands.copy().items():
+            self.commands[key] = self.commands.get(key, 0) + count
+        for key, histogram in other.latency.copy().items():
+            merged = self.latency.setdefault(key, [0] * len(LATENCY_BUCKETS) + [0.0])
+            for index, value in enumerate(list(histogram)):
+                merged[index] += value
+        for key, count in other.bytes.copy().items():
+            self.bytes[key] = self.bytes.get(key, 0) + count
+        for key, count in other.errors.copy().items():
+            self.errors[key] = self.errors.get(key, 0) + count
+        self.busy += other.busy
+        self.wire += other.wire
+
+class _ThreadSentinel():
+    '''Held in the thread-local storage only: it is released when its
+    thread ends.'''
+
+def _retireShard(metrics, shard):
+    metrics = metrics()
+    if metrics is not None:
+        metrics._retire(shard)
+
+class BusMetrics():
+    '''Transaction metrics of one I2C bus.
+
+    Pass it to pytic2, pyi2c or BusBatch with metrics=... to record every
+    transaction: commands by device and command byte, a latency histogram
+    per command, bytes on the wire per device, errors by errno, and the
+    estimated bus utilization. Every thread records into its own
+    aggregates, so recording takes no lock; snapshot() and prometheus()
+    merge them. The aggregates of a thread that has ended are folded into
+    one accumulator, so short-lived threads do not add up.
+    '''
+
+    def __init__(self, name='i2c', clock=100000):
+        '''
+        :param name: Value of the bus label in the exported metrics
+        :param clock: Bus clock in Hz, used to estimate the wire time
+        '''
+        self.name = name
+        self.clock = clock
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            sentinel = self._local.sentinel = _ThreadSentinel()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(sentinel, _retireShard, weakref.ref(self), shard)
+            return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._retired.merge(shard)
+            self._shards.remove(shard)
+
+    def record(self, msgs, seconds, errno=None):
+        '''Records one transaction.
+
+        :param msgs: i2c_msg objects of the transaction
+        :param seconds: Duration of the transaction
+        :param errno: errno of the OSError the transaction failed with
+        '''
+        shard = self._shard()
+        first = None
+        for msg in msgs:
+            address = msg.addr
+            shard.bytes[address] = shard.bytes.get(address, 0) + msg.len + 1
+            if msg.flags & I2C_M_RD or msg.len == 0:
+                continue
+            key = (address, msg.buf[0][0])
+            if first is None:
+                first = key
+            shard.commands[key] = shard.commands.get(key, 0) + 1
+            if errno is not None:
+                errorKey = key + (errno,)
+                shard.errors[errorKey] = shard.errors.get(errorKey, 0) + 1
+        if first is not None:
+            histogram = shard.latency.get(first)
+            if histogram is None:
+                histogram = shard.latency[first] = [0] * len(LATENCY_BUCKETS) + [0.0]
+            histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+        shard.busy += seconds
+        shard.wire += wireTime(msgs, self.clock)
+
+    def reset(self):
+        '''Clears all recorded metrics.'''
+
+        with self._lock:
+            for shard in self._shards:
+                shard.__init__()
+            self._retired.__init__()
+            self._start = time.monotonic()
+
+    def snapshot(self):
+        '''Returns the merged metrics as a dictionary.
+
+        commands: count by (address, command)
+        latency: bucket counts (cumulative, as in LATENCY_BUCKETS) and the
+                 sum in seconds by (address, command)
+        bytes: bytes on the wire including address bytes, by address
+        errors: count by (address, command, errno)
+        utilization: estimated wire time / elapsed time
+        busy: measured transaction time / elapsed time
+        '''
+        aggregates = _Shard()
+        with self._lock:
+            elapsed = max(time.monotonic() - self._start, 1e-9)
+            aggregates.merge(self._retired)
+            for shard in self._shards:
+                aggregates.merge(shard)
+        histograms = {}
+        for key, merged in aggregates.latency.items():
+            cumulative, total = [], 0
+            for count in merged[:-1]:
+                total += count
+                cumulative.append(total)
+            histograms[key] = {'buckets': dict(zip(LATENCY_BUCKETS, cumulative)),
+                               'count': total, 'sum': merged[-1]}
+        return {'bus': self.name, 'elapsed': elapsed, 'commands': aggregates.commands,
+                'latency': histograms, 'bytes': aggregates.bytes, 'errors': aggregates.errors,
+                'wireSeconds': aggregates.wire, 'utilization': aggregates.wire / elapsed,
+                'busy': aggregates.busy / elapsed}
+
+    def prometheus(self, prefix='pytic2_i2c'):
+        '''Returns the metrics in the Prometheus text exposition format.'''
+
+        snapshot = self.snapshot()
+        bus = self.name
+        lines = []
+
+        def header(name, kind, text):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, text))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+
+        header('commands_total', 'counter', 'Commands sent by device and command byte.')
+        for (address, command), count in sorted(snapshot['commands'].items()):
+            lines.append('{}_commands_total{{bus="{}",address="{}",command="0x{:02x}"}} {}'.format(
+                prefix, bus, address, command, count))
+        header('transaction_seconds', 'histogram', 'Transaction latency by first device and command.')
+        for (address, command), histogram in sorted(snapshot['latency'].items()):
+            labels = 'bus="{}",address="{}",command="0x{:02x}"'.format(bus, address, command)
+            for bound, count in histogram['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{}_transaction_seconds_bucket{{{},le="{}"}} {}'.format(prefix, labels, le, count))
+            lines.append('{}_transaction_seconds_sum{{{}}} {!r}'.format(prefix, labels, histogram['sum']))
+            lines.append('{}_transaction_seconds_count{{{}}} {}'.format(prefix, labels, histogram['count']))
+        header('bytes_total', 'counter', 'Bytes on the wire including address bytes, by device.')
+        for address, count in sorted(snapshot['bytes'].items()):
+            lines.append('{}_bytes_total{{bus="{}",address="{}"}} {}'.format(prefix, bus, address, count))
+        header('errors_total', 'counter', 'Failed commands by device, command byte and errno.')
+        for (address, command, errno), count in sorted(snapshot['errors'].items()):
+            lines.append('{}_errors_total{{bus="{}",address="{}",command="0x{:02x}",errno="{}"}} {}'.format(
+                prefix, bus, address, command, errno, count))
+        header('wire_seconds_total', 'counter', 'Estimated time the bus was occupied.')
+        lines.append('{}_wire_seconds_total{{bus="{}"}} {!r}'.format(prefix, bus, snapshot['wireSeconds']))
+        header('utilization', 'gauge', 'Estimated bus utilization since the start or last reset.')
+        lines.append('{}_utilization{{bus="{}"}} {!r}'.format(prefix, bus, snapshot['utilization']))
+        return '\n'.join(lines) + '\n'
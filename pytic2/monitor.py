@@ -0,0 +1,257 @@
+'''Streams variables of Tics on one or more buses as JSON Lines or CSV.
+
+Run with ``python -m pytic2 monitor``. Every sample reads the span of the
+variable block covering the selected variables, with maximal block reads
+and all devices of a bus in one BusBatch; the buses are read in parallel.
+Devices are given as BUS:ADDRESS, or as BUS to find the Tics on that bus.
+'''
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .discovery import discover
+from .pyi2c import BusBatch
+from .pytic2 import *
+from .pytic2 import _compileLayout
+
+DEFAULT_VARIABLES = ('operationState', 'errorStatus', 'targetPosition', 'currentPosition', 'currentVelocity')
+
+_VARIABLES = {variable.name: variable for variable in TIC_VARIABLES}
+
+class _Span():
+    '''Decoder of the selected variables from one span of the variable block.'''
+
+    def __init__(self, names):
+        variables = [_VARIABLES[name] for name in names]
+        self.offset = min(variable.offset for variable in variables)
+        self.length = max(variable.offset + struct.calcsize('<' + variable.format) for variable in variables) - self.offset
+        layout = sorted(((variable.name, variable.offset - self.offset, variable.format) for variable in variables),
+                        key=lambda entry: entry[1])
+        self.struct = _compileLayout(layout)
+        self.names = tuple(name for name, _, _ in layout)
+
+class Monitor():
+    '''Samples selected variables of many devices and writes one record per
+    device and sample.'''
+
+    def __init__(self, devices, variables=DEFAULT_VARIABLES, changed=False):
+        '''
+        :param devices: (bus number, pytic2 object) pairs
+        :param variables: TicSnapshot field names of the variables
+        :param changed: Only write the variables that changed since the
+                        previous record of the device
+        '''
+        unknown = [name for name in variables if name not in _VARIABLES]
+        if unknown:
+            raise ValueError('unknown variables: {}'.format(', '.join(unknown)))
+        self.span = _Span(variables)
+        self.variables = tuple(variables)
+        self.changed = changed
+        self.devices = list(devices)
+        self._buses = {}
+        for number, tic in self.devices:
+            self._buses.setdefault(tic._interface.bus, []).append((number, tic))
+        self._last = {}
+        self.samples = 0
+        self.errors = 0
+
+    def _readBus(self, devices):
+        span = self.span
+        bus = devices[0][1]._interface.bus
+        batch = BusBatch(bus)
+        futures = [batch.device(tic).getVariableBlock(span.offset, span.length, span.struct)
+                   for _, tic in devices]
+        try:
+            batch.flush()
+        except OSError:
+            pass
+        results = []
+        for (number, tic), future in zip(devices, futures):
+            error = future.exception()
+            if error is not None:
+                # The failing device aborts the batch: read the others on their own
+                try:
+                    results.append((number, tic, tic.getVariableBlock(span.offset, span.length, span.struct), None))
+                except OSError as error:
+                    results.append((number, tic, None, error))
+            else:
+                results.append((number, tic, future.result(), None))
+        return results
+
+    def sample(self, executor=None):
+        '''Reads all devices once.
+
+        :param executor: Optional executor reading the buses in parallel
+        :return: A list of records: dictionaries with the time, bus number,
+                 address and the variables, or an error message
+        '''
+        timestamp = time.time()
+        groups = list(self._buses.values())
+        if executor is None or len(groups) < 2:
+            results = [result for devices in groups for result in self._readBus(devices)]
+        else:
+            results = [result for group in executor.map(self._readBus, groups) for result in group]
+        self.samples += 1
+        records = []
+        for number, tic, values, error in results:
+            record = {'time': round(timestamp, 6), 'bus': number, 'address': tic.address}
+            key = (number, tic.address)
+            if error is not None:
+                self.errors += 1
+                self._last.pop(key, None)
+                record['error'] = os.strerror(error.errno) if error.errno else str(error)
+                records.append(record)
+                continue
+            current = dict(zip(self.span.names, values))
+            previous = self._last.get(key)
+            self._last[key] = current
+            fields = [name for name in self.variables
+                      if not self.changed or previous is None or previous[name] != current[name]]
+            if not fields:
+                continue
+            record.update((name, current[name]) for name in fields)
+            records.append(record)
+        return records
+
+    def run(self, write, rate=10.0, duration=None, count=None):
+        '''Samples at a fixed rate until the duration or the number of
+        samples is reached, or forever.
+
+        :param write: Callable receiving the records of each sample
+        :param rate: Samples per second; 0 samples as fast as possible
+        :return: The number of samples and the elapsed time in seconds
+        '''
+        period = 1.0 / rate if rate else 0.0
+        start = time.monotonic()
+        tick = 0
+        with ThreadPoolExecutor(max_workers=max(1, len(self._buses))) as executor:
+            while count is None or tick < count:
+                now = time.monotonic()
+                if duration is not None and now - start >= duration:
+                    break
+                delay = start + tick * period - now
+                if delay > 0:
+                    time.sleep(delay)
+                write(self.sample(executor))
+                tick += 1
+                # Skip the periods that have already passed instead of bunching samples
+                if period:
+                    tick = max(tick, int((time.monotonic() - start) / period))
+        return self.samples, time.monotonic() - start
+
+def _parseDevice(text):
+    bus, _, address = text.partition(':')
+    try:
+        return int(bus), int(address, 0) if address else None
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid device {!r}, expected BUS:ADDRESS or BUS'.format(text))
+
+def _openDevices(specs, args):
+    if args.emulate:
+        from .emulator import FakeSMBus, TicEmulator
+        buses = {}
+        for number, address in specs:
+            bus = buses.setdefault(number, FakeSMBus())
+            bus.add(TicEmulator(address if address is not None else 14))
+        factory = buses.__getitem__
+    elif args.transport == 'i2cdev':
+        from .i2cdev import I2CDev
+        factory = I2CDev
+    else:
+        from smbus2 import SMBus as factory
+    options = {}
+    if args.transport == 'i2cdev' and not args.emulate:
+        from .i2cdev import I2CDevInterface
+        options['interface'] = I2CDevInterface
+    buses = {number: factory(number) for number in sorted({number for number, _ in specs})}
+    devices = []
+    scan = sorted(number for number in buses if (number, None) in specs)
+    if scan:
+        registry = discover({number: buses[number] for number in scan}, cachePath=args.cache, **options)
+        devices.extend((number, tic) for number in scan for tic in registry.tics(number))
+    for number, address in specs:
+        if address is not None and number not in scan:
+            devices.append((number, pytic2(buses[number], address, **options)))
+    return sorted(devices, key=lambda device: (device[0], device[1].address))
+
+def _writer(args, variables, out):
+    if args.format == 'csv':
+        fields = ['time', 'bus', 'address'] + list(variables) + ['error']
+        writer = csv.DictWriter(out, fields, lineterminator='\n')
+        writer.writeheader()
+
+        def write(records):
+            writer.writerows(records)
+            out.flush()
+    else:
+        def write(records):
+            for record in records:
+                out.write(json.dumps(record, separators=(',', ':')))
+                out.write('\n')
+            out.flush()
+    return write
+
+def _discardOutput():
+    # The reader has gone away, e.g. piped into head: keep the interpreter
+    # from failing again when it flushes stdout at exit
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+def main(argv=None, prog='python -m pytic2 monitor'):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[0])
+    parser.add_argument('devices', nargs='*', type=_parseDevice, metavar='BUS[:ADDRESS]',
+                        help='device as bus number and address, or a bus number to find its devices')
+    parser.add_argument('-v', '--variables', default=','.join(DEFAULT_VARIABLES),
+                        help='comma separated variable names, or "all" (default: %(default)s)')
+    parser.add_argument('-r', '--rate', type=float, default=10.0, help='samples per second, 0 for as fast as possible')
+    parser.add_argument('-d', '--duration', type=float, help='stop after this many seconds')
+    parser.add_argument('-n', '--count', type=int, help='stop after this many samples')
+    parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl', help='output format')
+    parser.add_argument('-c', '--changed', action='store_true', help='only print the variables that changed')
+    parser.add_argument('-t', '--transport', choices=('smbus', 'i2cdev'), default='smbus',
+                        help='smbus2 or the direct i2c-dev transport')
+    parser.add_argument('--cache', help='discovery cache file for buses given without address')
+    parser.add_argument('--emulate', action='store_true', help='monitor emulated Tics instead of hardware')
+    parser.add_argument('--list', action='store_true', help='list the variables and their units and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        try:
+            for variable in TIC_VARIABLES:
+                print('{:<24} {}'.format(variable.name, variable.unit or ''))
+        except BrokenPipeError:
+            _discardOutput()
+        return 0
+    if not args.devices:
+        parser.error('no devices given')
+    variables = [variable.name for variable in TIC_VARIABLES] if args.variables == 'all' \
+        else [name.strip() for name in args.variables.split(',') if name.strip()]
+    unknown = [name for name in variables if name not in _VARIABLES]
+    if unknown:
+        parser.error('unknown variables: {}'.format(', '.join(unknown)))
+
+    devices = _openDevices(args.devices, args)
+    if not devices:
+        print('no devices found', file=sys.stderr)
+        return 1
+    monitor = Monitor(devices, variables, args.changed)
+    write = _writer(args, variables, sys.stdout)
+    try:
+        samples, elapsed = monitor.run(write, args.rate, args.duration, args.count)
+    except KeyboardInterrupt:
+        samples, elapsed = monitor.samples, None
+    except BrokenPipeError:
+        _discardOutput()
+        return 0
+    if elapsed is not None and (args.duration is not None or args.count is not None):
+        print('{} samples of {} devices in {:.3f} s: {:.1f} samples/s, {} errors'.format(
+            samples, len(devices), elapsed, samples / elapsed if elapsed else 0.0, monitor.errors),
+            file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,201 @@
+import copy
+import ctypes
 import logging
+import struct
+import threading
+import time
+import weakref
+from concurrent.futures import Future
 from smbus2 import i2c_msg
+from smbus2.smbus2 import I2C_M_RD
+
+# Maximum number of messages the kernel accepts in a single I2C_RDWR ioctl
+I2C_RDWR_MAX_MSGS = 42
+
+# Time of the last command sent to each device: bus -> {address: time.monotonic()}
+_commandTimes = weakref.WeakKeyDictionary()
+_commandTimesLock = threading.Lock()
+
+def commandTimes(bus):
+    '''Returns the dictionary with the time.monotonic() of the last command
+    written to each address of a bus by any pyi2c object. Reads are not
+    commands: they do not restart the command timeout of a Tic.'''
+
+    with _commandTimesLock:
+        try:
+            times = _commandTimes.get(bus)
+            if times is None:
+                times = _commandTimes[bus] = {}
+        except TypeError:
+            # The bus cannot be weakly referenced: the times are not shared
+            times = {}
+        return times
+
+_QUICK = struct.Struct('<B')
+_WRITE7BIT = struct.Struct('<BB')
+_WRITE32BIT = struct.Struct('<BI')
 
 class pyi2c():
-    def __init__(self, bus):
+    def __init__(self, bus, metrics=None, retry=None, breaker=None):
+        '''
+        :param bus: SMBus object
+        :param metrics: Optional BusMetrics object recording every transaction
+        :param retry: Optional RetryPolicy for transient errors
+        :param breaker: Optional CircuitBreaker rejecting calls to failing devices
+        '''
         self.bus = bus
+        self.metrics = metrics
+        self.retry = retry
+        self.breaker = breaker
         self._logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        self._commandTimes = commandTimes(bus)
+
+    def _message(self, address, flags, length, slot=0):
+        '''Returns a preallocated message and its buffer for the device.
+
+        The messages are reused for every transaction of the calling thread,
+        so encoding a command does not allocate.
+
+        :param slot: Index of the message within one transaction
+        '''
+        try:
+            messages = self._local.messages
+        except AttributeError:
+            messages = self._local.messages = {}
+        key = (address, flags, length, slot)
+        entry = messages.get(key)
+        if entry is None:
+            buffer = ctypes.create_string_buffer(length)
+            entry = messages[key] = (i2c_msg(addr=address, flags=flags, len=length, buf=buffer), buffer)
+        return entry
+
+    def _offsetMessage(self, address, offset, slot=0):
+        if len(offset) != 2:
+            return i2c_msg.write(address, offset)
+        write, buffer = self._message(address, 0, 2, slot)
+        _WRITE7BIT.pack_into(buffer, 0, offset[0], offset[1])
+        return write
+
+    def _send(self, msgs):
+        self.bus.i2c_rdwr(*msgs)
+
+    def _rdwr(self, *msgs):
+        metrics = self.metrics
+        if metrics is None:
+            self._send(msgs)
+            return
+        start = time.perf_counter()
+        try:
+            self._send(msgs)
+        except OSError as error:
+            metrics.record(msgs, time.perf_counter() - start, error.errno)
+            raise
+        metrics.record(msgs, time.perf_counter() - start)
+
+    def _transfer(self, *msgs):
+        '''Sends the messages as one combined i2c transaction.'''
+
+        if self.retry is None and self.breaker is None:
+            self._rdwr(*msgs)
+        else:
+            self._transferGuarded(msgs)
+
+    def _transferGuarded(self, msgs):
+        address = msgs[0].addr
+        breaker = self.breaker
+        if breaker is not None:
+            breaker.allow(address)
+        try:
+            self._retryTransfer(msgs, address, breaker)
+        finally:
+            if breaker is not None:
+                # Ends a half-open trial even when something else than an
+                # OSError escaped
+                breaker.release(address)
+
+    def _retryable(self, transactions):
+        '''Tells whether every write of the transactions may be repeated.'''
+
+        retry = self.retry
+        for msgs in transactions:
+            read = any(msg.flags & I2C_M_RD for msg in msgs)
+            if not all(retry.retryable(msg.buf[0][0], read) for msg in msgs if not msg.flags & I2C_M_RD):
+                return False
+        return True
+
+    def _retryTransfer(self, msgs, address, breaker, transactions=None):
+        '''Sends the messages, retrying transient errors.
+
+        :param transactions: The transactions the messages are made of when
+                             they combine several, to judge each on its own
+        '''
+        retry = self.retry
+        attempt = 1
+        deadline = None
+        while True:
+            try:
+                self._rdwr(*msgs)
+                break
+            except OSError as error:
+                if retry is None or error.errno not in retry.errnos or attempt >= retry.attempts:
+                    failed = True
+                else:
+                    if deadline is None:
+                        deadline = time.monotonic() + retry.budget
+                    delay = retry.delay(attempt)
+                    failed = (not self._retryable(transactions or (msgs,))
+                              or time.monotonic() + delay >= deadline)
+                if failed:
+                    if breaker is not None:
+                        breaker.failure(address)
+                    raise
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug('retry %d: address= %d, errno = %d', attempt, address, error.errno)
+                time.sleep(delay)
+                attempt += 1
+        if breaker is not None:
+            breaker.success(address)
+
+    def _commandSent(self, address):
+        self._commandTimes[address] = time.monotonic()
+
+    def _whenSent(self, callback):
+        '''Calls callback once the commands written so far have reached the
+        bus: at once here, after a successful flush in a BusBatch.'''
+        callback()
+
+    def _result(self, reads, decode):
+        '''Collects the data of the read messages of a completed transaction.
+
+        :param reads: (buffer, length) pairs of the read messages
+        :param decode: Function applied to the data as bytes, or an object
+                       with an unpack_from method such as a struct.Struct,
+                       which is applied to the read buffer without copying
+        '''
+        if hasattr(decode, 'unpack_from'):
+            if len(reads) == 1:
+                return decode.unpack_from(reads[0][0])
+            return decode.unpack_from(self._gather(reads))
+        if len(reads) == 1:
+            data = ctypes.string_at(*reads[0])
+        else:
+            data = b''.join(ctypes.string_at(buffer, length) for buffer, length in reads)
+        if decode is not None:
+            return decode(data)
+        return list(data)
+
+    def _gather(self, reads):
+        # Concatenates the reads into a buffer reused by the calling thread
+        size = sum(length for _, length in reads)
+        block = getattr(self._local, 'block', None)
+        if block is None or len(block) < size:
+            block = self._local.block = ctypes.create_string_buffer(max(size, 128))
+        position = 0
+        for buffer, length in reads:
+            ctypes.memmove(ctypes.byref(block, position), buffer, length)
+            position += length
+        return block
 
     def writeQuick(self, address, cmd):
         '''Quick command: no data
@@ -12,10 +203,12 @@ class pyi2c():
         :param address: Address of the i2c slave device
         :param cmd: 8-bit command
         '''
-        command = [cmd]
-        write = i2c_msg.write(address, command)
-        self.bus.i2c_rdwr(write)
-        self._logger.debug('writeQuick: address= %d, cmd = %s', address, cmd)         
+        write, buffer = self._message(address, 0, 1)
+        _QUICK.pack_into(buffer, 0, cmd)
+        self._transfer(write)
+        self._commandSent(address)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('writeQuick: address= %d, cmd = %s', address, cmd)         
 
     def write7Bit(self, address, cmd, target):
         '''7-bit write command: writes a 7-bit data value
@@ -24,10 +217,12 @@ class pyi2c():
         :param cmd: 8-bit command
         :param target: 7-bit data value
         '''
-        command = [cmd, target >> 0 & 0xFF]
-        write = i2c_msg.write(address, command)
-        self.bus.i2c_rdwr(write)
-        self._logger.debug('write7Bit: address= %d, cmd = %s, target = %d', address, cmd, target)                
+        write, buffer = self._message(address, 0, 2)
+        _WRITE7BIT.pack_into(buffer, 0, cmd, target & 0xFF)
+        self._transfer(write)
+        self._commandSent(address)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('write7Bit: address= %d, cmd = %s, target = %d', address, cmd, target)                
 
     def write32Bit(self, address, cmd, target):
         '''32-bit write command: writes a 32-bit data value
@@ -36,28 +231,176 @@ class pyi2c():
         :param cmd: 8-bit command
         :param target: 32-bit data value
         '''        
-        command = [cmd,
-            target >> 0 & 0xFF,
-            target >> 8 & 0xFF,
-            target >> 16 & 0xFF,
-            target >> 24 & 0xFF]
-        write = i2c_msg.write(address, command)
-        self.bus.i2c_rdwr(write)
-        self._logger.debug('write32Bit: address= %d, cmd = %s, target = %d', address, cmd, target)          
-
-    def readBlock(self, address, offset, length):
+        write, buffer = self._message(address, 0, 5)
+        _WRITE32BIT.pack_into(buffer, 0, cmd, target & 0xFFFFFFFF)
+        self._transfer(write)
+        self._commandSent(address)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('write32Bit: address= %d, cmd = %s, target = %d', address, cmd, target)          
+
+    def readBlock(self, address, offset, length, decode=None):
         '''Block read command: reads a block of data;
         The block starts from the specified offset and can have a variable length.
 
         :param address: Address of the i2c slave device
         :param offset: The block offset
         :param length: The block length
-        :return: A list of data
+        :param decode: Optional decoder of the data, see _result
+        :return: A list of data, or the decoded data
+        '''
+
+        write = self._offsetMessage(address, offset)
+        read, buffer = self._message(address, I2C_M_RD, length)
+        self._transfer(write, read)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('readBlock: address= %d, offset = %s, length = %d', address, offset, length) 
+
+        return self._result(((buffer, length),), decode)
+
+    def readBlocks(self, address, blocks, decode=None):
+        '''Multi-block read command: reads several blocks of data in one
+        combined transaction and concatenates them.
+
+        :param address: Address of the i2c slave device
+        :param blocks: Sequence of (offset, length) pairs, see readBlock
+        :param decode: Optional decoder of the data, see _result
+        :return: A list of data, or the decoded data
+        '''
+
+        msgs = []
+        reads = []
+        for slot, (offset, length) in enumerate(blocks):
+            read, buffer = self._message(address, I2C_M_RD, length, slot)
+            msgs.append(self._offsetMessage(address, offset, slot))
+            msgs.append(read)
+            reads.append((buffer, length))
+        self._transfer(*msgs)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('readBlocks: address= %d, blocks = %d', address, len(reads))
+
+        return self._result(reads, decode)
+
+class BusBatch(pyi2c):
+    '''Collects commands and reads for any number of devices on one bus and
+    sends them as few I2C_RDWR ioctls as possible when flushed.
+
+    Reads return a concurrent.futures.Future which is resolved by flush().
+    Used as a context manager the batch is flushed on exit::
+
+        with BusBatch(bus) as b:
+            b.device(tic1).setTargetPosition(100)
+            position = b.device(tic2).getCurrentPosition()
+        print(position.result())
+
+    The ioctls are retried with the RetryPolicy of the batch, or else of
+    the first device with one, when every write they contain may be
+    repeated. The CircuitBreaker is not consulted: one failing device
+    fails the whole ioctl, so a failure cannot be told apart by device.
+    Callers that read the devices on their own after a failed flush go
+    through the breaker of each device.
+    '''
+
+    def __init__(self, bus, maxMessages=I2C_RDWR_MAX_MSGS, metrics=None, retry=None):
+        super().__init__(bus, metrics, retry)
+        self.maxMessages = maxMessages
+        self._transactions = []
+        self._pending = []
+        self._commands = []
+        self._callbacks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.cancel()
+
+    def __len__(self):
+        return len(self._transactions)
+
+    def _message(self, address, flags, length, slot=0):
+        # Queued messages must stay intact until the flush
+        buffer = ctypes.create_string_buffer(length)
+        return i2c_msg(addr=address, flags=flags, len=length, buf=buffer), buffer
+
+    def _transfer(self, *msgs):
+        if len(msgs) > self.maxMessages:
+            raise ValueError('transaction has more than {} messages'.format(self.maxMessages))
+        self._transactions.append(msgs)
+
+    def _commandSent(self, address):
+        self._commands.append(address)
+
+    def _whenSent(self, callback):
+        self._callbacks.append(callback)
+
+    def _result(self, reads, decode):
+        future = Future()
+        self._pending.append((future, reads, decode))
+        return future
+
+    def device(self, tic):
+        '''Returns a view of a pytic2 object whose commands and getters are
+        queued in this batch. Getters return futures.
+
+        :param tic: pytic2 object on the same bus as the batch
         '''
+        if tic._interface.bus is not self.bus:
+            raise ValueError('device {} is not on the bus of this batch'.format(tic.address))
+        if self.metrics is None:
+            self.metrics = tic._interface.metrics
+        if self.retry is None:
+            self.retry = tic._interface.retry
+        view = copy.copy(tic)
+        view._interface = self
+        return view
+
+    def flush(self):
+        '''Sends all queued transactions, packing as many as possible into
+        each I2C_RDWR ioctl, and resolves the futures of the queued reads.'''
+
+        transactions, self._transactions = self._transactions, []
+        pending, self._pending = self._pending, []
+        commands, self._commands = self._commands, []
+        callbacks, self._callbacks = self._callbacks, []
+        try:
+            msgs = []
+            combined = []
+            for transaction in transactions:
+                if len(msgs) + len(transaction) > self.maxMessages:
+                    self._retryTransfer(msgs, msgs[0].addr, None, combined)
+                    msgs = []
+                    combined = []
+                msgs.extend(transaction)
+                combined.append(transaction)
+            if msgs:
+                self._retryTransfer(msgs, msgs[0].addr, None, combined)
+        except Exception as error:
+            for future, _, _ in pending:
+                future.set_exception(error)
+            raise
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug('flush: transactions = %d', len(transactions))
+        now = time.monotonic()
+        for address in commands:
+            self._commandTimes[address] = now
+        for callback in callbacks:
+            callback()
+
+        for future, reads, decode in pending:
+            try:
+                future.set_result(super()._result(reads, decode))
+            except Exception as error:
+                future.set_exception(error)
 
-        write = i2c_msg.write(address, offset)
-        read = i2c_msg.read(address, length)
-        self.bus.i2c_rdwr(write, read)
-        self._logger.debug('readBlock: address= %d, offset = %d, length = %d', address, offset, length) 
+    def cancel(self):
+        '''Drops all queued transactions and cancels their futures.'''
 
-        return list(read)        
\ No newline at end of file
+        self._transactions = []
+        self._commands = []
+        self._callbacks = []
+        pending, self._pending = self._pending, []
+        for future, _, _ in pending:
+            future.cancel()
@@ -1,5 +1,11 @@
+import collections
 import logging
+import math
+import struct
+import time
+import weakref
 
+from .kinematics import moveTime, stopTime
 from .pyi2c import pyi2c
 
 TIC_SETTARGETPOSITION_CMD = 0xE0
@@ -22,6 +28,7 @@ TIC_SETCURRENTLIMIT_CMD =  0x91
 TIC_SETDECAYMODE_CMD = 0x92
 TIC_GETVARIABLE_CMD = 0xA1
 TIC_GETERROROCCURRED_CMD = 0xA2
+TIC_GETSETTING_CMD = 0xA8
 
 TIC_OPERATIONSTATE_VAR = 0x00
 TIC_MISCFLAG1_VAR = 0x01
@@ -57,207 +64,98 @@ TIC_INPUTAVAR_VAR = 0x4D
 TIC_INPUTHYST_VAR = 0x4F
 TIC_INPUTSCALE_VAR = 0x51
 
-class pytic2():
-    def __init__(self, bus, address):
-        self._interface = pyi2c(bus)
-        self.address = address 
-        self._logger = self._initialize_logger()     
-
-    def _initialize_logger(self):
-        # - Logging - 
-        self._log_level = logging.DEBUG
-        _logger = logging.getLogger('PyTic2({})'.format(self.address))
-        _logger.setLevel(self._log_level)
-        # _formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        # # Console Logging
-        # _ch = logging.StreamHandler()
-        # _ch.setLevel(self._log_level)
-        # _ch.setFormatter(_formatter)
-        # _logger.addHandler(_ch)
-        return _logger        
-
-    def setTargetPosition(self, target):
-        '''Sets the target position in microsteps.
-
-           target position, signed integer
-           Range: −2,147,483,648 to +2,147,483,647 = −0x8000 0000 to +0x7FFF FFFF
-           Units: microsteps'''
-
-        self._interface.write32Bit(self.address, TIC_SETTARGETPOSITION_CMD, target)
-
-    def setTargetVelocity(self, target):
-        '''Sets the target velocity in microsteps per 10,000 seconds.
-  
-           target velocity, signed integer
-           Range: −500,000,000 to +500,000,000
-           Units: microsteps per 10,000 s'''
-
-        self._interface.write32Bit(self.address,TIC_SETTARGETVELOCITY_CMD, target)
-
-    def haltAndSetPosition(self, target):
-        '''Stops the motor abruptly without respecting the deceleration limit and
-           sets the “Current position” variable, which represents what position
-           the Tic currently thinks the motor is in.
-  
-           current position, signed integer
-           Range: −2,147,483,648 to +2,147,483,647 = −0x8000 0000 to +0x7FFF FFFF
-           Units: microsteps'''
-
-        self._interface.write32Bit(self.address,TIC_HALTANDSETPOSITION_CMD, target)
-
-    def haltAndHold(self):
-        '''Stops the motor abruptly without respecting the deceleration limit.'''
-
-        self._interface.writeQuick(self.address,TIC_HALTANDHOLD_CMD)
-
-    def goHome(self, direction):
-        '''Starts the Tic’s homing procedure.
-  
-           0: Go home in the reverse direction
-           1: Go home in the forward direction'''
-
-        self._interface.write7Bit(self.address,TIC_GOHOME_CMD, direction)
-
-    def resetCommandTimeout(self):
-        '''If the command timeout is enabled, this command resets it and prevents 
-           the “command timeout” error from happening for some time.'''
-
-        self._interface.writeQuick(self.address,TIC_RESETCOMMANDTIMEOUT_CMD)
-
-    def deenergize(self):
-        '''Causes the Tic to de-energize the stepper motor coils by disabling its 
-           stepper motor driver.'''
-
-        self._interface.writeQuick(self.address,TIC_DEENERGIZE_CMD)
-
-    def energize(self):
-        '''Requests for the Tic to energize the stepper motor coils by enabling its 
-           stepper motor driver.'''
-        self._logger.debug('energize - {}'.format(self.address))
-        self._interface.writeQuick(self.address,TIC_ENERGIZE_CMD)
-
-    def exitSafeStart(self):
-        '''Causes the “safe start violation” error to be cleared for 200 ms. If there 
-           are no other errors, this allows the system to start up.'''
-
-        self._interface.writeQuick(self.address,TIC_EXITSAFESTART_CMD)
-
-    def reset(self):
-        '''Makes the Tic forget most parts of its current state.'''
-
-        self._interface.writeQuick(self.address,TIC_RESET_CMD)
-
-    def clearDriveError(self):
-        '''Attempts to clear a motor driver error.'''
-
-        self._interface.writeQuick(self.address,TIC_CLEARDRIVEERROR_CMD)
-
-    def setMaxSpeed(self, target):
-        '''Temporarily sets the Tic’s maximum allowed motor speed in units of 
-           steps per 10,000 seconds'''
-
-        self._interface.write32Bit(self.address,TIC_SETMAXSPEED_CMD, target)
-
-    def setStartingSpeed(self, target):
-        '''Temporarily sets the Tic’s starting speed in units of steps per 10,000 seconds'''
-
-        self._interface.write32Bit(self.address,TIC_SETSTARTTINGSPEED_CMD, target)
-
-    def setMaxAccel(self, target):
-        '''Temporarily sets the Tic’s maximum allowed motor acceleration in units of 
-           steps per second per 100 seconds.'''
-
-        self._interface.write32Bit(self.address,TIC_SETMAXACCEL_CMD, target)
-
-    def setMaxDecel(self, target: int):
-        '''Temporarily sets the Tic’s maximum allowed motor deceleration in units of
-           steps per second per 100 seconds'''
-
-        self._interface.write32Bit(self.address,TIC_SETMAXDECEL_CMD, target)
-
-    def setStepMode(self, target):
-        '''Temporarily sets the step mode (also known as microstepping mode) of 
-           the driver on the Tic'''
-
-        self._interface.write7Bit(self.address,TIC_SETSTEPMODE_CMD, target)
-
-    def setCurrentLimit(self, target):
-        '''Temporarily sets the stepper motor coil current limit of the driver on 
-           the Tic in units of 32 milliamps.'''
-
-        self._interface.write7Bit(self.address,TIC_SETCURRENTLIMIT_CMD, target)
-
-    def setDecayMode(self, target):
-        '''Temporarily sets the decay mode of the driver on the Tic.'''
-
-        self._interface.write7Bit(self.address,TIC_SETDECAYMODE_CMD, target)
-
-    def getVariable(self, offset, length):
-        '''Gets one or more variables from the Tic.'''
-
-        return self._interface.readBlock(self.address, [TIC_GETVARIABLE_CMD, offset ], length)
- 
-    def getErrorsOccurred(self, offset, length):
-        '''Identical to the getVariable command, except that it also clears 
-           the “Errors occurred” variable.'''
-
-        return self._interface.readBlock(self.address, [TIC_GETERROROCCURRED_CMD, offset ], length)
-
-    def _getVariable8(self, offset):
-        b = self.getVariable(offset, 1)
-
-        return b[0]
-
-    def _getVariable16(self, offset):
-        b = self.getVariable(offset, 2)
-
-        return b[0] + (b[1] << 8)
-
-    def _getVariable32(self, offset):
-        b = self.getVariable(offset, 4)
-
-        return b[0] + (b[1] << 8) + (b[2] << 16) + (b[3] << 24)
-
-    def _getVariable32s(self, offset):
-        b = self.getVariable(offset, 4)
-        value = b[0] + (b[1] << 8) + (b[2] << 16) + (b[3] << 24)
-        if value >= (1 << 31):
-            value -= (1 << 32)
-
-        return value  
-
-    def getOperationState(self):
+TIC_CONTROLMODE_SETTING = 0x01
+TIC_NEVERSLEEP_SETTING = 0x02
+TIC_DISABLESAFESTART_SETTING = 0x03
+TIC_IGNOREERRLINEHIGH_SETTING = 0x04
+TIC_SERIALBAUDRATEGENERATOR_SETTING = 0x05
+TIC_SERIALDEVICENUMBER_SETTING = 0x07
+TIC_AUTOCLEARDRIVERERROR_SETTING = 0x08
+TIC_COMMANDTIMEOUT_SETTING = 0x09
+TIC_SERIALCRCFORCOMMANDS_SETTING = 0x0B
+TIC_LOWVINTIMEOUT_SETTING = 0x0C
+TIC_LOWVINSHUTOFFVOLTAGE_SETTING = 0x0E
+TIC_LOWVINSTARTUPVOLTAGE_SETTING = 0x10
+TIC_HIGHVINSHUTOFFVOLTAGE_SETTING = 0x12
+TIC_VINCALIBRATION_SETTING = 0x14
+TIC_RCMAXPULSEPERIOD_SETTING = 0x16
+TIC_RCBADSIGNALTIMEOUT_SETTING = 0x18
+TIC_RCCONSECUTIVEGOODPULSES_SETTING = 0x1A
+TIC_INVERTMOTORDIRECTION_SETTING = 0x1B
+TIC_INPUTERRORMIN_SETTING = 0x1C
+TIC_INPUTERRORMAX_SETTING = 0x1E
+TIC_INPUTSCALINGDEGREE_SETTING = 0x20
+TIC_INPUTINVERT_SETTING = 0x21
+TIC_INPUTMIN_SETTING = 0x22
+TIC_INPUTNEUTRALMIN_SETTING = 0x24
+TIC_INPUTNEUTRALMAX_SETTING = 0x26
+TIC_INPUTMAX_SETTING = 0x28
+TIC_OUTPUTMIN_SETTING = 0x2A
+TIC_INPUTAVERAGINGENABLED_SETTING = 0x2E
+TIC_INPUTHYSTERESIS_SETTING = 0x2F
+TIC_CURRENTLIMITDURINGERROR_SETTING = 0x31
+TIC_OUTPUTMAX_SETTING = 0x32
+TIC_SWITCHPOLARITYMAP_SETTING = 0x36
+TIC_ENCODERPOSTSCALER_SETTING = 0x37
+TIC_SCLCONFIG_SETTING = 0x3B
+TIC_SDACONFIG_SETTING = 0x3C
+TIC_TXCONFIG_SETTING = 0x3D
+TIC_RXCONFIG_SETTING = 0x3E
+TIC_RCCONFIG_SETTING = 0x3F
+TIC_CURRENTLIMIT_SETTING = 0x40
+TIC_STEPMODE_SETTING = 0x41
+TIC_DECAYMODE_SETTING = 0x42
+TIC_STARTINGSPEED_SETTING = 0x43
+TIC_MAXSPEED_SETTING = 0x47
+TIC_MAXDECEL_SETTING = 0x4B
+TIC_MAXACCEL_SETTING = 0x4F
+TIC_SOFTERRORRESPONSE_SETTING = 0x53
+TIC_SOFTERRORPOSITION_SETTING = 0x54
+TIC_ENCODERPRESCALER_SETTING = 0x58
+TIC_ENCODERUNLIMITED_SETTING = 0x5C
+TIC_KILLSWITCHMAP_SETTING = 0x5D
+TIC_SERIALRESPONSEDELAY_SETTING = 0x5E
+TIC_LIMITSWITCHFORWARDMAP_SETTING = 0x5F
+TIC_LIMITSWITCHREVERSEMAP_SETTING = 0x60
+TIC_HOMINGSPEEDTOWARDS_SETTING = 0x61
+TIC_HOMINGSPEEDAWAY_SETTING = 0x65
+
+# The Tic answers a single "get variable" request with at most 15 bytes.
+TIC_MAX_BLOCK_LENGTH = 15
+TIC_VARIABLES_LENGTH = TIC_INPUTSCALE_VAR + 4
+TIC_SETTINGS_LENGTH = TIC_HOMINGSPEEDAWAY_SETTING + 4
+
+# A variable of the Tic: name of its TicSnapshot field, offset, struct
+# format, unit and description. A getter is generated for every variable.
+TicVariable = collections.namedtuple('TicVariable', ('name', 'offset', 'format', 'unit', 'doc'))
+
+TIC_VARIABLES = (
+    TicVariable('operationState', TIC_OPERATIONSTATE_VAR, 'B', None,
         '''The overall state of the Tic.
-        
+
            0: Reset
            2: De-energized
            4: Soft error
            6: Waiting for ERR line
            8: Starting up
-           10: Normal'''
-        
-        return self._getVariable8(TIC_OPERATIONSTATE_VAR)
-
-    def getMiscFlags1(self):
+           10: Normal'''),
+    TicVariable('miscFlags1', TIC_MISCFLAG1_VAR, 'B', None,
         '''The set bits of this variable provide additional information about
            the Tic’s status.
 
-           Bit 0: Energized – The Tic’s motor outputs are enabled and if 
-                  a stepper motor is properly connected, its coils are 
+           Bit 0: Energized – The Tic’s motor outputs are enabled and if
+                  a stepper motor is properly connected, its coils are
                   energized (i.e. electrical current is flowing).
-           Bit 1: Position uncertain – The Tic has not received external 
-                  confirmation that the value of its “current position” 
+           Bit 1: Position uncertain – The Tic has not received external
+                  confirmation that the value of its “current position”
                   variable is correct (see Section 5.4).
            Bit 2: Forward limit active – One of the forward limit switches
                   is active.
            Bit 3: Reverse limit active – One of the reverse limit switches
                   is active.
            Bit 4: Homing active – The Tic’s homing procedure is running.
-           Bits 5–7: reserved'''
-        
-        return self._getVariable8(TIC_MISCFLAG1_VAR)
-
-    def getErrorStatus(self):
+           Bits 5–7: reserved'''),
+    TicVariable('errorStatus', TIC_ERRORSTATUS_VAR, 'H', None,
         '''The set bits of this variable indicate the errors that are currently
            stopping the motor. The motor can only be controlled normally when
            this variable has a value of 0.
@@ -271,124 +169,65 @@ class pytic2():
            Bit 6: Command timeout
            Bit 7: Safe start violation
            Bit 8: ERR line high
-           Bits 9–15: reserved'''
-        
-        return self._getVariable16(TIC_MISCFLAG1_VAR)
-
-    def getErrorOccurred(self):
+           Bits 9–15: reserved'''),
+    TicVariable('errorsOccurred', TIC_ERRORSOCCURRED_VAR, 'I', None,
         '''The set bits of this variable indicate the errors that have occurred
            since this variable was last cleared with the “get variable and
            clear errors occurred” command.
 
-           Bits 0–15: These bits correspond to the same errors as those of 
+           Bits 0–15: These bits correspond to the same errors as those of
                       the “error status” variable documented above.
            Bit 16: Serial framing
            Bit 17: Serial RX overrun
            Bit 18: Serial format
            Bit 19: Serial CRC
            Bit 20: Encoder skip
-           Bits 21–31: reserved'''
-        
-        return self._getVariable32(TIC_ERRORSOCCURRED_VAR)
-
-    def getPlanningMode(self) -> int:
+           Bits 21–31: reserved'''),
+    TicVariable('planningMode', TIC_PLANNINGMODE_VAR, 'B', None,
         '''The kind of step planning algorithm the controller is currently using.
 
            0: Off (no target; not sending steps)
            1: Target position
-           2: Target velocity'''
-        
-        return self._getVariable8(TIC_PLANNINGMODE_VAR)
-
-    def getTargetPosition(self):
+           2: Target velocity'''),
+    TicVariable('targetPosition', TIC_TARGETPOSTION_VAR, 'i', 'microsteps',
         '''Motor target position (−2,147,483,648 to +2,147,483,647 = −0x8000 0000
-           to +0x7FFF FFFF). This value is only meaningful if the “planning mode” 
-           variable indicates “target position”.
-        
-           units: microsteps'''
-        
-        return self._getVariable32s(TIC_TARGETPOSTION_VAR)
-
-    def getTargetVelocity(self):
+           to +0x7FFF FFFF). This value is only meaningful if the “planning mode”
+           variable indicates “target position”.'''),
+    TicVariable('targetVelocity', TIC_TARGETVELOCITY_VAR, 'i', 'microsteps per 10,000 s',
         '''Motor target velocity (−500,000,000 to +500,000,000). This value is
            only meaningful if the “planning mode” variable indicates
-           “target velocity”.
-        
-           units: microsteps per 10,000 s'''
-        
-        return self._getVariable32s(TIC_TARGETVELOCITY_VAR)
-
-    def getStartingSpeed(self):
+           “target velocity”.'''),
+    TicVariable('startingSpeed', TIC_STARTINGSPEED_VAR, 'I', 'microsteps per 10,000 s',
         '''Maximum speed at which instant acceleration and deceleration are
-           allowed (0 to 500,000,000).
-
-           units: microsteps per 10,000 s'''
-
-        return self._getVariable32(TIC_STARTINGSPEED_VAR)
-
-    def getMaxSpeed(self):
-        '''Maximum allowed motor speed (0 to 500,000,000).
-
-           units: microsteps per 10,000 s'''
-
-        return self._getVariable32(TIC_MAXSPEED_VAR)
-
-    def getMaxDeceleration(self):
+           allowed (0 to 500,000,000).'''),
+    TicVariable('maxSpeed', TIC_MAXSPEED_VAR, 'I', 'microsteps per 10,000 s',
+        '''Maximum allowed motor speed (0 to 500,000,000).'''),
+    TicVariable('maxDeceleration', TIC_MAXDECEL_VAR, 'I', 'microsteps per 10,000 s',
         '''Maximum allowed motor deceleration (100 to 2,147,483,647 = 0x64
-           to 0x7FFF FFFF).
-
-           units: microsteps per 10,000 s'''
-
-        return self._getVariable32(TIC_MAXDECEL_VAR)
-
-    def getMaxAcceleration(self):
+           to 0x7FFF FFFF).'''),
+    TicVariable('maxAcceleration', TIC_MAXACCEL_VAR, 'I', 'microsteps per 10,000 s',
         '''Maximum allowed motor acceleration  (100 to 2,147,483,647 = 0x64
-           to 0x7FFF FFFF).
-
-           units: microsteps per 10,000 s'''
-
-        return self._getVariable32(TIC_MAXACCEL_VAR)
-
-    def getCurrentPosition(self):
+           to 0x7FFF FFFF).'''),
+    TicVariable('currentPosition', TIC_CURRENTPOSITION_VAR, 'i', 'microsteps',
         '''Current position of the motor (−2,147,483,648 to +2,147,483,647 =
            −0x8000 0000 to +0x7FFF FFFF). Note that this just tracks steps that
-           the Tic has commanded the stepper driver to take; it could be 
-           different from the actual position of the motor for various reasons.
-        
-           units: microsteps'''
-        
-        return self._getVariable32s(TIC_CURRENTPOSITION_VAR)    
-
-    def getCurrentVelocity(self):
-        '''Current velocity of the motor (−500,000,000 to +500,000,000). 
+           the Tic has commanded the stepper driver to take; it could be
+           different from the actual position of the motor for various reasons.'''),
+    TicVariable('currentVelocity', TIC_CURRENTVELOCITY_VAR, 'i', 'microsteps per 10,000 s',
+        '''Current velocity of the motor (−500,000,000 to +500,000,000).
            Note that this is just the step rate and direction the Tic is sending
            to the driver, and it might not correspond to the actual velocity of
-           the motor for various reasons.
-
-           units: microsteps'''
-        
-        return self._getVariable32s(TIC_CURRENTVELOCITY_VAR) 
-
-    def getActingTargetPosition(self):
-        '''This is a variable used in the Tic’s target position step planning 
-           algorithm. It is accessible mainly for getting insight into 
+           the motor for various reasons.'''),
+    TicVariable('actingTargetPosition', TIC_ACTINGTARGETPOSITION_VAR, 'i', 'microsteps',
+        '''This is a variable used in the Tic’s target position step planning
+           algorithm. It is accessible mainly for getting insight into
            the algorithm or for troubleshooting.This value could be invalid
-           while the motor is stopped.
-
-           units: microsteps'''
-        
-        return self._getVariable32s(TIC_ACTINGTARGETPOSITION_VAR)  
-
-    def getTimeSinceLastStep(self):
+           while the motor is stopped.'''),
+    TicVariable('timeSinceLastStep', TIC_TIMESINCELASTSTEP_VAR, 'I', '1/3 us',
         '''This is a variable used in the Tic’s step planning algorithms.
            It is accessible mainly for getting insight into the algorithms or
-           for troubleshooting. This value could be invalid while the motor is stopped.
-
-           units: 1/3 us'''
-        
-        return self._getVariable32(TIC_TIMESINCELASTSTEP_VAR)  
-
-    def getDeviceReset(self):
+           for troubleshooting. This value could be invalid while the motor is stopped.'''),
+    TicVariable('deviceReset', TIC_DEVICERESET_VAR, 'B', None,
         '''The cause of the Tic’s last full microcontroller reset.
 
            0: Power up
@@ -398,80 +237,33 @@ class pytic2():
            8: Software reset (by firmware upgrade process)
            16: Stack overflow (should never happen; this could indicate a firmware bug)
            32: Stack underflow (should never happen; this could indicate a firmware bug)
-           
-           A “reset” command does not affect this variable.'''
-        
-        return self._getVariable8(TIC_DEVICERESET_VAR) 
-
-    def getVinVoltage(self):
-        '''Measured voltage on the VIN pin.
 
-           units: mV'''
-        
-        return self._getVariable16(TIC_VINVOLTAGE_VAR) 
-
-    def getUpTime(self):
-        '''Time since the Tic’s microcontroller last experienced a full reset or 
+           A “reset” command does not affect this variable.'''),
+    TicVariable('vinVoltage', TIC_VINVOLTAGE_VAR, 'H', 'mV',
+        '''Measured voltage on the VIN pin.'''),
+    TicVariable('upTime', TIC_UPTIME_VAR, 'I', 'ms',
+        '''Time since the Tic’s microcontroller last experienced a full reset or
            was powered up.
 
-           units: ms
-           
-           A “reset” command does not affect this variable.'''
-        
-        return self._getVariable16(TIC_UPTIME_VAR) 
-
-    def getEncoderPosition(self):
-        '''Raw encoder count measured from the quadrature encoder inputs (TX and RX).
-
-           units: ticks'''
-        
-        return self._getVariable32s(TIC_ENCODERPOSITION_VAR)
-
-    def getRCPulseWidth(self):
+           A “reset” command does not affect this variable.'''),
+    TicVariable('encoderPosition', TIC_ENCODERPOSITION_VAR, 'i', 'ticks',
+        '''Raw encoder count measured from the quadrature encoder inputs (TX and RX).'''),
+    TicVariable('rcPulseWidth', TIC_RCPULSEWIDTH_VAR, 'H', '1/12 us',
         '''Reading from the RC pulse input. 0xFFFF means the reading is not available
-           or invalid.
-
-           units: 1/12 us'''
-        
-        return self._getVariable16(TIC_RCPULSEWIDTH_VAR)
-
-    def getAnalogReadingSCL(self):
-        '''Analog reading from the SCL pin, if analog readings are enabled for it. 
-           0xFFFF means the reading is not available.
-
-           units: 0 = 0 V,
-                  0xFFFE ≈ voltage on 5V pin'''
-        
-        return self._getVariable16(TIC_ANAREADSCL_VAR)
-
-    def getAnalogReadingSDA(self):
+           or invalid.'''),
+    TicVariable('analogReadingSCL', TIC_ANAREADSCL_VAR, 'H', '0 = 0 V, 0xFFFE ≈ voltage on 5V pin',
+        '''Analog reading from the SCL pin, if analog readings are enabled for it.
+           0xFFFF means the reading is not available.'''),
+    TicVariable('analogReadingSDA', TIC_ANAREADSDA_VAR, 'H', '0 = 0 V, 0xFFFE ≈ voltage on 5V pin',
         '''Analog reading from the SDA pin, if analog readings are enabled for it.
-           0xFFFF means the reading is not available.
-
-           units: 0 = 0 V,
-                  0xFFFE ≈ voltage on 5V pin'''
-        
-        return self._getVariable16(TIC_ANAREADSDA_VAR)
-
-    def getAnalogReadingTX(self):
+           0xFFFF means the reading is not available.'''),
+    TicVariable('analogReadingTX', TIC_ANAREADTX_VAR, 'H', '0 = 0 V, 0xFFFE ≈ voltage on 5V pin',
         '''Analog reading from the TX pin, if analog readings are enabled for it.
-           0xFFFF means the reading is not available.
-
-           units: 0 = 0 V,
-                  0xFFFE ≈ voltage on 5V pin'''
-        
-        return self._getVariable16(TIC_ANAREADTX_VAR)
-
-    def getAnalogReadingRX(self):
+           0xFFFF means the reading is not available.'''),
+    TicVariable('analogReadingRX', TIC_ANAREADRX_VAR, 'H', '0 = 0 V, 0xFFFE ≈ voltage on 5V pin',
         '''Analog reading from the RX pin, if analog readings are enabled for it.
-           0xFFFF means the reading is not available.
-        
-           units: 0 = 0 V,
-                  0xFFFE ≈ voltage on 5V pin'''
-        
-        return self._getVariable16(TIC_ANAREADRX_VAR)
-
-    def getDigitalReading(self):
+           0xFFFF means the reading is not available.'''),
+    TicVariable('digitalReading', TIC_DIGREAD_VAR, 'B', None,
         '''Digital readings from the Tic’s control pins. A set bit indicates that
            the pin is high.
 
@@ -480,11 +272,8 @@ class pytic2():
            Bit 2: TX
            Bit 3: RX
            Bit 4: RC
-           Bits 5–7: reserved'''
-        
-        return self._getVariable8(TIC_DIGREAD_VAR)
-
-    def getPinStates(self):
+           Bits 5–7: reserved'''),
+    TicVariable('pinStates', TIC_PINSTATES_VAR, 'B', None,
         '''States of the Tic’s control pins, i.e. what kind of input or output
            each pin is.
 
@@ -501,83 +290,721 @@ class pytic2():
            2: Output low
            3: Output high
 
-           Note that the reported state might be misleading if the pin is being 
-           used as a TTL serial or I²C pin. The state of the RC pin cannot be set.'''
-        
-        return self._getVariable8(TIC_PINSTATES_VAR)
-
-    def getStepMode(self):
-        '''Step mode of the Tic’s stepper driver (also known as microstepping mode), 
+           Note that the reported state might be misleading if the pin is being
+           used as a TTL serial or I²C pin. The state of the RC pin cannot be set.'''),
+    TicVariable('stepMode', TIC_STEPMODE_VAR, 'B', None,
+        '''Step mode of the Tic’s stepper driver (also known as microstepping mode),
            which defines how many microsteps correspond to one full step.
 
            0: Full step
            1: 1/2 step
            2: 1/4 step
-           3: 1/8 step'''
-
-        return self._getVariable8(TIC_STEPMODE_VAR)
-
-    def getCurrentLimit(self):
-        '''Stepper motor coil current limit of the Tic’s stepper driver (0 to 124).'''
-
-        return self._getVariable8(TIC_CURRENTLIMIT_VAR)
-
-    def getDecayMOde(self):
+           3: 1/8 step'''),
+    TicVariable('currentLimit', TIC_CURRENTLIMIT_VAR, 'B', None,
+        '''Stepper motor coil current limit of the Tic’s stepper driver (0 to 124).'''),
+    TicVariable('decayMode', TIC_DECLAYMODE_VAR, 'B', None,
         '''Decay mode of the Tic’s stepper driver.
 
            0: Automatic
            1: Slow
-           2: Fast'''
-
-        return self._getVariable8(TIC_DECLAYMODE_VAR)
-
-    def getInputState(self):
+           2: Fast'''),
+    TicVariable('inputState', TIC_INPUTSTATE_VAR, 'B', None,
         '''State of the Tic’s main input.
 
            0: Not ready
            1: Invalid
            2: Halt
            3: Target position
-           4: Target velocity'''
+           4: Target velocity'''),
+    TicVariable('inputAfterAveraging', TIC_INPUTAVAR_VAR, 'H', None,
+        '''This variable is used in the process that converts raw RC and analog
+           values into a motor position or speed. They are mainly for debugging
+           your input scaling settings in an RC or analog mode. 0xFFFF means
+           the reading is not available.'''),
+    TicVariable('inputAfterHysteresis', TIC_INPUTHYST_VAR, 'H', None,
+        '''This variable is used in the process that converts raw RC and analog
+           values into a motor position or speed. They are mainly for debugging
+           your input scaling settings in an RC or analog mode. 0xFFFF means
+           the reading is not available.'''),
+    TicVariable('inputAfterScaling', TIC_INPUTSCALE_VAR, 'i', 'microsteps or microsteps per 10,000 s',
+        '''Value of the Tic’s main input after scaling has been applied.
+           If the input is valid, this number is the target position or
+           target velocity specified by the input.'''),
+)
+
+# Getters whose name does not follow from the variable name
+_GETTER_NAMES = {
+    'errorsOccurred': 'getErrorOccurred',
+    'rcPulseWidth': 'getRCPulseWidth',
+}
+
+def _getterName(name):
+    return _GETTER_NAMES.get(name, 'get' + name[0].upper() + name[1:])
+
+# Layout of the variable block: (field name, offset, struct format)
+_SNAPSHOT_LAYOUT = tuple((variable.name, variable.offset, variable.format) for variable in TIC_VARIABLES)
+
+# Layout of the settings block: (field name, offset, struct format)
+_SETTINGS_LAYOUT = (
+    ('controlMode', TIC_CONTROLMODE_SETTING, 'B'),
+    ('neverSleep', TIC_NEVERSLEEP_SETTING, 'B'),
+    ('disableSafeStart', TIC_DISABLESAFESTART_SETTING, 'B'),
+    ('ignoreErrLineHigh', TIC_IGNOREERRLINEHIGH_SETTING, 'B'),
+    ('serialBaudRateGenerator', TIC_SERIALBAUDRATEGENERATOR_SETTING, 'H'),
+    ('serialDeviceNumber', TIC_SERIALDEVICENUMBER_SETTING, 'B'),
+    ('autoClearDriverError', TIC_AUTOCLEARDRIVERERROR_SETTING, 'B'),
+    ('commandTimeout', TIC_COMMANDTIMEOUT_SETTING, 'H'),
+    ('serialCrcForCommands', TIC_SERIALCRCFORCOMMANDS_SETTING, 'B'),
+    ('lowVinTimeout', TIC_LOWVINTIMEOUT_SETTING, 'H'),
+    ('lowVinShutoffVoltage', TIC_LOWVINSHUTOFFVOLTAGE_SETTING, 'H'),
+    ('lowVinStartupVoltage', TIC_LOWVINSTARTUPVOLTAGE_SETTING, 'H'),
+    ('highVinShutoffVoltage', TIC_HIGHVINSHUTOFFVOLTAGE_SETTING, 'H'),
+    ('vinCalibration', TIC_VINCALIBRATION_SETTING, 'h'),
+    ('rcMaxPulsePeriod', TIC_RCMAXPULSEPERIOD_SETTING, 'H'),
+    ('rcBadSignalTimeout', TIC_RCBADSIGNALTIMEOUT_SETTING, 'H'),
+    ('rcConsecutiveGoodPulses', TIC_RCCONSECUTIVEGOODPULSES_SETTING, 'B'),
+    ('invertMotorDirection', TIC_INVERTMOTORDIRECTION_SETTING, 'B'),
+    ('inputErrorMin', TIC_INPUTERRORMIN_SETTING, 'H'),
+    ('inputErrorMax', TIC_INPUTERRORMAX_SETTING, 'H'),
+    ('inputScalingDegree', TIC_INPUTSCALINGDEGREE_SETTING, 'B'),
+    ('inputInvert', TIC_INPUTINVERT_SETTING, 'B'),
+    ('inputMin', TIC_INPUTMIN_SETTING, 'H'),
+    ('inputNeutralMin', TIC_INPUTNEUTRALMIN_SETTING, 'H'),
+    ('inputNeutralMax', TIC_INPUTNEUTRALMAX_SETTING, 'H'),
+    ('inputMax', TIC_INPUTMAX_SETTING, 'H'),
+    ('outputMin', TIC_OUTPUTMIN_SETTING, 'i'),
+    ('inputAveragingEnabled', TIC_INPUTAVERAGINGENABLED_SETTING, 'B'),
+    ('inputHysteresis', TIC_INPUTHYSTERESIS_SETTING, 'H'),
+    ('currentLimitDuringError', TIC_CURRENTLIMITDURINGERROR_SETTING, 'B'),
+    ('outputMax', TIC_OUTPUTMAX_SETTING, 'i'),
+    ('switchPolarityMap', TIC_SWITCHPOLARITYMAP_SETTING, 'B'),
+    ('encoderPostscaler', TIC_ENCODERPOSTSCALER_SETTING, 'I'),
+    ('sclConfig', TIC_SCLCONFIG_SETTING, 'B'),
+    ('sdaConfig', TIC_SDACONFIG_SETTING, 'B'),
+    ('txConfig', TIC_TXCONFIG_SETTING, 'B'),
+    ('rxConfig', TIC_RXCONFIG_SETTING, 'B'),
+    ('rcConfig', TIC_RCCONFIG_SETTING, 'B'),
+    ('currentLimit', TIC_CURRENTLIMIT_SETTING, 'B'),
+    ('stepMode', TIC_STEPMODE_SETTING, 'B'),
+    ('decayMode', TIC_DECAYMODE_SETTING, 'B'),
+    ('startingSpeed', TIC_STARTINGSPEED_SETTING, 'I'),
+    ('maxSpeed', TIC_MAXSPEED_SETTING, 'I'),
+    ('maxDeceleration', TIC_MAXDECEL_SETTING, 'I'),
+    ('maxAcceleration', TIC_MAXACCEL_SETTING, 'I'),
+    ('softErrorResponse', TIC_SOFTERRORRESPONSE_SETTING, 'B'),
+    ('softErrorPosition', TIC_SOFTERRORPOSITION_SETTING, 'i'),
+    ('encoderPrescaler', TIC_ENCODERPRESCALER_SETTING, 'I'),
+    ('encoderUnlimited', TIC_ENCODERUNLIMITED_SETTING, 'B'),
+    ('killSwitchMap', TIC_KILLSWITCHMAP_SETTING, 'B'),
+    ('serialResponseDelay', TIC_SERIALRESPONSEDELAY_SETTING, 'B'),
+    ('limitSwitchForwardMap', TIC_LIMITSWITCHFORWARDMAP_SETTING, 'B'),
+    ('limitSwitchReverseMap', TIC_LIMITSWITCHREVERSEMAP_SETTING, 'B'),
+    ('homingSpeedTowards', TIC_HOMINGSPEEDTOWARDS_SETTING, 'I'),
+    ('homingSpeedAway', TIC_HOMINGSPEEDAWAY_SETTING, 'I'),
+)
+
+def _compileLayout(layout):
+    '''Builds one little-endian struct covering the whole layout, with pad
+       bytes for the unused offsets between the variables.'''
+    fmt = '<'
+    position = 0
+    for _, offset, code in layout:
+        if offset > position:
+            fmt += '{}x'.format(offset - position)
+        fmt += code
+        position = offset + struct.calcsize('<' + code)
+    return struct.Struct(fmt)
+
+# Settings that can be changed with a command and are kept in the shadow cache
+_SHADOWED_SETTINGS = (
+    ('startingSpeed', TIC_STARTINGSPEED_VAR),
+    ('maxSpeed', TIC_MAXSPEED_VAR),
+    ('maxDeceleration', TIC_MAXDECEL_VAR),
+    ('maxAcceleration', TIC_MAXACCEL_VAR),
+    ('stepMode', TIC_STEPMODE_VAR),
+    ('currentLimit', TIC_CURRENTLIMIT_VAR),
+    ('decayMode', TIC_DECLAYMODE_VAR),
+)
+
+# Documented ranges of the settings a written value is cached for; the Tic
+# limits values outside of them. The valid step modes, current limits and
+# decay modes depend on the Tic model, so only values read back are cached.
+_SETTING_RANGES = {
+    TIC_STARTINGSPEED_VAR: (0, 500000000),
+    TIC_MAXSPEED_VAR: (0, 500000000),
+    TIC_MAXACCEL_VAR: (100, 0x7FFFFFFF),
+    TIC_MAXDECEL_VAR: (100, 0x7FFFFFFF),
+}
+
+class _Block():
+    '''Immutable, decoded copy of a block of Tic memory. Subclasses define
+       the fields in __slots__ and the matching struct in _struct.'''
+
+    __slots__ = ()
+    _struct = None
+
+    def __init__(self, data, offset=0):
+        for name, value in zip(self.__slots__, self._struct.unpack_from(data, offset)):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def unpack_from(cls, buffer, offset=0):
+        '''Decodes the block from a buffer; used as decoder of block reads,
+           it decodes the read buffer without copying it.'''
+
+        return cls(buffer, offset)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.asTuple() == other.asTuple()
+
+    def __hash__(self):
+        return hash(self.asTuple())
+
+    def __reduce__(self):
+        return type(self), (self._struct.pack(*self.asTuple()),)
+
+    def __repr__(self):
+        fields = ', '.join('{}={}'.format(name, getattr(self, name)) for name in self.__slots__)
+        return '{}({})'.format(type(self).__name__, fields)
+
+    def asTuple(self):
+        '''Returns the values in the order of the block.'''
+
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def asDict(self):
+        '''Returns the values as a dictionary keyed by field name.'''
+
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class TicSnapshot(_Block):
+    '''Immutable copy of the complete Tic variable block, taken in as few
+       "get variable" transactions as possible. Every variable is available
+       as an attribute named after its getter, e.g. currentPosition for
+       getCurrentPosition().'''
+
+    __slots__ = tuple(name for name, _, _ in _SNAPSHOT_LAYOUT)
+    _struct = _compileLayout(_SNAPSHOT_LAYOUT)
+
+class TicSettings(_Block):
+    '''Immutable copy of the non-volatile settings of a Tic, read with the
+       "get setting" command. These are the settings made with the Pololu
+       Tic Control Center; the temporary values set with commands such as
+       setMaxSpeed are in the variables instead.'''
+
+    __slots__ = tuple(name for name, _, _ in _SETTINGS_LAYOUT)
+    _struct = _compileLayout(_SETTINGS_LAYOUT)
+
+class TicError(Exception):
+    '''Raised when the Tic reports errors that stop the motor.'''
+
+    def __init__(self, errorStatus, address=None):
+        super().__init__('Tic {} error status 0x{:04X}'.format(address, errorStatus))
+        self.errorStatus = errorStatus
+        self.address = address
+
+    def __reduce__(self):
+        return type(self), (self.errorStatus, self.address)
+
+# Variables needed to follow a move, read in one block from TIC_ERRORSTATUS_VAR
+_MOTION_FIELDS = ('errorStatus', 'planningMode', 'targetPosition', 'targetVelocity',
+                  'maxSpeed', 'maxDeceleration', 'maxAcceleration', 'currentPosition',
+                  'currentVelocity')
+_MOTION_LENGTH = TIC_ACTINGTARGETPOSITION_VAR - TIC_ERRORSTATUS_VAR
+_MotionState = collections.namedtuple('_MotionState', _MOTION_FIELDS)
+
+class _Record(struct.Struct):
+    '''Struct decoding straight from the read buffer into a named tuple.'''
+
+    def __init__(self, format, make):
+        super().__init__(format)
+        self.make = make
+
+    def unpack_from(self, buffer, offset=0):
+        return self.make(super().unpack_from(buffer, offset))
+
+class _Field(struct.Struct):
+    '''Struct of a single variable, decoding it straight from the read buffer.'''
+
+    def unpack_from(self, buffer, offset=0):
+        return super().unpack_from(buffer, offset)[0]
+
+_MOTION_STRUCT = _Record(_compileLayout([(name, offset - TIC_ERRORSTATUS_VAR, code)
+                                         for name, offset, code in _SNAPSHOT_LAYOUT
+                                         if name in _MOTION_FIELDS]).format, _MotionState._make)
+
+class _MotionWait():
+    '''Decides from the kinematic model how long a wait can sleep before
+       the next poll: through most of the predicted move, then in short
+       poll intervals near its predicted end.'''
+
+    # Longest sleep while no end of the move can be predicted
+    maxInterval = 0.25
+
+    def __init__(self, address, target, timeout, pollInterval):
+        self.address = address
+        self.target = target
+        self.pollInterval = pollInterval
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.polls = 0
+
+    def _done(self, state):
+        if state.currentVelocity != 0:
+            return False
+        if self.target is not None:
+            return state.currentPosition == self.target
+        if state.planningMode == 1:
+            return state.currentPosition == state.targetPosition
+        if state.planningMode == 2:
+            return state.targetVelocity == 0
+        return True
+
+    def _predict(self, state):
+        if self.target is not None and (state.planningMode != 1 or state.targetPosition != self.target):
+            return math.inf
+        if state.planningMode == 1:
+            return moveTime(state.targetPosition - state.currentPosition, state.maxSpeed,
+                            state.maxAcceleration, state.maxDeceleration, state.currentVelocity)
+        if state.planningMode == 2 and state.targetVelocity != 0:
+            return math.inf
+        return stopTime(state.currentVelocity, state.maxDeceleration or state.maxAcceleration)
+
+    def next(self, state):
+        '''Returns None when the wait is over or the time to sleep before
+           the next poll.'''
+
+        self.polls += 1
+        if state.errorStatus:
+            raise TicError(state.errorStatus, self.address)
+        if self._done(state):
+            return None
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            raise TimeoutError('Tic {} did not finish the move in time'.format(self.address))
+        predicted = self._predict(state)
+        if math.isinf(predicted):
+            delay = self.maxInterval
+        else:
+            # Wake up a little early to poll densely around the predicted end
+            delay = max(self.pollInterval, predicted - max(2 * self.pollInterval, 0.1 * predicted))
+        if self.deadline is not None:
+            delay = min(delay, self.deadline - now)
+        return max(0.0, delay)
+
+# Settings read by getSettings: bus -> {address: (boot time, TicSettings)}
+_settingsCache = weakref.WeakKeyDictionary()
+
+# Tolerance of the boot time computed from the up time, in seconds
+_BOOT_TIME_TOLERANCE = 0.5
 
-        return self._getVariable8(TIC_INPUTSTATE_VAR)
+class pytic2():
+    def __init__(self, bus, address, shadow=False, shadowTTL=None, metrics=None, retry=None, breaker=None,
+                 interface=pyi2c):
+        '''
+        :param bus: SMBus object
+        :param address: Device number of the Tic
+        :param shadow: Remember the settings written to and read from the Tic,
+                       skip writes that do not change them and serve their
+                       getters from the cache
+        :param shadowTTL: Lifetime of a cached setting in seconds; None
+                          keeps it until the cache is invalidated
+        :param metrics: Optional BusMetrics object recording the transactions
+        :param retry: Optional RetryPolicy for transient bus errors
+        :param breaker: Optional CircuitBreaker, normally shared by the
+                        devices of a bus
+        :param interface: Transport class, pyi2c or a compatible one such
+                          as I2CDevInterface
+        '''
+        self._interface = interface(bus, metrics, retry, breaker)
+        self.address = address 
+        self._logger = self._initialize_logger()     
+        self._shadow = {} if shadow else None
+        self.shadowTTL = shadowTTL
+        self._lastUpTime = None
+        self._lastDeviceReset = None
 
-    def getInputAfterAveraging(self):
-        '''This variable is used in the process that converts raw RC and analog
-           values into a motor position or speed. They are mainly for debugging 
-           your input scaling settings in an RC or analog mode. 0xFFFF means 
-           the reading is not available.'''
+    def _initialize_logger(self):
+        # - Logging - 
+        # The level is left to the application; debug records are only
+        # formatted when debug logging is enabled.
+        _logger = logging.getLogger('PyTic2({})'.format(self.address))
+        return _logger        
 
-        return self._getVariable16(TIC_INPUTAVAR_VAR)
+    def setTargetPosition(self, target, profile=None):
+        '''Sets the target position in microsteps.
 
-    def getInputAfterHysteresis(self):
-        '''This variable is used in the process that converts raw RC and analog
-           values into a motor position or speed. They are mainly for debugging 
-           your input scaling settings in an RC or analog mode. 0xFFFF means 
-           the reading is not available.'''
+           target position, signed integer
+           Range: −2,147,483,648 to +2,147,483,647 = −0x8000 0000 to +0x7FFF FFFF
+           Units: microsteps
+
+           With an AxisProfile the target is given in units.'''
+
+        if profile is not None:
+            target = profile.unitsToPosition(target)
+        self._interface.write32Bit(self.address, TIC_SETTARGETPOSITION_CMD, target)
 
-        return self._getVariable16(TIC_INPUTHYST_VAR)
+    def setTargetVelocity(self, target, profile=None):
+        '''Sets the target velocity in microsteps per 10,000 seconds.
+  
+           target velocity, signed integer
+           Range: −500,000,000 to +500,000,000
+           Units: microsteps per 10,000 s
 
-    def getInputAfterScaling(self):
-        '''Value of the Tic’s main input after scaling has been applied. 
-           If the input is valid, this number is the target position or 
-           target velocity specified by the input.
+           With an AxisProfile the target is given in units per second.'''
 
-        units: Position: microsteps
-               Velocity: microsteps per 10,000 s'''
+        if profile is not None:
+            target = profile.unitsToSpeed(target)
+        self._interface.write32Bit(self.address,TIC_SETTARGETVELOCITY_CMD, target)
+
+    def haltAndSetPosition(self, target, profile=None):
+        '''Stops the motor abruptly without respecting the deceleration limit and
+           sets the “Current position” variable, which represents what position
+           the Tic currently thinks the motor is in.
+  
+           current position, signed integer
+           Range: −2,147,483,648 to +2,147,483,647 = −0x8000 0000 to +0x7FFF FFFF
+           Units: microsteps
 
-        return self._getVariable32s(TIC_INPUTSCALE_VAR)      
+           With an AxisProfile the target is given in units.'''
 
-if __name__ == '__main__':
-    from smbus2 import SMBus
+        if profile is not None:
+            target = profile.unitsToPosition(target)
+        self._interface.write32Bit(self.address,TIC_HALTANDSETPOSITION_CMD, target)
 
-    #Open a handle to "/dev/i2c-3", representing the I2C bus.
-    bus = SMBus(3)
- 
-    # Select the I2C address of the Tic (the device number).
-    address = 14
- 
-    tic = pytic2(bus, address)
+    def haltAndHold(self):
+        '''Stops the motor abruptly without respecting the deceleration limit.'''
+
+        self._interface.writeQuick(self.address,TIC_HALTANDHOLD_CMD)
+
+    def goHome(self, direction):
+        '''Starts the Tic’s homing procedure.
+  
+           0: Go home in the reverse direction
+           1: Go home in the forward direction'''
+
+        self._interface.write7Bit(self.address,TIC_GOHOME_CMD, direction)
+
+    def resetCommandTimeout(self):
+        '''If the command timeout is enabled, this command resets it and prevents 
+           the “command timeout” error from happening for some time.'''
+
+        self._interface.writeQuick(self.address,TIC_RESETCOMMANDTIMEOUT_CMD)
+
+    def deenergize(self):
+        '''Causes the Tic to de-energize the stepper motor coils by disabling its 
+           stepper motor driver.'''
+
+        self._interface.writeQuick(self.address,TIC_DEENERGIZE_CMD)
+
+    def energize(self):
+        '''Requests for the Tic to energize the stepper motor coils by enabling its 
+           stepper motor driver.'''
+        self._logger.debug('energize - %d', self.address)
+        self._interface.writeQuick(self.address,TIC_ENERGIZE_CMD)
+
+    def exitSafeStart(self):
+        '''Causes the “safe start violation” error to be cleared for 200 ms. If there 
+           are no other errors, this allows the system to start up.'''
+
+        self._interface.writeQuick(self.address,TIC_EXITSAFESTART_CMD)
+
+    def reset(self):
+        '''Makes the Tic forget most parts of its current state.'''
+
+        self._interface.writeQuick(self.address,TIC_RESET_CMD)
+        self.invalidateShadow()
+
+    def clearDriveError(self):
+        '''Attempts to clear a motor driver error.'''
+
+        self._interface.writeQuick(self.address,TIC_CLEARDRIVEERROR_CMD)
+
+    def setMaxSpeed(self, target, profile=None):
+        '''Temporarily sets the Tic’s maximum allowed motor speed in units of 
+           steps per 10,000 seconds
+
+           With an AxisProfile the target is given in units per second.'''
+
+        if profile is not None:
+            target = profile.unitsToSpeed(target)
+        self._writeSetting(TIC_MAXSPEED_VAR, self._interface.write32Bit, TIC_SETMAXSPEED_CMD, target)
+
+    def setStartingSpeed(self, target, profile=None):
+        '''Temporarily sets the Tic’s starting speed in units of steps per 10,000 seconds
+
+           With an AxisProfile the target is given in units per second.'''
+
+        if profile is not None:
+            target = profile.unitsToSpeed(target)
+        self._writeSetting(TIC_STARTINGSPEED_VAR, self._interface.write32Bit, TIC_SETSTARTTINGSPEED_CMD, target)
+
+    def setMaxAccel(self, target, profile=None):
+        '''Temporarily sets the Tic’s maximum allowed motor acceleration in units of 
+           steps per second per 100 seconds.
+
+           With an AxisProfile the target is given in units per second².'''
+
+        if profile is not None:
+            target = profile.unitsToAccel(target)
+        self._writeSetting(TIC_MAXACCEL_VAR, self._interface.write32Bit, TIC_SETMAXACCEL_CMD, target)
+
+    def setMaxDecel(self, target, profile=None):
+        '''Temporarily sets the Tic’s maximum allowed motor deceleration in units of
+           steps per second per 100 seconds
+
+           With an AxisProfile the target is given in units per second².'''
+
+        if profile is not None:
+            target = profile.unitsToAccel(target)
+        self._writeSetting(TIC_MAXDECEL_VAR, self._interface.write32Bit, TIC_SETMAXDECEL_CMD, target)
+
+    def setStepMode(self, target):
+        '''Temporarily sets the step mode (also known as microstepping mode) of 
+           the driver on the Tic'''
+
+        self._writeSetting(TIC_STEPMODE_VAR, self._interface.write7Bit, TIC_SETSTEPMODE_CMD, target)
+
+    def setCurrentLimit(self, target, profile=None):
+        '''Temporarily sets the stepper motor coil current limit of the driver on 
+           the Tic in units of 32 milliamps.
+
+           With an AxisProfile the target is given in mA.'''
+
+        if profile is not None:
+            target = profile.milliampsToCurrent(target)
+        self._writeSetting(TIC_CURRENTLIMIT_VAR, self._interface.write7Bit, TIC_SETCURRENTLIMIT_CMD, target)
+
+    def setDecayMode(self, target):
+        '''Temporarily sets the decay mode of the driver on the Tic.'''
+
+        self._writeSetting(TIC_DECLAYMODE_VAR, self._interface.write7Bit, TIC_SETDECAYMODE_CMD, target)
+
+    def getVariable(self, offset, length, decode=None):
+        '''Gets one or more variables from the Tic.'''
+
+        return self._interface.readBlock(self.address, [TIC_GETVARIABLE_CMD, offset ], length, decode)
  
-    position = tic.getCurrentPosition()
-    print("Current position is {}.".format(position))
\ No newline at end of file
+    def getErrorsOccurred(self, offset, length):
+        '''Identical to the getVariable command, except that it also clears 
+           the “Errors occurred” variable.'''
+
+        return self._interface.readBlock(self.address, [TIC_GETERROROCCURRED_CMD, offset ], length)
+
+    def getVariableBlock(self, offset, length, decode=None):
+        '''Gets a block of variables of any length with maximal "get variable"
+           reads in one combined transaction.'''
+
+        return self._getBlock(TIC_GETVARIABLE_CMD, offset, length, decode)
+
+    def getSetting(self, offset, length, decode=None):
+        '''Gets one or more bytes of the Tic’s non-volatile settings.'''
+
+        return self._interface.readBlock(self.address, [TIC_GETSETTING_CMD, offset], length, decode)
+
+    def getSettingBlock(self, offset, length, decode=None):
+        '''Gets a block of settings of any length with maximal "get setting"
+           reads in one combined transaction.'''
+
+        return self._getBlock(TIC_GETSETTING_CMD, offset, length, decode)
+
+    def getSettings(self, cached=True):
+        '''Reads all settings and returns them as an immutable TicSettings.
+
+           The settings only change when the Tic restarts, so with cached=True
+           they are read once per power cycle: a later call only reads the
+           up time and returns the settings read before if the Tic has not
+           been reset since. The cache is shared by all pytic2 objects of
+           the same device.'''
+
+        cache = _settingsCache.setdefault(self._interface.bus, {})
+        bootTime = time.monotonic() - self.getUpTime() / 1000
+        entry = cache.get(self.address)
+        if cached and entry is not None and abs(entry[0] - bootTime) < _BOOT_TIME_TOLERANCE:
+            return entry[1]
+        settings = self.getSettingBlock(0, TIC_SETTINGS_LENGTH, TicSettings)
+        cache[self.address] = (bootTime, settings)
+
+        return settings
+
+    def verifySettings(self, expected, cached=True):
+        '''Compares the settings with expected values.
+
+           expected: dictionary of TicSettings field names and values
+           Returns a dictionary of the differing fields with (expected, actual) values.'''
+
+        settings = self.getSettings(cached)
+
+        return {name: (value, getattr(settings, name)) for name, value in expected.items()
+                if getattr(settings, name) != value}
+
+    def _getBlock(self, cmd, offset, length, decode):
+        blocks = [([cmd, start], min(TIC_MAX_BLOCK_LENGTH, offset + length - start))
+                  for start in range(offset, offset + length, TIC_MAX_BLOCK_LENGTH)]
+
+        return self._interface.readBlocks(self.address, blocks, decode)
+
+    def getSnapshot(self):
+        '''Reads the complete variable block (offset 0x00 to the end of
+           "input after scaling") and returns it as an immutable TicSnapshot.'''
+
+        snapshot = self.getVariableBlock(0, TIC_VARIABLES_LENGTH, TicSnapshot)
+        if isinstance(snapshot, TicSnapshot):
+            self._observeSnapshot(snapshot)
+
+        return snapshot
+
+    def invalidateShadow(self):
+        '''Forgets all cached settings.'''
+
+        if self._shadow is not None:
+            self._shadow.clear()
+
+    def checkDeviceReset(self):
+        '''Reads the up time and reports whether the Tic went through a full
+           reset since the up time was last read. The cached settings are
+           invalidated when it did.'''
+
+        previous = self._lastUpTime
+        self.getUpTime()
+
+        return previous is not None and self._lastUpTime < previous
+
+    def _writeSetting(self, offset, write, cmd, target):
+        if self._shadow is not None and self._getShadow(offset) == target:
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug('skipped unchanged setting - cmd = %s, target = %d', cmd, target)
+            return
+        # Forget the old value until the write is known to have reached the
+        # device; a failed or partly sent batch leaves the setting uncached
+        self._dropShadow(offset)
+        write(self.address, cmd, target)
+        limits = _SETTING_RANGES.get(offset)
+        if self._shadow is not None and limits is not None and limits[0] <= target <= limits[1]:
+            self._interface._whenSent(lambda: self._setShadow(offset, target))
+
+    def _getSetting(self, offset, field):
+        value = self._getShadow(offset)
+        if value is None:
+            value = self.getVariable(offset, field.size, field)
+            if isinstance(value, int):
+                self._setShadow(offset, value)
+
+        return value
+
+    def _getShadow(self, offset):
+        if self._shadow is None:
+            return None
+        entry = self._shadow.get(offset)
+        if entry is None:
+            return None
+        value, timestamp = entry
+        if self.shadowTTL is not None and time.monotonic() - timestamp > self.shadowTTL:
+            del self._shadow[offset]
+            return None
+
+        return value
+
+    def _dropShadow(self, offset):
+        if self._shadow is not None:
+            self._shadow.pop(offset, None)
+
+    def _setShadow(self, offset, value):
+        if self._shadow is not None:
+            self._shadow[offset] = (value, time.monotonic())
+
+    def _observeUpTime(self, value):
+        if not isinstance(value, int):
+            return
+        if self._lastUpTime is not None and value < self._lastUpTime:
+            self._logger.debug('device reset detected - up time %d < %d', value, self._lastUpTime)
+            self.invalidateShadow()
+        self._lastUpTime = value
+
+    def _observeDeviceReset(self, value):
+        if not isinstance(value, int):
+            return
+        if self._lastDeviceReset is not None and value != self._lastDeviceReset:
+            self.invalidateShadow()
+        self._lastDeviceReset = value
+
+    def _observeSnapshot(self, snapshot):
+        self._observeUpTime(snapshot.upTime)
+        self._observeDeviceReset(snapshot.deviceReset)
+        for name, offset in _SHADOWED_SETTINGS:
+            self._setShadow(offset, getattr(snapshot, name))
+
+    def _getMotionState(self):
+        return self.getVariableBlock(TIC_ERRORSTATUS_VAR, _MOTION_LENGTH, _MOTION_STRUCT)
+
+    def waitUntilReached(self, target=None, timeout=None, pollInterval=0.005):
+        '''Blocks until the motor has stopped at the target position.
+
+           The remaining time of the move is predicted from the current
+           position, velocity and the speed and acceleration limits; the
+           wait sleeps through most of it and polls every pollInterval
+           seconds near its predicted end.
+
+           target: position in microsteps; the target position of the Tic if None
+           timeout: seconds, raises TimeoutError when exceeded; None waits forever
+           Raises TicError when the error status becomes non-zero.
+           Returns the number of polls.'''
+
+        wait = _MotionWait(self.address, target, timeout, pollInterval)
+        delay = wait.next(self._getMotionState())
+        while delay is not None:
+            time.sleep(delay)
+            delay = wait.next(self._getMotionState())
+
+        return wait.polls
+
+    def waitUntilStopped(self, timeout=None, pollInterval=0.005):
+        '''Blocks until the motor has stopped: at its target position in
+           position mode, or at zero velocity with a zero target velocity in
+           velocity mode. See waitUntilReached.'''
+
+        return self.waitUntilReached(None, timeout, pollInterval)
+
+# Variables whose getter observes the value to detect a reset of the device
+_OBSERVERS = {
+    'deviceReset': '_observeDeviceReset',
+    'upTime': '_observeUpTime',
+}
+
+def _variableGetter(variable):
+    field = _Field('<' + variable.format)
+    offset = variable.offset
+    if (variable.name, offset) in _SHADOWED_SETTINGS:
+        def get(self):
+            return self._getSetting(offset, field)
+    elif variable.name in _OBSERVERS:
+        observe = _OBSERVERS[variable.name]
+
+        def get(self):
+            value = self.getVariable(offset, field.size, field)
+            getattr(self, observe)(value)
+            return value
+    else:
+        def get(self):
+            return self.getVariable(offset, field.size, field)
+
+    get.__name__ = _getterName(variable.name)
+    get.__qualname__ = 'pytic2.' + get.__name__
+    get.__doc__ = variable.doc
+    if variable.unit is not None:
+        get.__doc__ += '\n\n           units: ' + variable.unit
+    return get
+
+for _variable in TIC_VARIABLES:
+    setattr(pytic2, _getterName(_variable.name), _variableGetter(_variable))
+del _variable
+
+# Kept for compatibility with the misspelled name of earlier versions
+pytic2.getDecayMOde = pytic2.getDecayMode
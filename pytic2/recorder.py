@@ -0,0 +1,254 @@
+import collections
+import ctypes
+import mmap
+import os
+import struct
+import threading
+import time
+
+from smbus2.smbus2 import I2C_M_RD
+
+# File header: magic, format version, start time (time.time())
+LOG_MAGIC = b'PYTIC2TX'
+LOG_VERSION = 1
+_HEADER = struct.Struct('<8sHd')
+# Message record: time since the start, transaction number, address, flags,
+# errno, payload length; followed by the payload
+_RECORD = struct.Struct('<dIHBHH')
+
+LOG_FLAG_READ = 0x01
+LOG_FLAG_ERROR = 0x02
+
+LogRecord = collections.namedtuple('LogRecord', 'timestamp transaction address read errno payload')
+
+class RecordingBus():
+    '''Wrapper around an SMBus object that appends every i2c_rdwr
+    transaction to a compact binary log.
+
+    Every message is stored with the time since the start of the log, its
+    transaction number, address, direction and payload: the data written,
+    the data read, or nothing when the transaction failed, in which case
+    the errno is stored. The log can be read with TransactionLog and
+    replayed with ReplayBus.
+    '''
+
+    def __init__(self, bus, path):
+        '''
+        :param bus: SMBus object to record
+        :param path: Log file; new records are appended to an existing log,
+                     after cutting off a partly written record at its end
+        '''
+        self.bus = bus
+        self.path = path
+        self._lock = threading.Lock()
+        exists = os.path.exists(path) and os.path.getsize(path) >= _HEADER.size
+        if exists:
+            log = TransactionLog(path)
+            try:
+                self._start = log.start
+                self._origin = time.monotonic() - (time.time() - log.start)
+                last, end = log.scan()
+            finally:
+                log.close()
+            self._transaction = last + 1
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._start = time.time()
+            self._origin = time.monotonic()
+            self._transaction = 0
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(LOG_MAGIC, LOG_VERSION, self._start))
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        timestamp = time.monotonic() - self._origin
+        error = None
+        try:
+            self.bus.i2c_rdwr(*i2c_msgs)
+        except OSError as exception:
+            error = exception
+        self._record(timestamp, i2c_msgs, error)
+        if error is not None:
+            raise error
+
+    def _record(self, timestamp, msgs, error):
+        chunks = []
+        errno = (error.errno or 0) if error is not None else 0
+        with self._lock:
+            transaction = self._transaction
+            self._transaction += 1
+            for msg in msgs:
+                read = msg.flags & I2C_M_RD
+                if read and error is not None:
+                    payload = b''
+                else:
+                    payload = ctypes.string_at(msg.buf, msg.len)
+                flags = (LOG_FLAG_READ if read else 0) | (LOG_FLAG_ERROR if error is not None else 0)
+                chunks.append(_RECORD.pack(timestamp, transaction, msg.addr, flags, errno, len(payload)))
+                chunks.append(payload)
+            self._file.write(b''.join(chunks))
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+class TransactionLog():
+    '''Read access to a transaction log through a read-only memory map.
+
+    Records are decoded lazily while iterating, so logs of any size can be
+    analysed without reading them into memory. A partly written record at
+    the end of the log is ignored.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.start = _HEADER.unpack_from(self._map, 0)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            self.close()
+            raise ValueError('{} is not a pytic2 transaction log'.format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def _records(self):
+        # Yields the records with the offset of the end of each
+        data = self._map
+        size = len(data)
+        position = _HEADER.size
+        while position + _RECORD.size <= size:
+            timestamp, transaction, address, flags, errno, length = _RECORD.unpack_from(data, position)
+            position += _RECORD.size
+            if position + length > size:
+                return
+            error = errno if flags & LOG_FLAG_ERROR else None
+            yield LogRecord(timestamp, transaction, address, bool(flags & LOG_FLAG_READ), error,
+                            data[position:position + length]), position + length
+            position += length
+
+    def records(self):
+        '''Yields the message records in the order they were written.'''
+
+        for record, _ in self._records():
+            yield record
+
+    def transactions(self):
+        '''Yields the transactions as lists of their message records.'''
+
+        current = []
+        for record in self.records():
+            if current and record.transaction != current[0].transaction:
+                yield current
+                current = []
+            current.append(record)
+        if current:
+            yield current
+
+    def lastTransaction(self):
+        '''Returns the number of the last transaction, -1 for an empty log.'''
+
+        return self.scan()[0]
+
+    def scan(self):
+        '''Returns the number of the last transaction (-1 for an empty log)
+        and the length of the log up to the end of its last complete record.'''
+
+        last, end = -1, _HEADER.size
+        for record, end in self._records():
+            last = record.transaction
+        return last, end
+
+class ReplayBus():
+    '''Bus that answers i2c_rdwr calls from a transaction log.
+
+    The transactions are consumed in order: the read messages are filled
+    with the recorded data and recorded errors are raised again. With
+    strict checking the addresses, directions and written data must match
+    the recording. The replay runs at the recorded pace multiplied by
+    speed, or as fast as possible with speed=None.
+    '''
+
+    def __init__(self, path, speed=None, strict=True):
+        self.log = TransactionLog(path)
+        self.speed = speed
+        self.strict = strict
+        self._transactions = self.log.transactions()
+        self._origin = None
+        self._lock = threading.Lock()
+        self.replayed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._transactions = iter(())
+        self.log.close()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        with self._lock:
+            records = next(self._transactions, None)
+            if records is None:
+                raise EOFError('end of the transaction log')
+            self._pace(records[0].timestamp)
+            if self.strict:
+                self._check(records, i2c_msgs)
+            self.replayed += 1
+            errno = records[0].errno
+            if errno is not None:
+                raise OSError(errno, os.strerror(errno))
+            for record, msg in zip(records, i2c_msgs):
+                if msg.flags & I2C_M_RD:
+                    ctypes.memmove(msg.buf, record.payload, min(msg.len, len(record.payload)))
+
+    def _pace(self, timestamp):
+        if self.speed is None:
+            return
+        now = time.monotonic()
+        if self._origin is None:
+            self._origin = now - timestamp / self.speed
+        delay = self._origin + timestamp / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def _check(self, records, msgs):
+        if len(records) != len(msgs):
+            raise ValueError('transaction {}: {} messages recorded, {} sent'.format(
+                records[0].transaction, len(records), len(msgs)))
+        for record, msg in zip(records, msgs):
+            read = bool(msg.flags & I2C_M_RD)
+            if record.address != msg.addr or record.read != read:
+                raise ValueError('transaction {}: recorded {} of address {}, got {} of address {}'.format(
+                    record.transaction, 'read' if record.read else 'write', record.address,
+                    'read' if read else 'write', msg.addr))
+            if not read and record.payload != ctypes.string_at(msg.buf, msg.len):
+                raise ValueError('transaction {}: written data differs from the recording'.format(record.transaction))
@@ -0,0 +1,119 @@
+import errno
+import random
+import threading
+import time
+
+from .pytic2 import TIC_RESET_CMD, TIC_GOHOME_CMD, TIC_HALTANDSETPOSITION_CMD, TIC_GETERROROCCURRED_CMD
+
+# errnos of transient bus errors: NACK, arbitration lost, timeout
+RETRYABLE_ERRNOS = frozenset((errno.EREMOTEIO, errno.EIO, errno.EAGAIN, errno.ETIMEDOUT, errno.ENXIO))
+
+class RetryPolicy():
+    '''Retries transient I2C errors within a fixed time budget.
+
+    Reads and idempotent writes are retried with jittered exponential
+    backoff until the attempts or the time budget are used up. Commands
+    whose repetition would change the outcome (reset, go home, halt and
+    set position, and the get errors occurred read, which clears the bits
+    it returns) are never retried.
+    '''
+
+    def __init__(self, attempts=3, budget=0.01, backoff=0.0005, maxBackoff=0.004, jitter=0.5,
+                 retryWrites=True,
+                 nonIdempotent=(TIC_RESET_CMD, TIC_GOHOME_CMD, TIC_HALTANDSETPOSITION_CMD, TIC_GETERROROCCURRED_CMD),
+                 errnos=RETRYABLE_ERRNOS):
+        '''
+        :param attempts: Maximum number of attempts, including the first
+        :param budget: Maximum time in seconds spent on one transaction,
+                       including the retries
+        :param backoff: Delay before the first retry in seconds, doubled
+                        for every further retry
+        :param maxBackoff: Upper limit of the delay in seconds
+        :param jitter: Relative random variation of the delay
+        :param retryWrites: Retry the idempotent write commands
+        :param nonIdempotent: Command bytes that are never retried
+        :param errnos: errnos that are considered transient
+        '''
+        self.attempts = attempts
+        self.budget = budget
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.jitter = jitter
+        self.retryWrites = retryWrites
+        self.nonIdempotent = frozenset(nonIdempotent)
+        self.errnos = frozenset(errnos)
+
+    def retryable(self, cmd, read):
+        '''Tells whether a transaction may be repeated.
+
+        :param cmd: Command byte of a message written by the transaction
+        :param read: Whether the transaction reads data
+        '''
+        if cmd in self.nonIdempotent:
+            return False
+        return read or self.retryWrites
+
+    def delay(self, retry):
+        '''Returns the backoff before the given retry (1 for the first).'''
+
+        delay = min(self.maxBackoff, self.backoff * (1 << (retry - 1)))
+        return delay * (1 + self.jitter * (2 * random.random() - 1))
+
+class CircuitBreaker():
+    '''Per-device circuit breaker.
+
+    After threshold consecutive failures of a device its circuit opens and
+    calls to the device are rejected immediately with OSError(EHOSTDOWN)
+    for cooldown seconds. Then one trial call is let through: its success
+    closes the circuit, its failure opens it again. One breaker can be
+    shared by all devices of a bus.
+    '''
+
+    def __init__(self, threshold=5, cooldown=1.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._openUntil = {}
+        self._trial = set()
+
+    def allow(self, address):
+        '''Raises OSError(EHOSTDOWN) when calls to the device are rejected.'''
+
+        with self._lock:
+            until = self._openUntil.get(address)
+            if until is None:
+                return
+            if time.monotonic() < until or address in self._trial:
+                raise OSError(errno.EHOSTDOWN, 'circuit open for device {}'.format(address))
+            self._trial.add(address)
+
+    def success(self, address):
+        with self._lock:
+            self._failures.pop(address, None)
+            self._openUntil.pop(address, None)
+            self._trial.discard(address)
+
+    def release(self, address):
+        '''Ends a half-open trial without changing the state.'''
+
+        with self._lock:
+            self._trial.discard(address)
+
+    def failure(self, address):
+        with self._lock:
+            failures = self._failures[address] = self._failures.get(address, 0) + 1
+            if failures >= self.threshold or address in self._trial:
+                self._openUntil[address] = time.monotonic() + self.cooldown
+            self._trial.discard(address)
+
+    def state(self, address):
+        '''Returns 'closed', 'open' or 'half-open' for a device.'''
+
+        with self._lock:
+            until = self._openUntil.get(address)
+            if until is None:
+                return 'closed'
+            if address in self._trial or time.monotonic() >= until:
+                return 'half-open'
+            return 'open'
@@ -0,0 +1,156 @@
+import errno
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from smbus2.smbus2 import I2C_M_RD
+
+from .pytic2 import (TIC_HALTANDHOLD_CMD, TIC_DEENERGIZE_CMD,
+                     TIC_RESETCOMMANDTIMEOUT_CMD)
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_HEARTBEAT = 1
+PRIORITY_MOTION = 2
+PRIORITY_TELEMETRY = 3
+
+_COMMAND_PRIORITIES = {
+    TIC_HALTANDHOLD_CMD: PRIORITY_EMERGENCY,
+    TIC_DEENERGIZE_CMD: PRIORITY_EMERGENCY,
+    TIC_RESETCOMMANDTIMEOUT_CMD: PRIORITY_HEARTBEAT,
+}
+
+def classify(msgs):
+    '''Returns the priority class of a transaction: the most urgent class of
+    its write messages, or telemetry for transactions that only read data.
+
+    :param msgs: i2c_msg objects of the transaction
+    '''
+    priority = PRIORITY_TELEMETRY
+    reads = any(msg.flags & I2C_M_RD for msg in msgs)
+    for msg in msgs:
+        if msg.flags & I2C_M_RD or msg.len == 0:
+            continue
+        cmd = msg.buf[0][0]
+        priority = min(priority, _COMMAND_PRIORITIES.get(cmd, PRIORITY_TELEMETRY if reads else PRIORITY_MOTION))
+    return priority
+
+def wireTime(msgs, clock):
+    '''Estimates the time a transaction occupies the bus.
+
+    Every message costs a (repeated) start condition and the address byte,
+    every byte 8 data bits plus the acknowledge bit, and the transaction
+    ends with a stop condition.
+
+    :param msgs: i2c_msg objects of the transaction
+    :param clock: Bus clock in Hz
+    :return: Wire time in seconds
+    '''
+    bits = 1
+    for msg in msgs:
+        bits += 1 + 9 * (1 + msg.len)
+    return bits / clock
+
+class BusScheduler():
+    '''Priority-aware wrapper around an SMBus object.
+
+    It can be passed to pytic2/pyi2c in place of the bus. When several
+    threads share the bus, the waiting transaction with the most urgent
+    priority class gets the bus next (emergency stop, command timeout
+    heartbeat, motion commands, telemetry reads), so a stop command only
+    waits for the transaction that is on the wire.
+
+    Admission control limits the queued wire time per priority class. A
+    transaction is rejected with OSError(EBUSY) when the estimated wire time
+    of the transactions queued ahead of it plus its own exceeds the budget
+    of its class.
+    '''
+
+    def __init__(self, bus, clock=100000, budgets=None):
+        '''
+        :param bus: SMBus object
+        :param clock: Bus clock in Hz, used for the wire time estimates
+        :param budgets: Optional dictionary of queued wire time budgets in
+                        seconds by priority class; None means unlimited
+        '''
+        self.bus = bus
+        self.clock = clock
+        self.budgets = {
+            PRIORITY_EMERGENCY: None,
+            PRIORITY_HEARTBEAT: None,
+            PRIORITY_MOTION: None,
+            PRIORITY_TELEMETRY: 0.05,
+        }
+        if budgets is not None:
+            self.budgets.update(budgets)
+        self._logger = logging.getLogger(__name__)
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._busy = False
+        self._maxWait = dict.fromkeys(self.budgets, 0.0)
+        self._count = dict.fromkeys(self.budgets, 0)
+        self._rejected = dict.fromkeys(self.budgets, 0)
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+    def i2c_rdwr(self, *msgs, priority=None):
+        '''Runs a combined transaction as soon as no more urgent transaction
+        is waiting.
+
+        :param msgs: i2c_msg objects
+        :param priority: Priority class, derived from the messages if None
+        '''
+        if priority is None:
+            priority = classify(msgs)
+        cost = wireTime(msgs, self.clock)
+        start = time.monotonic()
+        with self._condition:
+            budget = self.budgets.get(priority)
+            if budget is not None:
+                ahead = sum(entry[2] for entry in self._queue if entry[0] <= priority)
+                if ahead + cost > budget:
+                    self._rejected[priority] += 1
+                    raise OSError(errno.EBUSY, 'bus backlog exceeds the budget of priority {}'.format(priority))
+            entry = (priority, next(self._sequence), cost)
+            heapq.heappush(self._queue, entry)
+            try:
+                while self._busy or self._queue[0] is not entry:
+                    self._condition.wait()
+            except BaseException:
+                # An interrupted waiter must not stay in the queue and block
+                # the transactions behind it
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._busy = True
+            waited = time.monotonic() - start
+            self._count[priority] += 1
+            if waited > self._maxWait[priority]:
+                self._maxWait[priority] = waited
+        try:
+            self.bus.i2c_rdwr(*msgs)
+        finally:
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def backlog(self):
+        '''Returns the estimated wire time of the queued transactions in seconds.'''
+
+        with self._condition:
+            return sum(entry[2] for entry in self._queue)
+
+    def stats(self):
+        '''Returns the number of transactions, the number of rejected
+        transactions and the longest queueing delay in seconds by priority class.'''
+
+        with self._condition:
+            return {priority: {'count': self._count[priority],
+                               'rejected': self._rejected[priority],
+                               'maxWait': self._maxWait[priority]}
+                    for priority in self.budgets}
@@ -0,0 +1,204 @@
+import collections
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from .busworker import busWorker
+from .pytic2 import pytic2
+
+# Methods that poll until the motor stops: run on the worker they would
+# hold up every device of the bus, so channels do not offer them
+_BLOCKING = frozenset(('waitUntilReached', 'waitUntilStopped'))
+
+class SetpointChannel():
+    '''Non-blocking, latest-wins command queue of one device.
+
+    setTargetPosition() and setTargetVelocity() return at once. While a value
+    waits for the bus, a newer value of the same command replaces it, so the
+    device always receives the newest setpoint and the lag stays bounded by
+    about one transaction per command however fast the setpoints come in.
+    Every other pytic2 method is a barrier: it is queued in order, never
+    coalesced, and returns a concurrent.futures.Future. Setpoints are only
+    coalesced with setpoints queued after the last barrier. The waits
+    (waitUntilReached, waitUntilStopped) are not available, since they
+    would block the bus worker; call them on the pytic2 object.
+
+    The commands are sent by the shared worker thread of the bus, one per
+    turn, so the devices on the bus are served in turn::
+
+        channel = SetpointChannel(tic)
+        for target in joystick():
+            channel.setTargetVelocity(target)
+    '''
+
+    def __init__(self, tic):
+        '''
+        :param tic: pytic2 object
+        '''
+        self.tic = tic
+        self.address = tic.address
+        self._worker = busWorker(tic._interface.bus)
+        self._logger = logging.getLogger(__name__)
+        self._condition = threading.Condition()
+        # Entries: [method name, args, kwargs, future, time of the last update]
+        self._queue = collections.deque()
+        self._latest = {}
+        self._scheduled = False
+        self._closed = False
+        self.lastError = None
+        self.resetStats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def resetStats(self):
+        '''Resets the counters.'''
+
+        with self._condition:
+            self.sent = 0
+            self.dropped = 0
+            self.errors = 0
+            self._latencySum = 0.0
+            self._latencyMax = 0.0
+            self._latencyLast = 0.0
+
+    def setTargetPosition(self, target, profile=None):
+        '''Queues a target position, replacing a pending one; see pytic2.setTargetPosition.'''
+
+        self._coalesce('setTargetPosition', (target, profile))
+
+    def setTargetVelocity(self, target, profile=None):
+        '''Queues a target velocity, replacing a pending one; see pytic2.setTargetVelocity.'''
+
+        self._coalesce('setTargetVelocity', (target, profile))
+
+    def call(self, method, *args, **kwargs):
+        '''Queues any pytic2 method as a barrier.
+
+        :return: A concurrent.futures.Future for the result
+        '''
+        if method in _BLOCKING:
+            raise ValueError('{} would block the bus worker, call it on the pytic2 object'.format(method))
+        future = Future()
+        with self._condition:
+            self._checkOpen()
+            self._latest.clear()
+            self._queue.append([method, args, kwargs, future, time.monotonic()])
+            self._schedule()
+        return future
+
+    def pending(self):
+        '''Returns the number of queued commands.'''
+
+        with self._condition:
+            return len(self._queue)
+
+    def flush(self, timeout=None):
+        '''Waits until all queued commands have been sent.
+
+        :return: False if the timeout expired first
+        '''
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._scheduled, timeout)
+
+    def close(self, timeout=None):
+        '''Sends the queued commands and refuses new ones.'''
+
+        with self._condition:
+            self._closed = True
+        self.flush(timeout)
+
+    def stats(self):
+        '''Returns the counters: sent and dropped setpoints and barriers,
+        failed commands, queued commands and the latency in seconds from the
+        last update of a command to the end of its transaction.'''
+
+        with self._condition:
+            return {
+                'sent': self.sent,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'pending': len(self._queue),
+                'latencyLast': self._latencyLast,
+                'latencyMean': self._latencySum / self.sent if self.sent else 0.0,
+                'latencyMax': self._latencyMax,
+            }
+
+    def _checkOpen(self):
+        if self._closed:
+            raise RuntimeError('setpoint channel is closed')
+
+    def _coalesce(self, method, args):
+        now = time.monotonic()
+        with self._condition:
+            self._checkOpen()
+            entry = self._latest.get(method)
+            if entry is not None:
+                entry[1] = args
+                entry[4] = now
+                self.dropped += 1
+                return
+            entry = self._latest[method] = [method, args, {}, None, now]
+            self._queue.append(entry)
+            self._schedule()
+
+    def _schedule(self):
+        # At most one send is queued on the bus worker at a time
+        if not self._scheduled:
+            self._scheduled = True
+            self._worker.submit(self.address, self._sendNext)
+
+    def _sendNext(self):
+        with self._condition:
+            method, args, kwargs, future, _ = entry = self._queue.popleft()
+            if self._latest.get(method) is entry:
+                del self._latest[method]
+        cancelled = future is not None and not future.set_running_or_notify_cancel()
+        result = error = None
+        if not cancelled:
+            try:
+                result = getattr(self.tic, method)(*args, **kwargs)
+            except Exception as exception:
+                error = exception
+        done = time.monotonic()
+        with self._condition:
+            if error is None and not cancelled:
+                latency = done - entry[4]
+                self.sent += 1
+                self._latencyLast = latency
+                self._latencySum += latency
+                self._latencyMax = max(self._latencyMax, latency)
+            elif error is not None:
+                self.errors += 1
+                self.lastError = error
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug('%s failed: address = %d, error = %s', method, self.address, error)
+            self._scheduled = False
+            if self._queue:
+                self._schedule()
+            self._condition.notify_all()
+        if future is not None and not cancelled:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+def _barrier(name):
+    method = getattr(pytic2, name)
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        return self.call(name, *args, **kwargs)
+
+    return call
+
+for _name in dir(pytic2):
+    if (not _name.startswith('_') and callable(getattr(pytic2, _name)) and _name not in _BLOCKING
+            and _name not in SetpointChannel.__dict__):
+        setattr(SetpointChannel, _name, _barrier(_name))
+del _name
@@ -0,0 +1,423 @@
+import errno
+import functools
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python 3.7
+    resource_tracker = shared_memory = None
+
+from .pyi2c import BusBatch
+from .pytic2 import *
+from .pytic2 import _MOTION_FIELDS, _MotionState, _MotionWait, _getterName
+
+# Segment header: magic, version, number of slots, slot size, command socket
+# address, length and bytes of the generated authentication key
+_HEADER = struct.Struct('<4sHHH110sH32s6x')
+_MAGIC = b'TIC2'
+_VERSION = 2
+_AUTHKEY_LENGTH = 32
+
+# Slot of one device: sequence number, bus index, address, sample time
+# (time.monotonic() of the owner), errno of the last poll, variable block
+_SEQUENCE = struct.Struct('<I')
+_SLOT = struct.Struct('<IBBxxdi4x')
+_META = struct.Struct('<di')
+_META_OFFSET = 8
+_SLOT_SIZE = (_SLOT.size + TIC_VARIABLES_LENGTH + 7) & ~7
+_BLOCK = struct.Struct('<{}s'.format(TIC_VARIABLES_LENGTH))
+_EMPTY = struct.Struct('')
+
+# Attempts to read a slot consistently while the owner keeps writing it; after
+# the first few the reader sleeps briefly so the owner can finish the write
+_READ_ATTEMPTS = 1000
+_SPIN_ATTEMPTS = 16
+_READ_BACKOFF = 0.00005
+
+# Segments created by a StateServer of this process
+_served = set()
+
+def _requireSharedMemory(name):
+    if shared_memory is None:
+        raise ImportError('{} requires multiprocessing.shared_memory (Python 3.8 or later)'.format(name))
+
+class StateServer():
+    '''Owner of a set of Tics that publishes their variables to other
+    processes.
+
+    A background thread reads the variable block of every device, all devices
+    of a bus in one BusBatch, and publishes it to a shared memory segment. Each
+    device has a slot guarded by a sequence number (a seqlock): it is odd
+    while the slot is written, so readers retry instead of seeing a torn
+    block. Commands from StateClient objects arrive on a local socket, only
+    accessible to the user of the owner, and are executed by the owner
+    after the client has authenticated. Without an explicit key a random
+    one is generated and published in the segment, which only the same
+    user can open::
+
+        with StateServer(tics, name='tics') as server:
+            ...
+
+        # Another process
+        client = StateClient('tics')
+        tic = client.device(14)
+        tic.getCurrentPosition()        # from shared memory
+        tic.setTargetPosition(1000)     # forwarded to the owner
+    '''
+
+    def __init__(self, tics, name=None, rate=50.0, address=None, authkey=None):
+        '''
+        :param tics: pytic2 objects to publish
+        :param name: Name of the shared memory segment; generated if None
+        :param rate: Poll rate in Hz
+        :param address: Path of the command socket; next to the segment name
+                        in the temporary directory if None
+        :param authkey: Key the clients must authenticate with; a random
+                        key published in the segment if None
+        '''
+        _requireSharedMemory('StateServer')
+        self.tics = list(tics)
+        self.period = 1.0 / rate
+        self._logger = logging.getLogger(__name__)
+        self._shm = shared_memory.SharedMemory(name, create=True,
+                                               size=_HEADER.size + len(self.tics) * _SLOT_SIZE)
+        self.name = self._shm.name
+        _served.add(self.name)
+        self.address = address if address is not None else os.path.join(
+            tempfile.gettempdir(), '{}.sock'.format(self.name.lstrip('/')))
+        # The segment is created with mode 0600, like the socket
+        published = authkey is None
+        self.authkey = os.urandom(_AUTHKEY_LENGTH) if published else authkey
+        self._buses = []
+        self._devices = {}
+        offsets = {}
+        for index, tic in enumerate(self.tics):
+            bus = tic._interface.bus
+            if bus not in offsets:
+                offsets[bus] = len(self._buses)
+                self._buses.append((bus, []))
+            offset = _HEADER.size + index * _SLOT_SIZE
+            self._buses[offsets[bus]][1].append((offset, tic))
+            self._devices[(offsets[bus], tic.address)] = tic
+            _SLOT.pack_into(self._shm.buf, offset, 0, offsets[bus], tic.address, 0.0, 0)
+        _HEADER.pack_into(self._shm.buf, 0, _MAGIC, _VERSION, len(self.tics), _SLOT_SIZE,
+                          self.address.encode(), _AUTHKEY_LENGTH if published else 0,
+                          self.authkey if published else b'')
+        self._listener = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        '''Publishes a first poll and starts polling and serving commands in
+        background threads.'''
+
+        if self._threads:
+            raise RuntimeError('server is already running')
+        self._stop.clear()
+        self.poll()
+        # The socket is created with mode 0600 instead of being opened up by
+        # a later chmod
+        umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, 'AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        for target, name in ((self._run, 'StateServer'), (self._accept, 'StateServer.accept')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        '''Stops polling and serving commands.'''
+
+        self._stop.set()
+        if self._listener is not None:
+            # Closing the listener does not interrupt accept(): connect once to wake it up
+            try:
+                Client(self.address, 'AF_UNIX', authkey=self.authkey).close()
+            except (OSError, EOFError):
+                pass
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def close(self):
+        '''Stops the server and removes the shared memory segment.'''
+
+        self.stop()
+        self._shm.close()
+        self._shm.unlink()
+        _served.discard(self.name)
+
+    def poll(self):
+        '''Reads and publishes the variables of all devices once.'''
+
+        for bus, devices in self._buses:
+            batch = BusBatch(bus)
+            futures = [batch.device(tic).getVariableBlock(0, TIC_VARIABLES_LENGTH, bytes) for _, tic in devices]
+            try:
+                batch.flush()
+            except OSError as error:
+                self._logger.debug('poll: bus transaction failed: %s', error)
+            timestamp = time.monotonic()
+            for (offset, tic), future in zip(devices, futures):
+                if future.exception() is None:
+                    self._publish(offset, timestamp, future.result())
+                    continue
+                # One failing device fails the whole batch: read the others on their own
+                try:
+                    data = tic.getVariableBlock(0, TIC_VARIABLES_LENGTH, bytes)
+                except OSError as error:
+                    self._publish(offset, time.monotonic(), None, error.errno or errno.EIO)
+                else:
+                    self._publish(offset, time.monotonic(), data)
+
+    def _publish(self, offset, timestamp, data, error=0):
+        buf = self._shm.buf
+        sequence = _SEQUENCE.unpack_from(buf, offset)[0]
+        _SEQUENCE.pack_into(buf, offset, sequence + 1)
+        _META.pack_into(buf, offset + _META_OFFSET, timestamp, error)
+        if data is not None:
+            buf[offset + _SLOT.size:offset + _SLOT.size + TIC_VARIABLES_LENGTH] = data
+        _SEQUENCE.pack_into(buf, offset, (sequence + 2) & 0xFFFFFFFF)
+
+    def _run(self):
+        start = time.monotonic()
+        tick = 1
+        while not self._stop.wait(max(0.0, start + tick * self.period - time.monotonic())):
+            self.poll()
+            # Skip the periods that have already passed instead of bunching polls
+            tick = max(tick + 1, int((time.monotonic() - start) / self.period))
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                return
+            except Exception as error:
+                self._logger.debug('accept: %s', error)
+                continue
+            if self._stop.is_set():
+                connection.close()
+                return
+            threading.Thread(target=self._serve, args=(connection,), name='StateServer.connection',
+                             daemon=True).start()
+
+    def _serve(self, connection):
+        with connection:
+            while not self._stop.is_set():
+                try:
+                    bus, address, method, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    tic = self._devices.get((bus, address))
+                    if tic is None:
+                        raise KeyError('no device {} on bus {}'.format(address, bus))
+                    if method.startswith('_') or not callable(getattr(pytic2, method, None)):
+                        raise AttributeError('pytic2 has no method {}'.format(method))
+                    reply = (True, getattr(tic, method)(*args, **kwargs))
+                except Exception as error:
+                    reply = (False, error)
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    return
+
+class StateClient():
+    '''Read-only view of the devices published by a StateServer, possibly in
+    another process. Reading a variable does not cause any bus traffic.'''
+
+    def __init__(self, name, authkey=None):
+        '''
+        :param name: Name of the shared memory segment of the server
+        :param authkey: Key of the server; the key published in the segment
+                        if None
+        '''
+        _requireSharedMemory('StateClient')
+        try:
+            self._shm = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            # Before Python 3.13 the resource tracker would remove the
+            # segment of the server when this process exits
+            self._shm = shared_memory.SharedMemory(name)
+            if self._shm.name not in _served:
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+        magic, version, count, slotSize, address, keyLength, key = _HEADER.unpack_from(self._shm.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._shm.close()
+            raise ValueError('{} is not a pytic2 state segment'.format(name))
+        self.address = address.rstrip(b'\0').decode()
+        self.authkey = authkey if authkey is not None else key[:keyLength] or None
+        self._slots = {}
+        for index in range(count):
+            offset = _HEADER.size + index * slotSize
+            _, bus, device, _, _ = _SLOT.unpack_from(self._shm.buf, offset)
+            self._slots[(bus, device)] = offset
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        self._shm.close()
+
+    def devices(self):
+        '''Returns the (bus index, address) pairs of the published devices.'''
+
+        return list(self._slots)
+
+    def device(self, address, bus=None):
+        '''Returns a SharedTic for a published device.
+
+        :param address: Device number of the Tic
+        :param bus: Index of the bus in the order of the server; only needed
+                    when devices on several buses have this address
+        '''
+        matches = [key for key in self._slots if key[1] == address and bus in (None, key[0])]
+        if not matches:
+            raise KeyError('device {} is not published'.format(address))
+        if len(matches) > 1:
+            raise ValueError('device {} is on several buses'.format(address))
+        return SharedTic(self, matches[0][0], address, self._slots[matches[0]])
+
+    def read(self, offset, fields):
+        '''Reads a consistent copy of a slot.
+
+        :param offset: Offset of the slot in the segment
+        :param fields: Struct applied at the start of the variable block
+        :return: The sample time and the decoded fields
+        '''
+        buf = self._shm.buf
+        for attempt in range(_READ_ATTEMPTS):
+            if attempt >= _SPIN_ATTEMPTS:
+                time.sleep(_READ_BACKOFF)
+            sequence = _SEQUENCE.unpack_from(buf, offset)[0]
+            if sequence & 1:
+                continue
+            timestamp, error = _META.unpack_from(buf, offset + _META_OFFSET)
+            values = fields.unpack_from(buf, offset + _SLOT.size)
+            if _SEQUENCE.unpack_from(buf, offset)[0] != sequence:
+                continue
+            if error:
+                raise OSError(error, os.strerror(error))
+            return timestamp, values
+        raise TimeoutError('slot at offset {} is not stable'.format(offset))
+
+    def call(self, bus, address, method, *args, **kwargs):
+        '''Runs a pytic2 method of a device in the server process.'''
+
+        with self._lock:
+            if self._connection is None:
+                self._connection = Client(self.address, 'AF_UNIX', authkey=self.authkey)
+            self._connection.send((bus, address, method, args, kwargs))
+            ok, result = self._connection.recv()
+        if not ok:
+            raise result
+        return result
+
+class SharedTic():
+    '''pytic2 look-alike backed by a StateClient.
+
+    The getters of the variable block return the values of the last poll of
+    the server and raise OSError when that poll failed. All other methods are
+    forwarded to the server.
+    '''
+
+    def __init__(self, client, bus, address, offset):
+        self.client = client
+        self.bus = bus
+        self.address = address
+        self._offset = offset
+
+    def age(self):
+        '''Returns the age of the published variables in seconds.'''
+
+        timestamp, _ = self.client.read(self._offset, _EMPTY)
+        return time.monotonic() - timestamp
+
+    def getSnapshot(self):
+        '''Returns the last published variable block as a TicSnapshot.'''
+
+        return self._getSnapshot()[1]
+
+    def _getSnapshot(self):
+        timestamp, (data,) = self.client.read(self._offset, _BLOCK)
+        return timestamp, TicSnapshot(data)
+
+    def waitUntilReached(self, target=None, timeout=None, pollInterval=0.005):
+        '''Waits until the motor has stopped at the target position, following
+        the published variables; see pytic2.waitUntilReached. Only the polls
+        of the server after the call count.'''
+
+        wait = _MotionWait(self.address, target, timeout, pollInterval)
+        start = time.monotonic()
+        while True:
+            timestamp, snapshot = self._getSnapshot()
+            if timestamp <= start:
+                if wait.deadline is not None and time.monotonic() >= wait.deadline:
+                    raise TimeoutError('Tic {} did not finish the move in time'.format(self.address))
+                time.sleep(pollInterval)
+                continue
+            delay = wait.next(_MotionState(*(getattr(snapshot, name) for name in _MOTION_FIELDS)))
+            if delay is None:
+                return wait.polls
+            time.sleep(delay)
+
+    def waitUntilStopped(self, timeout=None, pollInterval=0.005):
+        '''Waits until the motor has stopped; see pytic2.waitUntilStopped.'''
+
+        return self.waitUntilReached(None, timeout, pollInterval)
+
+def _sharedGetter(name, offset, code):
+    field = struct.Struct('<{}x{}'.format(offset, code))
+
+    @functools.wraps(getattr(pytic2, name))
+    def get(self):
+        return self.client.read(self._offset, field)[1][0]
+
+    return get
+
+def _forwarded(name):
+    method = getattr(pytic2, name)
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        return self.client.call(self.bus, self.address, name, *args, **kwargs)
+
+    return call
+
+for _variable in TIC_VARIABLES:
+    setattr(SharedTic, _getterName(_variable.name),
+            _sharedGetter(_getterName(_variable.name), _variable.offset, _variable.format))
+SharedTic.getDecayMOde = SharedTic.getDecayMode
+for _name in dir(pytic2):
+    if not _name.startswith('_') and callable(getattr(pytic2, _name)) and _name not in SharedTic.__dict__:
+        setattr(SharedTic, _name, _forwarded(_name))
+del _variable, _name
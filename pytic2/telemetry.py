@@ -0,0 +1,211 @@
+import logging
+import math
+import struct
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .pyi2c import BusBatch
+from .pytic2 import _SNAPSHOT_LAYOUT, _compileLayout
+
+_FIELDS = {name: (offset, code) for name, offset, code in _SNAPSHOT_LAYOUT}
+
+class _Channel():
+    '''Ring buffer and decoder of one device.'''
+
+    def __init__(self, tic, variables, capacity):
+        layout = sorted(((name,) + _FIELDS[name] for name in variables), key=lambda field: field[1])
+        self.tic = tic
+        self.order = [variables.index(name) + 1 for name, _, _ in layout]
+        self.offset = layout[0][1]
+        self.length = layout[-1][1] + struct.calcsize('<' + layout[-1][2]) - self.offset
+        self.struct = _compileLayout([(name, offset - self.offset, code) for name, offset, code in layout])
+        # Every sample is written twice, at row i and row i + capacity, so the
+        # latest n samples always form one contiguous slice.
+        self.buffer = np.full((2 * capacity, len(variables) + 1), np.nan)
+        self.count = 0
+        self.errors = 0
+
+    def decode(self, data):
+        return self.struct.unpack(bytes(data))
+
+    def store(self, timestamp, values, capacity):
+        index = self.count % capacity
+        for row in (index, index + capacity):
+            self.buffer[row, 0] = timestamp
+            if values is None:
+                self.buffer[row, 1:] = np.nan
+            else:
+                self.buffer[row, self.order] = values
+        self.count += 1
+
+class TelemetryRecorder():
+    '''Samples variables of one or more Tics at a fixed rate in a background
+    thread and stores them in preallocated NumPy ring buffers.
+
+    Each device has a buffer with a timestamp column (time.monotonic()) and
+    one column per variable, in the order given. The variables of a device
+    are read in one combined transaction and all devices on the same bus are
+    read in one BusBatch; when the batch fails, the devices are read on their
+    own. A failed read stores a row of NaN values.
+
+    Requires NumPy.
+    '''
+
+    def __init__(self, tics, variables=('currentPosition', 'currentVelocity', 'encoderPosition'),
+                 rate=200.0, capacity=10000):
+        '''
+        :param tics: pytic2 objects to sample
+        :param variables: TicSnapshot field names of the variables to sample
+        :param rate: Sample rate in Hz
+        :param capacity: Number of samples kept per device
+        '''
+        if np is None:
+            raise ImportError('TelemetryRecorder requires numpy')
+        unknown = [name for name in variables if name not in _FIELDS]
+        if unknown:
+            raise ValueError('unknown variables: {}'.format(', '.join(unknown)))
+        self.variables = tuple(variables)
+        self.period = 1.0 / rate
+        self.capacity = capacity
+        self._logger = logging.getLogger(__name__)
+        self._channels = [_Channel(tic, list(self.variables), capacity) for tic in tics]
+        self._buses = {}
+        for channel in self._channels:
+            self._buses.setdefault(channel.tic._interface.bus, []).append(channel)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._resetJitter()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _resetJitter(self):
+        self._samples = 0
+        self._missed = 0
+        self._jitterMean = 0.0
+        self._jitterM2 = 0.0
+        self._jitterMax = 0.0
+
+    def start(self):
+        '''Starts sampling in a background thread.'''
+
+        if self._thread is not None:
+            raise RuntimeError('recorder is already running')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='TelemetryRecorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''Stops sampling and waits for the background thread.'''
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self):
+        '''Takes one sample of all devices.'''
+
+        timestamp = time.monotonic()
+        for bus, channels in self._buses.items():
+            batch = BusBatch(bus)
+            futures = [batch.device(channel.tic).getVariableBlock(channel.offset, channel.length, channel.decode)
+                       for channel in channels]
+            try:
+                batch.flush()
+            except OSError as error:
+                self._logger.debug('sample: bus transaction failed: %s', error)
+            values = []
+            for channel, future in zip(channels, futures):
+                if future.exception() is None:
+                    values.append(future.result())
+                    continue
+                # The failing device aborts the batch: read the others on their own
+                try:
+                    values.append(channel.tic.getVariableBlock(channel.offset, channel.length, channel.decode))
+                except OSError as error:
+                    self._logger.debug('sample: address = %d, error = %s', channel.tic.address, error)
+                    values.append(None)
+            with self._lock:
+                for channel, value in zip(channels, values):
+                    if value is None:
+                        channel.errors += 1
+                    channel.store(timestamp, value, self.capacity)
+
+    def _run(self):
+        start = time.monotonic()
+        tick = 0
+        while not self._stop.is_set():
+            deadline = start + tick * self.period
+            delay = deadline - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            self._recordJitter(time.monotonic() - deadline)
+            self.sample()
+            tick += 1
+            # Skip the periods that have already passed instead of bunching samples
+            behind = int((time.monotonic() - start) / self.period) - tick
+            if behind > 0:
+                self._missed += behind
+                tick += behind
+
+    def _recordJitter(self, jitter):
+        self._samples += 1
+        delta = jitter - self._jitterMean
+        self._jitterMean += delta / self._samples
+        self._jitterM2 += delta * (jitter - self._jitterMean)
+        self._jitterMax = max(self._jitterMax, jitter)
+
+    def _channel(self, tic):
+        if isinstance(tic, int):
+            return self._channels[tic]
+        for channel in self._channels:
+            if channel.tic is tic:
+                return channel
+        raise KeyError(tic)
+
+    def latest(self, tic=0, n=None):
+        '''Returns a view of the latest n samples of a device, oldest first.
+        Column 0 is the timestamp, the other columns follow the variables.
+
+        The view is not a copy: rows are overwritten once the ring buffer
+        wraps around. Use .copy() to keep the data.
+
+        :param tic: pytic2 object or index of the device
+        :param n: Number of samples; all available samples if None
+        '''
+        channel = self._channel(tic)
+        with self._lock:
+            available = min(channel.count, self.capacity)
+            n = available if n is None else min(n, available)
+            end = channel.count % self.capacity + self.capacity
+            return channel.buffer[end - n:end]
+
+    def column(self, name, tic=0, n=None):
+        '''Returns a view of the latest n samples of one variable of a device.'''
+
+        return self.latest(tic, n)[:, self.variables.index(name) + 1]
+
+    def errors(self, tic=0):
+        '''Returns the number of failed samples of a device.'''
+
+        return self._channel(tic).errors
+
+    def jitter(self):
+        '''Returns statistics of the sampling jitter: the delay of the samples
+        behind their schedule (mean, standard deviation and maximum in seconds)
+        and the number of periods skipped because sampling fell behind.'''
+
+        std = math.sqrt(self._jitterM2 / self._samples) if self._samples else 0.0
+        return {'samples': self._samples, 'mean': self._jitterMean, 'std': std,
+                'max': self._jitterMax, 'missed': self._missed}
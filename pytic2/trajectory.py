@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+
+from .pyi2c import BusBatch
+
+def sampleProfile(velocity, duration, rate):
+    '''Samples a velocity profile given as a function of time.
+
+    :param velocity: Function returning the velocity in microsteps per
+                     10,000 s at a time in seconds since the start
+    :param duration: Length of the profile in seconds
+    :param rate: Sample rate in Hz
+    :return: List of velocities
+    '''
+    count = int(round(duration * rate)) + 1
+    return [int(round(velocity(index / rate))) for index in range(count)]
+
+class TrajectoryStreamer():
+    '''Streams sampled velocity profiles to one or more Tics with
+    setTargetVelocity at a fixed control rate.
+
+    The update times are derived from the start time (deadline k is
+    start + k / rate), so sleep overshoot does not accumulate. When an
+    update is late by one or more periods the profile index follows the
+    clock: the skipped samples are counted as missed deadlines and never
+    sent in a burst. The updates of all devices on one bus are sent in one
+    transaction, together with resetCommandTimeout keepalives.
+
+    With feedback enabled the streamer compares getCurrentPosition with the
+    position integrated from the profile and adds gain * error to the
+    commanded velocities.
+    '''
+
+    def __init__(self, profiles, rate=500.0, keepAlive=0.5, feedbackEvery=None, gain=0.0):
+        '''
+        :param profiles: Dictionary of velocity sequences (microsteps per
+                         10,000 s, one sample per period) by pytic2 object
+        :param rate: Control rate in Hz
+        :param keepAlive: Interval of the resetCommandTimeout keepalives in
+                          seconds, None to disable them
+        :param feedbackEvery: Read the positions every this many periods,
+                              None to disable the position feedback
+        :param gain: Proportional feedback gain in 1/s
+        '''
+        self.profiles = {tic: list(profile) for tic, profile in profiles.items()}
+        self.period = 1.0 / rate
+        self.keepAlive = keepAlive
+        self.feedbackEvery = feedbackEvery
+        self.gain = gain
+        self.length = max((len(profile) for profile in self.profiles.values()), default=0)
+        self._logger = logging.getLogger(__name__)
+        self._buses = {}
+        for tic in self.profiles:
+            self._buses.setdefault(tic._interface.bus, []).append(tic)
+        self._stop = threading.Event()
+        self._thread = None
+        self.missed = 0
+        self.sent = 0
+        self.maxLateness = 0.0
+        self.errors = 0
+        self._correction = dict.fromkeys(self.profiles, 0)
+
+    def _expected(self, tic, start, index):
+        '''Position the profile reaches at the given sample.'''
+
+        cumulative = self._cumulative[tic]
+        return start + cumulative[min(index, len(cumulative) - 1)]
+
+    def _prepare(self):
+        self._cumulative = {}
+        for tic, profile in self.profiles.items():
+            position = 0.0
+            cumulative = [0.0]
+            for velocity in profile:
+                position += velocity * self.period / 1e4
+                cumulative.append(position)
+            self._cumulative[tic] = cumulative
+        self._startPositions = {}
+        if self.feedbackEvery:
+            for tic in self.profiles:
+                self._startPositions[tic] = tic.getCurrentPosition()
+
+    def _velocity(self, tic, index):
+        profile = self.profiles[tic]
+        if not profile:
+            return 0
+        velocity = profile[min(index, len(profile) - 1)] + self._correction[tic]
+        return max(-500000000, min(500000000, int(velocity)))
+
+    def _send(self, index, feedback, keepAlive):
+        for bus, tics in self._buses.items():
+            batch = BusBatch(bus)
+            positions = {}
+            for tic in tics:
+                device = batch.device(tic)
+                device.setTargetVelocity(self._velocity(tic, index))
+                if keepAlive:
+                    device.resetCommandTimeout()
+                if feedback:
+                    positions[tic] = device.getCurrentPosition()
+            try:
+                batch.flush()
+            except OSError as error:
+                self.errors += 1
+                self._logger.warning('update %d failed: %s', index, error)
+                continue
+            self.sent += len(tics)
+            for tic, position in positions.items():
+                # The position is read in the transaction of this update, at
+                # the time of sample index
+                error = self._expected(tic, self._startPositions[tic], index) - position.result()
+                self._correction[tic] = self.gain * error * 1e4
+
+    def _halt(self):
+        for tic in self.profiles:
+            try:
+                tic.setTargetVelocity(0)
+            except Exception as error:
+                self.errors += 1
+                self._logger.warning('halting %s failed: %s', tic.address, error)
+
+    def run(self):
+        '''Streams the profiles and blocks until they have been sent or
+        stop() is called. Returns the statistics, see stats().
+
+        Every axis is commanded zero velocity when the run ends, also when
+        it ends with an exception.'''
+
+        self._stop.clear()
+        try:
+            self._prepare()
+            start = time.monotonic()
+            lastKeepAlive = start
+            index = 0
+            while index < self.length and not self._stop.is_set():
+                deadline = start + index * self.period
+                delay = deadline - time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+                now = time.monotonic()
+                lateness = now - deadline
+                self.maxLateness = max(self.maxLateness, lateness)
+                if lateness >= self.period:
+                    skipped = int(lateness / self.period)
+                    self.missed += skipped
+                    index = min(index + skipped, self.length - 1)
+                keepAlive = self.keepAlive is not None and now - lastKeepAlive >= self.keepAlive
+                if keepAlive:
+                    lastKeepAlive = now
+                feedback = bool(self.feedbackEvery) and index % self.feedbackEvery == 0
+                self._send(index, feedback, keepAlive)
+                index += 1
+        finally:
+            self._halt()
+        return self.stats()
+
+    def start(self):
+        '''Streams the profiles in a background thread.'''
+
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('streamer is already running')
+        self._thread = threading.Thread(target=self.run, name='TrajectoryStreamer', daemon=True)
+        self._thread.start()
+
+    def stop(self, halt=True):
+        '''Stops streaming and, unless halt is False, commands zero velocity.'''
+
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if halt:
+            self._halt()
+
+    def join(self, timeout=None):
+        '''Waits for the background thread to finish the profiles.'''
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        '''Returns the number of sent updates, missed deadlines, failed bus
+        transactions and the largest lateness of an update in seconds.'''
+
+        return {'sent': self.sent, 'missed': self.missed, 'errors': self.errors,
+                'maxLateness': self.maxLateness}
@@ -0,0 +1,107 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Microsteps per full step for the values of the "step mode" variable
+STEP_MODE_MICROSTEPS = {0: 1, 1: 2, 2: 4, 3: 8, 4: 16, 5: 32, 6: 2, 7: 64, 8: 128, 9: 256}
+
+def _array(value):
+    if np is not None and isinstance(value, (list, tuple)):
+        return np.asarray(value)
+    return value
+
+def _round(value):
+    if np is not None and isinstance(value, np.ndarray):
+        return np.rint(value).astype(np.int64)
+    return int(round(value))
+
+class AxisProfile():
+    '''Conversions between the raw Tic units of an axis and physical units.
+
+    The physical unit is whatever unitsPerRev is given in: mm for a lead
+    screw with unitsPerRev set to its lead, degrees with 360 divided by the
+    gear ratio, and so on. All conversions accept scalars as well as NumPy
+    arrays (lists and tuples are converted), so recorded samples are
+    converted with one vectorized call. Conversions to raw units round to
+    integers.
+
+    Raw units: positions in microsteps, speeds in microsteps per 10,000 s,
+    accelerations in microsteps per 100 s², current limits in units of
+    currentStep mA and the time since the last step in 1/3 us.
+    '''
+
+    def __init__(self, stepsPerRev=200, microsteps=1, unitsPerRev=1.0, currentStep=32):
+        '''
+        :param stepsPerRev: Full steps per revolution of the motor
+        :param microsteps: Microsteps per full step
+        :param unitsPerRev: Physical distance per motor revolution
+        :param currentStep: Milliamps per current limit unit
+        '''
+        self.stepsPerRev = stepsPerRev
+        self.microsteps = microsteps
+        self.unitsPerRev = unitsPerRev
+        self.currentStep = currentStep
+
+    @classmethod
+    def fromTic(cls, tic, stepsPerRev=200, unitsPerRev=1.0, currentStep=32):
+        '''Creates a profile with the microstep factor of the step mode
+        currently used by a Tic.'''
+
+        return cls(stepsPerRev, STEP_MODE_MICROSTEPS[tic.getStepMode()], unitsPerRev, currentStep)
+
+    def __repr__(self):
+        return 'AxisProfile(stepsPerRev={}, microsteps={}, unitsPerRev={}, currentStep={})'.format(
+            self.stepsPerRev, self.microsteps, self.unitsPerRev, self.currentStep)
+
+    @property
+    def microstepsPerUnit(self):
+        return self.stepsPerRev * self.microsteps / self.unitsPerRev
+
+    def positionToUnits(self, position):
+        '''Microsteps to units.'''
+
+        return _array(position) / self.microstepsPerUnit
+
+    def unitsToPosition(self, units):
+        '''Units to microsteps.'''
+
+        return _round(_array(units) * self.microstepsPerUnit)
+
+    def speedToUnits(self, speed):
+        '''Microsteps per 10,000 s to units per second.'''
+
+        return _array(speed) / (1e4 * self.microstepsPerUnit)
+
+    def unitsToSpeed(self, units):
+        '''Units per second to microsteps per 10,000 s.'''
+
+        return _round(_array(units) * 1e4 * self.microstepsPerUnit)
+
+    def accelToUnits(self, accel):
+        '''Microsteps per 100 s² to units per second².'''
+
+        return _array(accel) / (100 * self.microstepsPerUnit)
+
+    def unitsToAccel(self, units):
+        '''Units per second² to microsteps per 100 s².'''
+
+        return _round(_array(units) * 100 * self.microstepsPerUnit)
+
+    def currentToMilliamps(self, current):
+        '''Current limit units to mA.'''
+
+        return _array(current) * self.currentStep
+
+    def milliampsToCurrent(self, milliamps):
+        '''mA to current limit units, rounded down so the limit is not exceeded.'''
+
+        value = _array(milliamps) // self.currentStep
+        if np is not None and isinstance(value, np.ndarray):
+            return value.astype(np.int64)
+        return int(value)
+
+    def stepTimeToSeconds(self, time):
+        '''Time since the last step in 1/3 us to seconds.'''
+
+        return _array(time) / 3e6
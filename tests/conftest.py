@@ -0,0 +1,21 @@
+import pytest
+
+from pytic2 import FakeSMBus, TicEmulator, VirtualClock
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+@pytest.fixture
+def makeBus(clock):
+    '''Returns a factory of FakeSMBus objects with an energized TicEmulator
+    at each address, all on the virtual clock.'''
+
+    def make(addresses=(14,), commandTimeout=0, **options):
+        bus = FakeSMBus(clock=clock, **options)
+        for address in addresses:
+            emulator = bus.add(TicEmulator(address, clock=clock, commandTimeout=commandTimeout))
+            emulator.errorStatus = 0
+        return bus
+
+    return make
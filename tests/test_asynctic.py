@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+from pytic2 import *
+
+def test_coroutines_run_on_the_bus_worker(makeBus):
+    bus = makeBus((14, 15))
+
+    async def main():
+        first, second = AsyncTic(bus, 14), AsyncTic(bus, 15)
+        await asyncio.gather(first.haltAndSetPosition(100), second.haltAndSetPosition(-100))
+        return await asyncio.gather(first.getCurrentPosition(), second.getCurrentPosition())
+
+    assert asyncio.run(main()) == [100, -100]
+    busWorker(bus).close()
+
+def test_devices_are_served_in_turn():
+    worker = BusWorker(FakeSMBus())
+    release = threading.Event()
+    order = []
+    worker.submit('block', release.wait)
+    futures = [worker.submit(key, order.append, (key, index)) for key in 'ab' for index in range(3)]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    worker.close()
+
+    assert order == [('a', 0), ('b', 0), ('a', 1), ('b', 1), ('a', 2), ('b', 2)]
+
+def test_waitUntilReached_does_not_block_the_loop():
+    emulator = TicEmulator(14, commandTimeout=0, settings={'maxSpeed': 50000000, 'maxAcceleration': 2000000000, 'maxDeceleration': 2000000000})
+    emulator.errorStatus = 0
+    bus = FakeSMBus([emulator])
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.001)
+
+    async def main():
+        tic = AsyncTic(bus, 14)
+        task = asyncio.ensure_future(ticker())
+        await tic.setTargetPosition(2000)
+        await tic.waitUntilReached(2000, timeout=5)
+        task.cancel()
+        return await tic.getCurrentPosition()
+
+    assert asyncio.run(main()) == 2000
+    assert len(ticks) > 1
+    busWorker(bus).close()
@@ -0,0 +1,33 @@
+import tracemalloc
+
+from pytic2.benchmark import main, measure, run
+
+def test_measure_reports_allocations():
+    kept = []
+
+    result = measure(lambda: kept.append(bytearray(1000)), iterations=20, warmup=2)
+
+    assert result['rate'] > 0 and result['p50'] <= result['p99']
+    assert result['blocks'] >= 1
+    assert result['peakBytes'] >= 1000
+
+def test_measure_without_reset_peak(monkeypatch):
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+
+    result = measure(lambda: bytearray(1000), iterations=20, warmup=2)
+
+    assert result['peakBytes'] >= 1000
+    assert result['blocks'] < 1
+    assert not tracemalloc.is_tracing()
+
+def test_run_covers_the_getters_and_polls():
+    results = run(iterations=5, devices=2, pattern='getCurrentPosition')
+    assert set(results) == {'pytic2.getCurrentPosition'}
+    assert results['pytic2.getCurrentPosition']['transactionsPerCall'] == 1
+
+    results = run(iterations=5, devices=2, pattern='poll')
+    assert results['poll.getSnapshot[2]']['transactionsPerCall'] == 2
+
+def test_main_prints_a_table(capsys):
+    main(['-n', '3', '-d', '1', '-k', 'writeQuick'])
+    assert 'pyi2c.writeQuick' in capsys.readouterr().out
@@ -0,0 +1,71 @@
+import errno
+
+import pytest
+
+from pytic2 import *
+from pytic2.pyi2c import I2C_RDWR_MAX_MSGS
+
+def test_reads_and_commands_of_several_devices_in_one_ioctl(makeBus):
+    bus = makeBus((14, 15, 16))
+    tics = [pytic2(bus, address) for address in (14, 15, 16)]
+    transactions = bus.transactions
+
+    with BusBatch(bus) as batch:
+        for tic in tics:
+            batch.device(tic).haltAndSetPosition(tic.address)
+        positions = [batch.device(tic).getCurrentPosition() for tic in tics]
+
+    assert bus.transactions - transactions == 1
+    assert [position.result() for position in positions] == [14, 15, 16]
+
+def test_flush_splits_above_the_message_limit(makeBus):
+    addresses = range(10, 40)
+    bus = makeBus(addresses)
+    tics = [pytic2(bus, address) for address in addresses]
+    transactions, messages = bus.transactions, bus.messages
+
+    batch = BusBatch(bus)
+    positions = [batch.device(tic).getCurrentPosition() for tic in tics]
+    batch.flush()
+
+    assert bus.transactions - transactions == 2
+    assert bus.messages - messages == 2 * len(tics)
+    assert all(position.result() == 0 for position in positions)
+
+def test_transaction_is_never_split(makeBus):
+    bus = makeBus()
+    batch = BusBatch(bus, maxMessages=4)
+    tic = pytic2(bus, 14)
+    with pytest.raises(ValueError):
+        batch.device(tic).getSnapshot()
+
+def test_failed_flush_fails_the_futures(makeBus):
+    bus = makeBus()
+    batch = BusBatch(bus)
+    position = batch.device(pytic2(bus, 14)).getCurrentPosition()
+    batch.device(pytic2(bus, 99)).energize()
+
+    with pytest.raises(OSError) as error:
+        batch.flush()
+
+    assert error.value.errno == errno.EREMOTEIO
+    assert position.exception() is error.value
+    assert len(batch) == 0
+
+def test_cancel_drops_the_transactions(makeBus):
+    bus = makeBus()
+    emulator = bus.devices[14]
+    batch = BusBatch(bus)
+    position = batch.device(pytic2(bus, 14)).getCurrentPosition()
+    batch.device(pytic2(bus, 14)).haltAndSetPosition(77)
+
+    batch.cancel()
+    batch.flush()
+
+    assert position.cancelled()
+    assert emulator.position == 0
+
+def test_device_on_another_bus_is_refused(makeBus):
+    batch = BusBatch(makeBus())
+    with pytest.raises(ValueError):
+        batch.device(pytic2(makeBus(), 14))
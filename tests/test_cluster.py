@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from pytic2 import *
+
+class ThreadBus(FakeSMBus):
+    '''FakeSMBus that records the threads its transactions run on.'''
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.threads = set()
+
+    def i2c_rdwr(self, *i2c_msgs):
+        self.threads.add(threading.current_thread())
+        super().i2c_rdwr(*i2c_msgs)
+
+@pytest.fixture
+def cluster(clock):
+    buses = []
+    for addresses in ((14, 15), (14, 16)):
+        bus = ThreadBus(clock=clock)
+        for address in addresses:
+            bus.add(TicEmulator(address, clock=clock, commandTimeout=0)).errorStatus = 0
+        buses.append(bus)
+    tics = [pytic2(buses[0], 14), pytic2(buses[1], 16), pytic2(buses[0], 15), pytic2(buses[1], 14)]
+    for index, tic in enumerate(tics):
+        tic.haltAndSetPosition(100 * index)
+        tic._interface.bus.threads.clear()
+    cluster = TicCluster(tics)
+    yield cluster
+    cluster.close()
+
+def test_fan_out_runs_one_transaction_per_bus(cluster):
+    transactions = [bus.transactions for bus in cluster.buses]
+
+    assert cluster.positions() == [0, 100, 200, 300]
+
+    assert [bus.transactions - count for bus, count in zip(cluster.buses, transactions)] == [1, 1]
+    workers = [next(iter(bus.threads)) for bus in cluster.buses]
+    assert all(len(bus.threads) == 1 for bus in cluster.buses)
+    assert workers[0] is not workers[1] and threading.current_thread() not in workers
+
+def test_fan_out_to_a_subset(cluster):
+    tics = cluster.tics
+    assert cluster.fanOut('getCurrentPosition', tics=[tics[3], tics[0]]) == [300, 0]
+    assert cluster.fanOut('getCurrentPosition', batch=False, tics=tics[1:2]) == [100]
+
+def test_submit_runs_on_the_bus_worker(cluster):
+    tic = cluster.tics[1]
+    future = cluster.submit(tic, 'setTargetPosition', 1234)
+
+    assert future.result(timeout=5) is None
+    assert tic._interface.bus.devices[16].targetPosition == 1234
+    assert threading.current_thread() not in tic._interface.bus.threads
+
+def test_stop_and_deenergize_all(cluster):
+    for tic in cluster:
+        tic.setTargetVelocity(1000000)
+
+    cluster.stopAll()
+    assert all(bus.devices[address].planningMode == TIC_PLANNING_MODE_OFF
+               for bus in cluster.buses for address in bus.devices)
+
+    cluster.deenergizeAll()
+    assert all(bus.devices[address].errorStatus & TIC_ERROR_INTENTIONALLY_DEENERGIZED
+               for bus in cluster.buses for address in bus.devices)
+
+def test_snapshots(cluster):
+    snapshots = cluster.snapshots()
+
+    assert [snapshot.currentPosition for snapshot in snapshots] == [0, 100, 200, 300]
+    assert len(cluster) == 4
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from pytic2 import *
+
+@pytest.fixture
+def buses(makeBus):
+    return {1: makeBus((14, 20)), 3: makeBus((0x40,))}
+
+def test_probe(clock, makeBus):
+    bus = makeBus()
+    clock.advance(2.5)
+
+    assert probe(bus, 14) == 2500
+    assert probe(bus, 15) is None
+    # Operation state and up time in one transaction
+    assert bus.transactions == 2
+
+def test_discover_scans_every_bus(buses):
+    registry = discover(buses)
+
+    assert registry.addresses() == {1: [14, 20], 3: [0x40]}
+    assert len(registry) == 3
+    assert [tic.address for tic in registry] == [14, 20, 0x40]
+    assert registry.get(3, 0x40)._interface.bus is buses[3]
+    assert buses[1].transactions == len(I2C_ADDRESSES)
+
+def test_discover_passes_the_options(buses):
+    metrics = BusMetrics()
+    registry = discover(buses, metrics=metrics)
+
+    assert all(tic._interface.metrics is metrics for tic in registry)
+
+def test_cache_probes_only_the_known_devices(buses, tmp_path):
+    path = str(tmp_path / 'registry.json')
+    discover(buses, cachePath=path)
+    cache = json.load(open(path))
+    assert sorted(cache['buses']['1']['devices']) == ['14', '20']
+
+    transactions = buses[1].transactions
+    registry = discover(buses, cachePath=path)
+    assert registry.addresses() == {1: [14, 20], 3: [0x40]}
+    assert buses[1].transactions - transactions == 2
+
+def test_missing_device_triggers_a_scan(buses, tmp_path):
+    path = str(tmp_path / 'registry.json')
+    discover(buses, cachePath=path)
+    buses[1].devices[14].offline = True
+    transactions = buses[3].transactions
+
+    registry = discover(buses, cachePath=path)
+
+    assert registry.addresses() == {1: [20], 3: [0x40]}
+    # The other bus still only probes its cached device
+    assert buses[3].transactions - transactions == 1
+    assert sorted(json.load(open(path))['buses']['1']['devices']) == ['20']
+
+@pytest.mark.parametrize('options', [{'rescan': True}, {'maxAge': -1.0}])
+def test_cache_is_bypassed(buses, tmp_path, options):
+    path = str(tmp_path / 'registry.json')
+    discover(buses, cachePath=path)
+    buses[1].add(TicEmulator(21, clock=buses[1].clock))
+
+    registry = discover(buses, cachePath=path, **options)
+
+    assert registry.addresses()[1] == [14, 20, 21]
+
+def test_invalid_cache_is_ignored(buses, tmp_path):
+    path = tmp_path / 'registry.json'
+    path.write_text('{"version": 0}')
+
+    registry = discover(buses, cachePath=str(path))
+
+    assert len(registry) == 3
+    assert json.loads(path.read_text())['version'] == 1
+
+def test_bus_numbers_are_opened_with_the_factory(buses):
+    registry = discover([3], busFactory=buses.__getitem__, addresses=range(0x3E, 0x42))
+
+    assert registry.addresses() == {3: [0x40]}
@@ -0,0 +1,90 @@
+import errno
+import time
+
+import pytest
+
+from pytic2 import *
+from pytic2.kinematics import moveTime
+
+def test_position_move_takes_the_planned_time(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    emulator = bus.devices[14]
+    tic.setMaxSpeed(20000000)
+    tic.setMaxAccel(100000)
+    tic.setMaxDecel(50000)
+    tic.setTargetPosition(3000)
+    duration = moveTime(3000, 20000000, 100000, 50000)
+
+    clock.advance(duration - 0.05)
+    assert tic.getCurrentPosition() < 3000
+    assert tic.getCurrentVelocity() > 0
+    clock.advance(0.1)
+    assert tic.getCurrentPosition() == 3000
+    assert tic.getCurrentVelocity() == 0
+
+def test_short_move_never_reaches_the_max_speed(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    tic.setTargetPosition(-10)
+    peak = 0
+    for _ in range(200):
+        clock.advance(0.005)
+        peak = max(peak, abs(tic.getCurrentVelocity()))
+    assert tic.getCurrentPosition() == -10
+    assert 0 < peak < TicEmulator.DEFAULTS['maxSpeed']
+
+def test_velocity_mode_ramps_and_reverses(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    tic.setTargetVelocity(1000000)
+    clock.advance(10)
+    assert tic.getCurrentVelocity() == 1000000
+    position = tic.getCurrentPosition()
+    clock.advance(1)
+    assert tic.getCurrentPosition() - position == 100
+
+    tic.setTargetVelocity(-1000000)
+    clock.advance(0.1)
+    assert 0 < tic.getCurrentVelocity() < 1000000
+    clock.advance(10)
+    assert tic.getCurrentVelocity() == -1000000
+
+def test_long_clock_jump_is_cheap(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    tic.setTargetVelocity(2000000)
+    start = time.perf_counter()
+    clock.advance(10 * 86400)
+    assert tic.getCurrentVelocity() == 2000000
+    tic.setTargetPosition(0)
+    clock.advance(11 * 86400)
+    assert tic.getCurrentPosition() == 0
+    assert time.perf_counter() - start < 0.5
+
+def test_errors_halt_and_block_motion(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    tic.deenergize()
+    tic.setTargetPosition(100)
+    clock.advance(5)
+    assert tic.getCurrentPosition() == 0
+    assert tic.getErrorStatus() & TIC_ERROR_INTENTIONALLY_DEENERGIZED
+
+def test_command_timeout(makeBus, clock):
+    bus = makeBus(commandTimeout=100)
+    tic = pytic2(bus, 14)
+    tic.setTargetVelocity(1000000)
+    clock.advance(0.05)
+    tic.resetCommandTimeout()
+    clock.advance(0.08)
+    assert not tic.getErrorStatus() & TIC_ERROR_COMMAND_TIMEOUT
+    clock.advance(0.2)
+    assert tic.getErrorStatus() & TIC_ERROR_COMMAND_TIMEOUT
+    assert tic.getCurrentVelocity() == 0
+
+def test_missing_device_nacks(makeBus):
+    bus = makeBus()
+    with pytest.raises(OSError) as error:
+        pytic2(bus, 15).getCurrentPosition()
+    assert error.value.errno == errno.EREMOTEIO
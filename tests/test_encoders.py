@@ -0,0 +1,59 @@
+import ctypes
+import logging
+
+from pytic2 import *
+
+class WireBus(FakeSMBus):
+    '''FakeSMBus that keeps the bytes of every written message.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = []
+
+    def i2c_rdwr(self, *msgs):
+        self.writes.extend(ctypes.string_at(msg.buf, msg.len) for msg in msgs if not msg.flags & I2C_M_RD)
+        super().i2c_rdwr(*msgs)
+
+def _bus():
+    bus = WireBus()
+    bus.add(TicEmulator(14, commandTimeout=0)).errorStatus = 0
+    return bus
+
+def test_commands_are_encoded_little_endian():
+    bus = _bus()
+    tic = pytic2(bus, 14)
+
+    tic.energize()
+    tic.setStepMode(3)
+    tic.setTargetPosition(-2)
+    tic.setMaxSpeed(0x01020304)
+    tic.getCurrentPosition()
+
+    assert bus.writes == [
+        bytes([TIC_ENERGIZE_CMD]),
+        bytes([TIC_SETSTEPMODE_CMD, 3]),
+        bytes([TIC_SETTARGETPOSITION_CMD, 0xFE, 0xFF, 0xFF, 0xFF]),
+        bytes([TIC_SETMAXSPEED_CMD, 0x04, 0x03, 0x02, 0x01]),
+        bytes([TIC_GETVARIABLE_CMD, TIC_CURRENTPOSITION_VAR]),
+    ]
+
+def test_messages_are_reused_per_thread():
+    interface = pyi2c(_bus())
+    first = interface._message(14, 0, 5)
+    interface.write32Bit(14, TIC_SETTARGETPOSITION_CMD, 1)
+    interface.write32Bit(14, TIC_SETTARGETPOSITION_CMD, 2)
+    assert interface._message(14, 0, 5) is first
+    assert interface._message(15, 0, 5) is not first
+
+def test_debug_records_are_only_built_when_enabled(caplog, monkeypatch):
+    interface = pyi2c(_bus())
+    calls = []
+    monkeypatch.setattr(interface._logger, 'debug', lambda *args: calls.append(args))
+
+    with caplog.at_level(logging.INFO, logger=interface._logger.name):
+        interface.writeQuick(14, TIC_ENERGIZE_CMD)
+    assert calls == []
+
+    with caplog.at_level(logging.DEBUG, logger=interface._logger.name):
+        interface.writeQuick(14, TIC_ENERGIZE_CMD)
+    assert len(calls) == 1
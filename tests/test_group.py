@@ -0,0 +1,110 @@
+import pytest
+
+from pytic2 import *
+
+def _axes(bus):
+    tics = [pytic2(bus, address) for address in sorted(bus.devices)]
+    for tic in tics:
+        tic.haltAndSetPosition(0)
+        tic.exitSafeStart()
+    return tics
+
+def _arrival(clock, emulators, targets, step=0.01, limit=60.0):
+    '''Advances the clock until every emulator reached its target and
+    returns the arrival time of each.'''
+
+    arrivals = [None] * len(emulators)
+    elapsed = 0.0
+    while None in arrivals and elapsed < limit:
+        clock.advance(step)
+        elapsed += step
+        for index, (emulator, target) in enumerate(zip(emulators, targets)):
+            emulator.update()
+            if arrivals[index] is None and emulator.position == target:
+                arrivals[index] = elapsed
+    return arrivals
+
+def test_move_sends_the_targets_in_one_transaction(makeBus):
+    bus = makeBus((14, 15, 16))
+    group = MotorGroup(_axes(bus))
+    transactions = bus.transactions
+
+    report = group.move([1000, -300, 50])
+
+    assert bus.transactions - transactions == 1
+    assert [bus.devices[address].targetPosition for address in (14, 15, 16)] == [1000, -300, 50]
+    assert report['duration'] is None and report['hostSkew'] == 0.0
+
+def test_synchronized_axes_arrive_together(clock, makeBus):
+    bus = makeBus((14, 15, 16))
+    group = MotorGroup(_axes(bus))
+    targets = [2000, -500, 80]
+
+    report = group.move(targets, synchronize=True)
+    arrivals = _arrival(clock, [bus.devices[address] for address in (14, 15, 16)], targets)
+
+    assert max(arrivals) - min(arrivals) <= 0.02
+    assert arrivals[0] == pytest.approx(report['duration'], abs=0.02)
+
+def test_limits_are_scaled_from_the_base_limits(clock, makeBus):
+    bus = makeBus((14, 15))
+    tics = _axes(bus)
+    group = MotorGroup(tics)
+    base = dict(bus.devices[15].values)
+
+    for targets in ([1000, 100], [1100, 200], [1200, 300]):
+        group.move(targets, synchronize=True)
+        _arrival(clock, list(bus.devices.values()), targets)
+
+    # Every move scales from the original limits instead of the previous
+    # move's, so the lead axis keeps its full limits
+    values = bus.devices[14].values
+    assert values['maxSpeed'] == base['maxSpeed']
+    assert values['maxAcceleration'] == base['maxAcceleration']
+
+    group.restoreLimits()
+    for address in (14, 15):
+        values = bus.devices[address].values
+        assert values['maxSpeed'] == base['maxSpeed']
+        assert values['maxAcceleration'] == base['maxAcceleration']
+        assert values['maxDeceleration'] == base['maxDeceleration']
+
+def test_given_limits_are_the_base(makeBus):
+    bus = makeBus((14, 15))
+    tics = _axes(bus)
+    group = MotorGroup(tics, limits={tic: (1000000, 20000, 10000) for tic in tics})
+
+    group.move([1000, 500], synchronize=True)
+
+    assert [bus.devices[14].values[name] for name in ('maxSpeed', 'maxAcceleration', 'maxDeceleration')] \
+        == [1000000, 20000, 10000]
+    assert [bus.devices[15].values[name] for name in ('maxSpeed', 'maxAcceleration', 'maxDeceleration')] \
+        == [500000, 10000, 5000]
+
+def test_short_axis_floor_scales_the_whole_group(clock, makeBus):
+    bus = makeBus((14, 15))
+    tics = _axes(bus)
+    group = MotorGroup(tics, limits={tic: (2000000, 1000, 1000) for tic in tics})
+    targets = [1000, 20]
+
+    group.move(targets, synchronize=True)
+
+    # 1000 * 20 / 1000 is below the lowest acceleration of 100: the short
+    # axis is held at 100 and the long one raised in proportion
+    assert bus.devices[15].values['maxAcceleration'] == 100
+    assert bus.devices[14].values['maxAcceleration'] == 5000
+    arrivals = _arrival(clock, list(bus.devices.values()), targets)
+    assert max(arrivals) - min(arrivals) <= 0.02
+
+def test_axes_without_distance_keep_their_limits(makeBus):
+    bus = makeBus((14, 15))
+    tics = _axes(bus)
+    group = MotorGroup(tics, limits={tic: (1000000, 20000, 20000) for tic in tics})
+    names = ('maxSpeed', 'maxAcceleration', 'maxDeceleration')
+    before = [bus.devices[15].values[name] for name in names]
+
+    report = group.move([1000, 0], synchronize=True)
+
+    assert [bus.devices[15].values[name] for name in names] == before
+    assert report['duration'] > 0
+    assert group.positions() == [0, 0]
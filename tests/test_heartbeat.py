@@ -0,0 +1,88 @@
+import time
+
+from pytic2 import *
+
+def _service(tics, interval=0.1):
+    heartbeat = HeartbeatService(resolution=0.01, slots=16)
+    for tic in tics:
+        heartbeat.register(tic, interval)
+    return heartbeat
+
+def test_due_heartbeats_of_a_bus_share_a_transaction(makeBus):
+    bus = makeBus((14, 15))
+    heartbeat = _service([pytic2(bus, 14), pytic2(bus, 15)])
+    start = heartbeat._start
+    for address in (14, 15):
+        commandTimes(bus).pop(address, None)
+    transactions = bus.transactions
+
+    # A new device is due at once
+    heartbeat.beat(start + 0.055)
+    assert bus.transactions == transactions + 1
+    assert heartbeat.stats() == {'devices': 2, 'sent': 2, 'skipped': 0, 'errors': 0, 'batches': 1}
+
+    # Rescheduled one interval later, over a turn of the wheel
+    heartbeat.beat(start + 0.125)
+    assert heartbeat.stats()['sent'] == 2
+    heartbeat.beat(start + 0.165)
+    assert heartbeat.stats()['sent'] == 4 and heartbeat.stats()['batches'] == 2
+    assert bus.transactions == transactions + 2
+
+def test_recent_commands_skip_the_heartbeat(makeBus):
+    bus = makeBus((14, 15))
+    heartbeat = _service([pytic2(bus, 14), pytic2(bus, 15)])
+    start = heartbeat._start
+    times = commandTimes(bus)
+    times.pop(15, None)
+    times[14] = start + 0.08
+
+    heartbeat.beat(start + 0.125)
+    assert heartbeat.stats()['sent'] == 1 and heartbeat.stats()['skipped'] == 1
+
+    # Due again one interval after the command
+    heartbeat.beat(start + 0.175)
+    assert heartbeat.stats()['sent'] == 1
+    heartbeat.beat(start + 0.195)
+    assert heartbeat.stats()['sent'] == 2
+
+def test_interval_from_the_command_timeout(makeBus):
+    heartbeat = HeartbeatService()
+
+    assert heartbeat.register(pytic2(makeBus(commandTimeout=1000), 14)) == 0.5
+    assert heartbeat.register(pytic2(makeBus(commandTimeout=0), 14)) is None
+    assert len(heartbeat) == 1
+
+def test_failing_device_does_not_stop_the_others(makeBus):
+    bus = makeBus((14, 15))
+    heartbeat = _service([pytic2(bus, 14), pytic2(bus, 15)])
+    commandTimes(bus).clear()
+    bus.devices[14].offline = True
+
+    heartbeat.beat(heartbeat._start + 0.125)
+
+    stats = heartbeat.stats()
+    assert stats['sent'] == 1 and stats['errors'] == 1
+
+def test_unregister(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    heartbeat = _service([tic])
+    heartbeat.unregister(tic)
+    transactions = bus.transactions
+
+    heartbeat.beat(heartbeat._start + 1.0)
+
+    assert len(heartbeat) == 0 and bus.transactions == transactions
+
+def test_background_thread_keeps_the_timeout_from_expiring():
+    bus = FakeSMBus([TicEmulator(14, commandTimeout=100)])
+    tic = pytic2(bus, 14)
+    tic.exitSafeStart()
+    tic.energize()
+
+    with HeartbeatService(resolution=0.005) as heartbeat:
+        heartbeat.register(tic, 0.03)
+        time.sleep(0.3)
+
+    assert not tic.getErrorStatus() & TIC_ERROR_COMMAND_TIMEOUT
+    assert heartbeat.stats()['sent'] >= 5
@@ -0,0 +1,145 @@
+import ctypes
+import struct
+
+import pytest
+from smbus2 import i2c_msg
+from smbus2.smbus2 import I2C_M_RD, I2C_RDWR
+
+from pytic2 import *
+from pytic2.pyi2c import I2C_RDWR_MAX_MSGS
+
+class RecordingIoctl():
+    '''FakeSMBus.ioctl that also records the messages of every ioctl.'''
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.calls = []
+
+    def __call__(self, fd, request, arg):
+        self.bus.ioctl(fd, request, arg)
+        self.calls.append([(arg.msgs[i].addr, arg.msgs[i].flags, arg.msgs[i].len) for i in range(arg.nmsgs)])
+
+def _rig(addresses=(14,)):
+    clock = VirtualClock()
+    fake = FakeSMBus([TicEmulator(address, clock=clock) for address in addresses], clock=clock)
+    ioctl = RecordingIoctl(fake)
+    return fake, ioctl, I2CDev(1, ioctl=ioctl)
+
+def test_writes_reach_the_device():
+    fake, ioctl, bus = _rig()
+    tic = pytic2(bus, 14, interface=I2CDevInterface)
+    emulator = fake.devices[14]
+
+    tic.haltAndSetPosition(-1234)
+    tic.setMaxSpeed(3000000)
+    tic.setStepMode(3)
+    tic.energize()
+
+    assert emulator.position == -1234
+    assert emulator.values['maxSpeed'] == 3000000
+    assert emulator.values['stepMode'] == 3
+    assert not emulator.errorStatus & TIC_ERROR_INTENTIONALLY_DEENERGIZED
+    assert ioctl.calls == [[(14, 0, 5)], [(14, 0, 5)], [(14, 0, 2)], [(14, 0, 1)]]
+
+def test_readBlock_returns_the_variables():
+    fake, ioctl, bus = _rig()
+    tic = pytic2(bus, 14, interface=I2CDevInterface)
+    tic.haltAndSetPosition(-1234)
+    ioctl.calls.clear()
+
+    assert tic.getCurrentPosition() == -1234
+    assert tic.getVinVoltage() == 12000
+    assert tic.getMaxSpeed() == TicEmulator.DEFAULTS['maxSpeed']
+    data = tic._interface.readBlock(14, [TIC_GETVARIABLE_CMD, TIC_CURRENTPOSITION_VAR], 4)
+    assert struct.unpack('<i', bytes(data)) == (-1234,)
+    assert ioctl.calls[0] == [(14, 0, 2), (14, I2C_M_RD, 4)]
+
+def test_readBlocks_matches_pyi2c():
+    fake, ioctl, bus = _rig()
+    tic = pytic2(bus, 14, interface=I2CDevInterface)
+    reference = pytic2(fake, 14)
+    tic.haltAndSetPosition(987654)
+    ioctl.calls.clear()
+
+    snapshot = tic.getSnapshot()
+    assert snapshot == reference.getSnapshot()
+    assert snapshot.currentPosition == 987654
+    # The whole variable block in one transaction of maximal reads
+    assert len(ioctl.calls) == 1
+    assert sum(length for _, flags, length in ioctl.calls[0] if flags & I2C_M_RD) == TIC_VARIABLES_LENGTH
+    assert tic.getSettings(cached=False) == reference.getSettings(cached=False)
+
+def test_slots_are_rebound_across_addresses_and_lengths():
+    fake, ioctl, bus = _rig((14, 15))
+    first = pytic2(bus, 14, interface=I2CDevInterface)
+    second = pytic2(bus, 15, interface=I2CDevInterface)
+    first.haltAndSetPosition(111)
+    second.haltAndSetPosition(-222)
+    slots = bus.slots()
+
+    for _ in range(3):
+        assert first.getCurrentPosition() == 111
+        assert second.getCurrentPosition() == -222
+        assert first.getOperationState() == second.getOperationState()
+    assert slots.keys[:2] == [(15, 0, 2), (15, I2C_M_RD, 1)]
+
+    # A read longer than the initial slot buffer grows it
+    length = 32
+    expected = bytes(pytic2(fake, 15)._interface.readBlock(15, [TIC_GETVARIABLE_CMD, 0], length))
+    data = second._interface.readBlock(15, [TIC_GETVARIABLE_CMD, 0], length)
+    assert bytes(data) == expected
+    assert len(slots.buffers[1]) >= length
+    assert slots.msgs[1].len == length
+    assert first.getCurrentPosition() == 111
+    assert slots.msgs[1].len == 4 and slots.msgs[1].addr == 14
+
+def test_transaction_beyond_the_slots_is_refused():
+    _, _, bus = _rig()
+    interface = I2CDevInterface(bus)
+    blocks = [([TIC_GETVARIABLE_CMD, 0], 1)] * (I2C_RDWR_MAX_MSGS // 2 + 1)
+    with pytest.raises(ValueError):
+        interface.readBlocks(14, blocks)
+
+def test_BusBatch_through_i2c_rdwr_is_split():
+    addresses = range(10, 40)
+    fake, ioctl, bus = _rig(addresses)
+    tics = [pytic2(bus, address, interface=I2CDevInterface) for address in addresses]
+    for tic in tics:
+        tic.haltAndSetPosition(tic.address * 100)
+    ioctl.calls.clear()
+
+    batch = BusBatch(bus)
+    positions = [batch.device(tic).getCurrentPosition() for tic in tics]
+    batch.device(tics[0]).setMaxSpeed(1234567)
+    batch.flush()
+
+    assert [position.result() for position in positions] == [address * 100 for address in addresses]
+    assert [len(msgs) for msgs in ioctl.calls] == [I2C_RDWR_MAX_MSGS, 2 * len(tics) + 1 - I2C_RDWR_MAX_MSGS]
+    assert fake.devices[10].values['maxSpeed'] == 1234567
+
+    # The slot buffers replaced by the copied messages are bound again
+    slots = bus.slots()
+    assert all(ctypes.cast(msg.buf, ctypes.c_void_p).value == ctypes.addressof(buffer)
+               for msg, buffer in zip(slots.msgs, slots.buffers))
+    assert tics[-1].getCurrentPosition() == 3900
+    assert tics[0].getCurrentPosition() == 1000
+
+def test_ioctl_gets_the_structure():
+    fake, ioctl, bus = _rig()
+    tic = pytic2(bus, 14, interface=I2CDevInterface)
+    tic.getCurrentPosition()
+    bus.i2c_rdwr(i2c_msg.write(14, [TIC_ENERGIZE_CMD]))
+
+    assert len(ioctl.calls) == 2
+    # As fcntl.ioctl does, the fake refuses an address given as an int
+    with pytest.raises(OverflowError):
+        fake.ioctl(-1, I2C_RDWR, ctypes.addressof(bus.slots().data))
+
+def test_failed_ioctl_propagates():
+    fake, _, bus = _rig()
+    tic = pytic2(bus, 14, interface=I2CDevInterface)
+    fake.devices[14].offline = True
+    with pytest.raises(OSError):
+        tic.getCurrentPosition()
+    fake.devices[14].offline = False
+    assert tic.getCurrentPosition() == 0
@@ -0,0 +1,66 @@
+import errno
+import gc
+import threading
+
+import pytest
+
+from pytic2 import *
+
+def test_transactions_are_recorded(makeBus):
+    metrics = BusMetrics('bus1')
+    tic = pytic2(makeBus(), 14, metrics=metrics)
+
+    tic.setTargetPosition(100)
+    tic.setTargetPosition(200)
+    tic.getCurrentPosition()
+
+    snapshot = metrics.snapshot()
+    assert snapshot['commands'] == {(14, TIC_SETTARGETPOSITION_CMD): 2, (14, TIC_GETVARIABLE_CMD): 1}
+    # Address byte and 5 command bytes per write; 2 + 4 bytes and two
+    # address bytes for the read
+    assert snapshot['bytes'] == {14: 2 * 6 + 3 + 5}
+    assert snapshot['latency'][(14, TIC_SETTARGETPOSITION_CMD)]['count'] == 2
+    assert snapshot['errors'] == {}
+    assert snapshot['wireSeconds'] > 0
+
+def test_errors_are_recorded_by_errno(makeBus):
+    bus = makeBus()
+    metrics = BusMetrics()
+    tic = pytic2(bus, 14, metrics=metrics)
+    bus.devices[14].offline = True
+
+    with pytest.raises(OSError):
+        tic.setTargetPosition(100)
+
+    assert metrics.snapshot()['errors'] == {(14, TIC_SETTARGETPOSITION_CMD, errno.EREMOTEIO): 1}
+
+def test_shards_of_ended_threads_are_retired(makeBus):
+    metrics = BusMetrics()
+    tic = pytic2(makeBus(), 14, metrics=metrics)
+
+    for _ in range(5):
+        threads = [threading.Thread(target=tic.setTargetPosition, args=(100,)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    gc.collect()
+
+    assert metrics._shards == []
+    snapshot = metrics.snapshot()
+    assert snapshot['commands'] == {(14, TIC_SETTARGETPOSITION_CMD): 100}
+    assert snapshot['latency'][(14, TIC_SETTARGETPOSITION_CMD)]['count'] == 100
+
+    metrics.reset()
+    assert metrics.snapshot()['commands'] == {}
+
+def test_prometheus(makeBus):
+    metrics = BusMetrics('bus1')
+    tic = pytic2(makeBus(), 14, metrics=metrics)
+    tic.setTargetPosition(100)
+
+    text = metrics.prometheus()
+
+    assert 'pytic2_i2c_commands_total{bus="bus1",address="14",command="0xe0"} 1\n' in text
+    assert 'pytic2_i2c_transaction_seconds_bucket{bus="bus1",address="14",command="0xe0",le="+Inf"} 1\n' in text
+    assert '# TYPE pytic2_i2c_utilization gauge\n' in text
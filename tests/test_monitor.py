@@ -0,0 +1,91 @@
+import argparse
+import json
+
+import pytest
+
+from pytic2 import *
+from pytic2.monitor import Monitor, _parseDevice, main
+
+def test_sample_reads_the_selected_variables(makeBus):
+    bus = makeBus((14, 15))
+    tics = [pytic2(bus, 14), pytic2(bus, 15)]
+    tics[1].haltAndSetPosition(-20)
+    monitor = Monitor([(3, tic) for tic in tics], ('currentPosition', 'vinVoltage'))
+    transactions = bus.transactions
+
+    records = monitor.sample()
+
+    assert bus.transactions - transactions == 1
+    assert [(record['bus'], record['address'], record['currentPosition'], record['vinVoltage'])
+            for record in records] == [(3, 14, 0, 12000), (3, 15, -20, 12000)]
+
+def test_changed_only_writes_the_changes(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    monitor = Monitor([(1, tic)], ('currentPosition', 'vinVoltage'), changed=True)
+
+    assert set(monitor.sample()[0]) == {'time', 'bus', 'address', 'currentPosition', 'vinVoltage'}
+    assert monitor.sample() == []
+    tic.haltAndSetPosition(5)
+    record, = monitor.sample()
+    assert record['currentPosition'] == 5 and 'vinVoltage' not in record
+
+def test_failing_device_gives_an_error_record(makeBus):
+    bus = makeBus((14, 15))
+    monitor = Monitor([(1, pytic2(bus, 14)), (1, pytic2(bus, 15))], ('currentPosition',))
+    bus.devices[14].offline = True
+
+    first, second = monitor.sample()
+
+    assert first['error'] == 'Remote I/O error' and 'currentPosition' not in first
+    assert second['currentPosition'] == 0
+    assert monitor.errors == 1
+
+def test_unknown_variables_are_refused(makeBus):
+    with pytest.raises(ValueError):
+        Monitor([(1, pytic2(makeBus(), 14))], ('nope',))
+
+def test_parse_device():
+    assert _parseDevice('3:14') == (3, 14)
+    assert _parseDevice('3:0x0e') == (3, 14)
+    assert _parseDevice('4') == (4, None)
+    with pytest.raises(argparse.ArgumentTypeError):
+        _parseDevice('x:1')
+
+def test_main_streams_json_lines(capsys):
+    assert main(['1:14', '1:15', '--emulate', '-n', '3', '-r', '0', '-v', 'currentPosition']) == 0
+
+    out, err = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    assert len(records) == 6
+    assert [record['address'] for record in records[:2]] == [14, 15]
+    assert all(set(record) == {'time', 'bus', 'address', 'currentPosition'} for record in records)
+    assert '3 samples of 2 devices' in err
+
+def test_main_writes_csv(capsys):
+    assert main(['2', '--emulate', '-n', '2', '-r', '0', '-f', 'csv', '-v', 'vinVoltage,stepMode']) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'time,bus,address,vinVoltage,stepMode,error'
+    assert [line.split(',')[1:5] for line in lines[1:]] == [['2', '14', '12000', '0']] * 2
+
+def test_main_lists_the_variables(capsys):
+    assert main(['--list']) == 0
+
+    out = capsys.readouterr().out
+    assert len(out.splitlines()) == len(TIC_VARIABLES)
+    assert 'currentPosition' in out
+
+def test_main_refuses_unknown_variables(capsys):
+    with pytest.raises(SystemExit):
+        main(['1:14', '--emulate', '-v', 'nope'])
+    assert 'unknown variables: nope' in capsys.readouterr().err
+
+def test_command_dispatch(capsys):
+    from pytic2.__main__ import main as cli
+
+    assert cli([]) == 2
+    assert cli(['--help']) == 0
+    assert 'monitor' in capsys.readouterr().err
+    assert cli(['monitor', '1:14', '--emulate', '-n', '1', '-r', '0']) == 0
+    assert json.loads(capsys.readouterr().out)['address'] == 14
@@ -0,0 +1,85 @@
+import errno
+
+import pytest
+
+from pytic2 import *
+
+def _record(bus, path):
+    with RecordingBus(bus, path) as recording:
+        tic = pytic2(recording, 14)
+        tic.haltAndSetPosition(-321)
+        position = tic.getCurrentPosition()
+        bus.devices[14].offline = True
+        with pytest.raises(OSError):
+            tic.getCurrentPosition()
+        bus.devices[14].offline = False
+    return position
+
+def test_log_contains_the_transactions(makeBus, tmp_path):
+    path = str(tmp_path / 'bus.log')
+    _record(makeBus(), path)
+
+    with TransactionLog(path) as log:
+        transactions = list(log.transactions())
+        assert log.lastTransaction() == 2
+    assert [len(records) for records in transactions] == [1, 2, 2]
+    write, read = transactions[1]
+    assert not write.read and write.payload == bytes([TIC_GETVARIABLE_CMD, TIC_CURRENTPOSITION_VAR])
+    assert read.read and read.payload == (-321).to_bytes(4, 'little', signed=True)
+    assert transactions[2][1].errno == errno.EREMOTEIO and transactions[2][1].payload == b''
+
+def test_replay_answers_from_the_log(makeBus, tmp_path):
+    path = str(tmp_path / 'bus.log')
+    recorded = _record(makeBus(), path)
+
+    with ReplayBus(path) as replay:
+        tic = pytic2(replay, 14)
+        tic.haltAndSetPosition(-321)
+        assert tic.getCurrentPosition() == recorded == -321
+        with pytest.raises(OSError) as info:
+            tic.getCurrentPosition()
+        assert info.value.errno == errno.EREMOTEIO
+        with pytest.raises(EOFError):
+            tic.getCurrentPosition()
+        assert replay.replayed == 3
+
+def test_strict_replay_checks_the_writes(makeBus, tmp_path):
+    path = str(tmp_path / 'bus.log')
+    _record(makeBus(), path)
+
+    with ReplayBus(path) as replay:
+        with pytest.raises(ValueError):
+            pytic2(replay, 14).haltAndSetPosition(5)
+    with ReplayBus(path, strict=False) as replay:
+        pytic2(replay, 15).haltAndSetPosition(5)
+
+def test_append_continues_the_log(makeBus, tmp_path):
+    path = str(tmp_path / 'bus.log')
+    bus = makeBus()
+    _record(bus, path)
+    _record(bus, path)
+
+    with TransactionLog(path) as log:
+        assert [records[0].transaction for records in log.transactions()] == list(range(6))
+
+def test_append_cuts_off_a_partial_record(makeBus, tmp_path):
+    path = tmp_path / 'bus.log'
+    bus = makeBus()
+    _record(bus, str(path))
+    complete = path.read_bytes()
+    # A record cut short by a crash
+    path.write_bytes(complete + complete[-20:-3])
+
+    _record(bus, str(path))
+
+    with TransactionLog(str(path)) as log:
+        transactions = list(log.transactions())
+    assert path.read_bytes().startswith(complete)
+    assert [records[0].transaction for records in transactions] == list(range(6))
+    assert transactions[4][1].payload == (-321).to_bytes(4, 'little', signed=True)
+
+def test_not_a_log(tmp_path):
+    path = tmp_path / 'other.log'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        TransactionLog(str(path))
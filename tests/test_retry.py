@@ -0,0 +1,129 @@
+import errno
+
+import pytest
+
+from pytic2 import *
+
+class FlakyBus(FakeSMBus):
+    '''FakeSMBus whose next failures transactions fail with EREMOTEIO.'''
+
+    failures = 0
+
+    def i2c_rdwr(self, *i2c_msgs):
+        if self.failures:
+            self.failures -= 1
+            self.transactions += 1
+            raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+        super().i2c_rdwr(*i2c_msgs)
+
+@pytest.fixture
+def bus(clock):
+    bus = FlakyBus(clock=clock)
+    for address in (14, 15):
+        bus.add(TicEmulator(address, clock=clock, commandTimeout=0)).errorStatus = 0
+    return bus
+
+def _retry(**options):
+    return RetryPolicy(attempts=3, budget=1.0, backoff=0.0, maxBackoff=0.0, **options)
+
+def test_transient_errors_are_retried(bus):
+    tic = pytic2(bus, 14, retry=_retry())
+    tic.haltAndSetPosition(500)
+    bus.failures = 2
+
+    assert tic.getCurrentPosition() == 500
+    tic.setTargetPosition(800)
+    assert bus.devices[14].targetPosition == 800
+
+def test_non_idempotent_commands_are_not_retried(bus):
+    tic = pytic2(bus, 14, retry=_retry())
+    bus.failures = 1
+
+    with pytest.raises(OSError):
+        tic.haltAndSetPosition(500)
+    assert bus.failures == 0 and bus.devices[14].position == 0
+
+def test_attempts_are_limited(bus):
+    tic = pytic2(bus, 14, retry=_retry())
+    bus.failures = 3
+
+    with pytest.raises(OSError) as info:
+        tic.getCurrentPosition()
+    assert info.value.errno == errno.EREMOTEIO
+    assert bus.transactions == 3
+
+def test_breaker_opens_and_recovers(bus):
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    tic = pytic2(bus, 14, breaker=breaker)
+    other = pytic2(bus, 15, breaker=breaker)
+    bus.failures = 2
+    for _ in range(2):
+        with pytest.raises(OSError):
+            tic.getCurrentPosition()
+
+    transactions = bus.transactions
+    with pytest.raises(OSError) as info:
+        tic.getCurrentPosition()
+    assert info.value.errno == errno.EHOSTDOWN
+    assert bus.transactions == transactions
+    assert breaker.state(14) == 'open'
+    assert other.getCurrentPosition() == 0
+
+    breaker._openUntil[14] = 0.0
+    assert breaker.state(14) == 'half-open'
+    assert tic.getCurrentPosition() == 0
+    assert breaker.state(14) == 'closed'
+
+def test_batch_uses_the_retry_of_its_devices(bus):
+    tics = [pytic2(bus, address, retry=_retry()) for address in (14, 15)]
+    tics[1].haltAndSetPosition(-40)
+    bus.failures = 1
+
+    with BusBatch(bus) as batch:
+        batch.device(tics[0]).setTargetPosition(100)
+        position = batch.device(tics[1]).getCurrentPosition()
+
+    assert position.result() == -40
+    assert bus.devices[14].targetPosition == 100
+
+def test_batch_with_a_non_idempotent_command_is_not_retried(bus):
+    tics = [pytic2(bus, address, retry=_retry()) for address in (14, 15)]
+    bus.failures = 1
+
+    batch = BusBatch(bus)
+    batch.device(tics[0]).haltAndSetPosition(100)
+    position = batch.device(tics[1]).getCurrentPosition()
+    with pytest.raises(OSError):
+        batch.flush()
+    assert isinstance(position.exception(), OSError)
+    assert bus.devices[14].position == 0
+
+def test_batch_judges_each_transaction_on_its_own(bus):
+    # The read of the second device does not make the write of the first
+    # retryable when writes are not retried
+    tics = [pytic2(bus, address, retry=_retry(retryWrites=False)) for address in (14, 15)]
+    bus.failures = 1
+
+    batch = BusBatch(bus)
+    batch.device(tics[0]).setTargetPosition(100)
+    batch.device(tics[1]).getCurrentPosition()
+    with pytest.raises(OSError):
+        batch.flush()
+
+    bus.failures = 1
+    with BusBatch(bus) as batch:
+        position = batch.device(tics[1]).getCurrentPosition()
+    assert position.result() == 0
+
+def test_batch_bypasses_the_breaker(bus):
+    breaker = CircuitBreaker(threshold=1, cooldown=60.0)
+    tic = pytic2(bus, 14, breaker=breaker)
+    bus.failures = 1
+    with pytest.raises(OSError):
+        tic.getCurrentPosition()
+    assert breaker.state(14) == 'open'
+
+    with BusBatch(bus) as batch:
+        position = batch.device(tic).getCurrentPosition()
+    assert position.result() == 0
+    assert breaker.state(14) == 'open'
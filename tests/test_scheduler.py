@@ -0,0 +1,85 @@
+import errno
+import threading
+import time
+
+import pytest
+
+from pytic2 import *
+
+class SlowBus(FakeSMBus):
+    '''FakeSMBus whose first transaction blocks until released.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        self.order = []
+
+    def i2c_rdwr(self, *msgs):
+        if not self.entered.is_set():
+            self.entered.set()
+            self.release.wait(5)
+        self.order.append(msgs[0].buf[0][0])
+        super().i2c_rdwr(*msgs)
+
+def _emulated(bus):
+    emulator = bus.add(TicEmulator(14, commandTimeout=0))
+    emulator.errorStatus = 0
+    return bus
+
+def _waitQueued(scheduler, count):
+    deadline = time.monotonic() + 5
+    while len(scheduler._queue) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+def test_classify():
+    assert classify([i2c_msg.write(14, [TIC_HALTANDHOLD_CMD])]) == PRIORITY_EMERGENCY
+    assert classify([i2c_msg.write(14, [TIC_RESETCOMMANDTIMEOUT_CMD])]) == PRIORITY_HEARTBEAT
+    assert classify([i2c_msg.write(14, [TIC_SETTARGETPOSITION_CMD, 0, 0, 0, 0])]) == PRIORITY_MOTION
+    assert classify([i2c_msg.write(14, [TIC_GETVARIABLE_CMD, 0]), i2c_msg.read(14, 4)]) == PRIORITY_TELEMETRY
+
+def test_emergency_stop_overtakes_queued_reads():
+    bus = _emulated(SlowBus())
+    scheduler = BusScheduler(bus)
+    tic = pytic2(scheduler, 14)
+    threads = [threading.Thread(target=tic.getCurrentPosition)]
+    threads[0].start()
+    bus.entered.wait(5)
+    for target in (tic.getCurrentPosition, tic.getCurrentPosition, tic.haltAndHold):
+        threads.append(threading.Thread(target=target))
+        threads[-1].start()
+        _waitQueued(scheduler, len(threads) - 1)
+    bus.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert bus.order[1] == TIC_HALTANDHOLD_CMD
+
+def test_telemetry_backlog_is_rejected():
+    scheduler = BusScheduler(_emulated(FakeSMBus()), budgets={PRIORITY_TELEMETRY: 0.0})
+    with pytest.raises(OSError) as error:
+        pytic2(scheduler, 14).getCurrentPosition()
+    assert error.value.errno == errno.EBUSY
+    assert scheduler.stats()[PRIORITY_TELEMETRY]['rejected'] == 1
+
+def test_interrupted_waiter_leaves_the_queue():
+    bus = _emulated(SlowBus())
+    scheduler = BusScheduler(bus)
+    tic = pytic2(scheduler, 14)
+    first = threading.Thread(target=tic.getCurrentPosition)
+    first.start()
+    bus.entered.wait(5)
+
+    # A waiter whose wait raises, like a KeyboardInterrupt in that thread
+    wait = scheduler._condition.wait
+    def interrupted(timeout=None):
+        scheduler._condition.wait = wait
+        raise KeyboardInterrupt
+    scheduler._condition.wait = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        tic.getCurrentPosition()
+    assert scheduler._queue == []
+
+    bus.release.set()
+    first.join(5)
+    assert tic.getCurrentPosition() == 0
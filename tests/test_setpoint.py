@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from pytic2 import *
+
+class RecordingBus(FakeSMBus):
+    '''FakeSMBus that records the command bytes and values written.'''
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.written = []
+
+    def i2c_rdwr(self, *i2c_msgs):
+        super().i2c_rdwr(*i2c_msgs)
+        self.written.extend(bytes(msg.buf[:msg.len]) for msg in i2c_msgs if not msg.flags & 1)
+
+@pytest.fixture
+def bus(clock):
+    bus = RecordingBus(clock=clock)
+    bus.add(TicEmulator(14, clock=clock, commandTimeout=0)).errorStatus = 0
+    yield bus
+    busWorker(bus).close()
+
+def _hold(bus):
+    '''Blocks the bus worker until the returned event is set.'''
+
+    release = threading.Event()
+    busWorker(bus).submit('hold', release.wait)
+    return release
+
+def test_setpoints_are_coalesced(bus):
+    channel = SetpointChannel(pytic2(bus, 14))
+    release = _hold(bus)
+    for target in range(1, 6):
+        channel.setTargetVelocity(target * 1000)
+    channel.setTargetPosition(300)
+    channel.setTargetPosition(400)
+    assert channel.pending() == 2
+    release.set()
+    assert channel.flush(timeout=5)
+
+    stats = channel.stats()
+    assert stats['sent'] == 2 and stats['dropped'] == 5 and stats['pending'] == 0
+    assert bus.devices[14].targetPosition == 400
+    assert [data[0] for data in bus.written] == [TIC_SETTARGETVELOCITY_CMD, TIC_SETTARGETPOSITION_CMD]
+    assert int.from_bytes(bus.written[0][1:], 'little') == 5000
+
+def test_barriers_keep_the_order(bus):
+    channel = SetpointChannel(pytic2(bus, 14))
+    release = _hold(bus)
+    channel.setTargetPosition(100)
+    halt = channel.haltAndSetPosition(7)
+    channel.setTargetPosition(200)
+    channel.setTargetPosition(300)
+    position = channel.getCurrentPosition()
+    release.set()
+
+    assert halt.result(timeout=5) is None
+    assert position.result(timeout=5) == 7
+    assert channel.flush(timeout=5)
+    assert [data[0] for data in bus.written[:3]] == [TIC_SETTARGETPOSITION_CMD, TIC_HALTANDSETPOSITION_CMD,
+                                                     TIC_SETTARGETPOSITION_CMD]
+    assert bus.devices[14].targetPosition == 300
+
+def test_waits_are_not_offered(bus):
+    channel = SetpointChannel(pytic2(bus, 14))
+
+    assert not hasattr(channel, 'waitUntilReached')
+    assert not hasattr(channel, 'waitUntilStopped')
+    with pytest.raises(ValueError):
+        channel.call('waitUntilStopped')
+
+def test_errors_are_counted(bus):
+    channel = SetpointChannel(pytic2(bus, 14))
+    bus.devices[14].offline = True
+    channel.setTargetVelocity(1000)
+    future = channel.energize()
+
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    assert channel.flush(timeout=5)
+    assert channel.stats()['errors'] == 2
+    assert isinstance(channel.lastError, OSError)
+
+def test_closed_channel_refuses_commands(bus):
+    with SetpointChannel(pytic2(bus, 14)) as channel:
+        channel.setTargetPosition(50)
+    assert bus.devices[14].targetPosition == 50
+    with pytest.raises(RuntimeError):
+        channel.setTargetPosition(60)
@@ -0,0 +1,48 @@
+from pytic2 import *
+
+def _bus(clock, makeBus):
+    bus = makeBus(commandTimeout=1500)
+    bus.devices[14].settings.update(maxSpeed=3000000, stepMode=2)
+    clock.advance(10.0)
+    return bus
+
+def test_getSettings_reads_the_whole_block(clock, makeBus):
+    bus = _bus(clock, makeBus)
+    tic = pytic2(bus, 14)
+    transactions = bus.transactions
+
+    settings = tic.getSettings()
+
+    assert isinstance(settings, TicSettings)
+    assert settings.maxSpeed == 3000000 and settings.stepMode == 2
+    assert settings.commandTimeout == 1500
+    # The up time, then the settings in one transaction of maximal reads
+    assert bus.transactions - transactions == 2
+
+def test_settings_are_read_once_per_power_cycle(clock, makeBus):
+    bus = _bus(clock, makeBus)
+    first = pytic2(bus, 14).getSettings()
+    transactions = bus.transactions
+
+    # Shared by all objects of the device: only the up time is read
+    assert pytic2(bus, 14).getSettings() is first
+    assert bus.transactions - transactions == 1
+
+    bus.devices[14].settings['maxSpeed'] = 4000000
+    assert pytic2(bus, 14).getSettings(cached=False).maxSpeed == 4000000
+
+def test_restart_invalidates_the_cache(clock, makeBus):
+    bus = _bus(clock, makeBus)
+    tic = pytic2(bus, 14)
+    tic.getSettings()
+    emulator = bus.devices[14]
+    emulator.settings['stepMode'] = 3
+    emulator._bootTime = clock()
+
+    assert tic.getSettings().stepMode == 3
+
+def test_verifySettings(clock, makeBus):
+    tic = pytic2(_bus(clock, makeBus), 14)
+
+    assert tic.verifySettings({'maxSpeed': 3000000, 'stepMode': 2}) == {}
+    assert tic.verifySettings({'maxSpeed': 1000, 'commandTimeout': 1500}) == {'maxSpeed': (1000, 3000000)}
@@ -0,0 +1,75 @@
+import time
+
+from pytic2 import *
+
+def test_unchanged_writes_are_skipped(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14, shadow=True)
+    tic.setMaxSpeed(3000000)
+    transactions = bus.transactions
+
+    tic.setMaxSpeed(3000000)
+    assert tic.getMaxSpeed() == 3000000
+    assert bus.transactions == transactions
+
+    tic.setMaxSpeed(4000000)
+    assert bus.transactions == transactions + 1
+    assert bus.devices[14].values['maxSpeed'] == 4000000
+
+def test_failed_batch_is_not_cached(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14, shadow=True)
+    tic.setMaxSpeed(2000000)
+    batch = BusBatch(bus)
+    batch.device(pytic2(bus, 99)).energize()
+    batch.device(tic).setMaxSpeed(12345)
+
+    try:
+        batch.flush()
+    except OSError:
+        pass
+
+    assert tic.getMaxSpeed() == 2000000
+    batch.device(tic).setMaxSpeed(12345)
+    batch.flush()
+    assert tic._getShadow(TIC_MAXSPEED_VAR) == 12345
+
+def test_values_the_device_limits_are_not_cached(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14, shadow=True)
+
+    tic.setMaxSpeed(600000000)
+    tic.setMaxAccel(10)
+    tic.setStepMode(3)
+
+    assert tic._getShadow(TIC_MAXSPEED_VAR) is None
+    assert tic.getMaxSpeed() == 500000000
+    assert tic.getMaxAcceleration() == 100
+    assert tic._getShadow(TIC_STEPMODE_VAR) is None
+    assert tic.getStepMode() == 3
+    assert tic._getShadow(TIC_STEPMODE_VAR) == 3
+
+def test_device_reset_invalidates_the_cache(makeBus, clock):
+    bus = makeBus()
+    tic = pytic2(bus, 14, shadow=True)
+    clock.advance(1)
+    tic.getUpTime()
+    tic.setMaxSpeed(3000000)
+
+    # Power cycle: the settings return to their defaults and the up time restarts
+    emulator = bus.devices[14]
+    bus.add(TicEmulator(14, clock=clock, commandTimeout=0))
+
+    assert tic.checkDeviceReset()
+    assert tic.getMaxSpeed() == emulator.DEFAULTS['maxSpeed']
+
+def test_entries_expire(makeBus, monkeypatch):
+    bus = makeBus()
+    tic = pytic2(bus, 14, shadow=True, shadowTTL=10)
+    tic.setMaxSpeed(3000000)
+    bus.devices[14].values['maxSpeed'] = 1000
+    assert tic.getMaxSpeed() == 3000000
+
+    now = time.monotonic() + 11
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    assert tic.getMaxSpeed() == 1000
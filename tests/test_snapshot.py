@@ -0,0 +1,39 @@
+import pickle
+
+import pytest
+
+from pytic2 import *
+
+def test_snapshot_matches_the_single_getters(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    tic.haltAndSetPosition(-4321)
+    tic.setMaxSpeed(1234567)
+
+    snapshot = tic.getSnapshot()
+
+    assert snapshot.currentPosition == -4321 == tic.getCurrentPosition()
+    assert snapshot.maxSpeed == 1234567 == tic.getMaxSpeed()
+    assert snapshot.vinVoltage == tic.getVinVoltage()
+    assert snapshot.errorStatus == tic.getErrorStatus()
+
+def test_snapshot_is_one_transaction_of_maximal_reads(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    transactions, messages = bus.transactions, bus.messages
+
+    tic.getSnapshot()
+
+    assert bus.transactions - transactions == 1
+    # 85 bytes in reads of at most 15 bytes: 6 write/read pairs
+    assert bus.messages - messages == 12
+
+def test_snapshot_is_immutable_and_picklable(makeBus):
+    tic = pytic2(makeBus(), 14)
+    snapshot = tic.getSnapshot()
+
+    with pytest.raises(AttributeError):
+        snapshot.currentPosition = 1
+    copy = pickle.loads(pickle.dumps(snapshot))
+    assert copy == snapshot and hash(copy) == hash(snapshot)
+    assert copy.asDict()['currentPosition'] == snapshot.currentPosition
@@ -0,0 +1,69 @@
+import os
+import stat
+import time
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from pytic2 import *
+from pytic2.stateserver import _READ_ATTEMPTS, _SEQUENCE, _SPIN_ATTEMPTS
+
+@pytest.fixture
+def server(makeBus):
+    bus = makeBus((14, 15))
+    tics = [pytic2(bus, 14), pytic2(bus, 15)]
+    tics[0].haltAndSetPosition(1234)
+    with StateServer(tics, rate=200.0) as server:
+        yield server
+
+def test_client_reads_without_bus_traffic(server):
+    bus = server.tics[0]._interface.bus
+    with StateClient(server.name) as client:
+        assert sorted(client.devices()) == [(0, 14), (0, 15)]
+        tic = client.device(14)
+        transactions = bus.transactions
+        server.stop()
+
+        assert tic.getCurrentPosition() == 1234
+        assert tic.getSnapshot().currentPosition == 1234
+        assert bus.transactions == transactions
+
+def test_commands_use_the_published_key(server):
+    assert len(server.authkey) == 32
+    with StateClient(server.name) as client:
+        assert client.authkey == server.authkey
+        client.device(15).setTargetPosition(-50)
+    assert server.tics[1]._interface.bus.devices[15].targetPosition == -50
+
+def test_wrong_key_is_refused(server):
+    with StateClient(server.name, authkey=b'guess') as client:
+        with pytest.raises(AuthenticationError):
+            client.device(14).setTargetPosition(0)
+
+def test_explicit_key_is_not_published(makeBus):
+    tics = [pytic2(makeBus(), 14)]
+    with StateServer(tics, authkey=b'secret') as server:
+        with StateClient(server.name) as client:
+            assert client.authkey is None
+        with StateClient(server.name, authkey=b'secret') as client:
+            client.device(14).haltAndSetPosition(7)
+            assert tics[0].getCurrentPosition() == 7
+
+def test_socket_is_private(server):
+    assert stat.S_IMODE(os.stat(server.address).st_mode) == 0o600
+
+def test_read_backs_off_while_the_slot_is_written(server, monkeypatch):
+    server.stop()
+    with StateClient(server.name) as client:
+        tic = client.device(14)
+        buf = client._shm.buf
+        sequence = _SEQUENCE.unpack_from(buf, tic._offset)[0]
+        # A writer that never finishes
+        _SEQUENCE.pack_into(buf, tic._offset, sequence | 1)
+        sleeps = []
+        monkeypatch.setattr(time, 'sleep', sleeps.append)
+
+        with pytest.raises(TimeoutError):
+            tic.getCurrentPosition()
+        assert len(sleeps) == _READ_ATTEMPTS - _SPIN_ATTEMPTS
+        _SEQUENCE.pack_into(buf, tic._offset, sequence)
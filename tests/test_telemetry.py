@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from pytic2 import *
+
+np = pytest.importorskip('numpy')
+
+def test_samples_go_into_the_ring_buffer(makeBus):
+    bus = makeBus((14, 15))
+    tics = [pytic2(bus, 14), pytic2(bus, 15)]
+    tics[1].haltAndSetPosition(-50)
+    recorder = TelemetryRecorder(tics, ('currentPosition', 'vinVoltage'), capacity=4)
+
+    for _ in range(6):
+        recorder.sample()
+
+    latest = recorder.latest(tics[1])
+    assert latest.shape == (4, 3)
+    assert list(recorder.column('currentPosition', 1)) == [-50] * 4
+    assert list(recorder.column('vinVoltage', 0, n=2)) == [12000, 12000]
+    assert recorder.errors(0) == 0
+
+def test_failing_device_does_not_fail_the_bus(makeBus):
+    bus = makeBus((14, 15))
+    tics = [pytic2(bus, 14), pytic2(bus, 15)]
+    tics[1].haltAndSetPosition(7)
+    bus.devices[14].offline = True
+    recorder = TelemetryRecorder(tics, ('currentPosition',), capacity=4)
+
+    recorder.sample()
+    recorder.sample()
+
+    assert all(math.isnan(value) for value in recorder.column('currentPosition', 0))
+    assert list(recorder.column('currentPosition', 1)) == [7, 7]
+    assert recorder.errors(0) == 2 and recorder.errors(1) == 0
+
+def test_unknown_variable_is_refused(makeBus):
+    with pytest.raises(ValueError):
+        TelemetryRecorder([pytic2(makeBus(), 14)], ('nope',))
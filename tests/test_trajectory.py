@@ -0,0 +1,72 @@
+import pytest
+
+from pytic2 import *
+
+class FailingBus(FakeSMBus):
+    '''FakeSMBus whose transaction number failAt raises an unexpected
+    error.'''
+
+    def __init__(self, failAt, **options):
+        super().__init__(**options)
+        self.failAt = failAt
+
+    def i2c_rdwr(self, *i2c_msgs):
+        if self.transactions == self.failAt:
+            self.transactions += 1
+            raise RuntimeError('unexpected')
+        super().i2c_rdwr(*i2c_msgs)
+
+def test_sampleProfile():
+    assert sampleProfile(lambda t: 1000 * t, 1.0, 4) == [0, 250, 500, 750, 1000]
+
+def test_run_streams_the_profile_and_halts(makeBus):
+    bus = makeBus((14, 15))
+    tics = [pytic2(bus, 14), pytic2(bus, 15)]
+    streamer = TrajectoryStreamer({tics[0]: [1000, 2000, 3000], tics[1]: [-500]}, rate=1000, keepAlive=None)
+    transactions = bus.transactions
+
+    stats = streamer.run()
+
+    # One transaction for both devices per update, then the two halts
+    assert stats['sent'] >= 2 and stats['sent'] % 2 == 0
+    assert bus.transactions - transactions == stats['sent'] // 2 + 2
+    assert stats['errors'] == 0
+    assert [bus.devices[address].targetVelocity for address in (14, 15)] == [0, 0]
+
+def test_failed_updates_are_counted(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    streamer = TrajectoryStreamer({tic: [1000] * 3}, rate=1000, keepAlive=None)
+    bus.devices[14].offline = True
+
+    stats = streamer.run()
+
+    assert stats['sent'] == 0
+    # At least one update and the final halt
+    assert stats['errors'] >= 2
+
+def test_velocity_is_zeroed_when_the_run_raises(clock):
+    bus = FailingBus(None, clock=clock)
+    tics = [pytic2(bus, address) for address in (14, 15)]
+    for tic in tics:
+        bus.add(TicEmulator(tic.address, clock=clock, commandTimeout=0)).errorStatus = 0
+    streamer = TrajectoryStreamer({tic: [1000] * 50 for tic in tics}, rate=1000, keepAlive=None)
+    # The first update goes through, the second raises
+    bus.failAt = bus.transactions + 1
+
+    with pytest.raises(RuntimeError):
+        streamer.run()
+
+    assert [bus.devices[tic.address].targetVelocity for tic in tics] == [0, 0]
+    assert streamer.sent == 2
+
+def test_stop_halts_a_background_run(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    streamer = TrajectoryStreamer({tic: [1000] * 100000}, rate=1000, keepAlive=None)
+
+    streamer.start()
+    streamer.stop()
+
+    assert not streamer._thread.is_alive()
+    assert bus.devices[14].targetVelocity == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from pytic2 import *
+
+np = pytest.importorskip('numpy')
+
+# 200 steps per revolution, 8 microsteps, 5 mm lead: 320 microsteps per mm
+SCREW = AxisProfile(stepsPerRev=200, microsteps=8, unitsPerRev=5.0)
+
+def test_scalar_conversions():
+    assert SCREW.microstepsPerUnit == 320
+    assert SCREW.unitsToPosition(2.5) == 800 and isinstance(SCREW.unitsToPosition(2.5), int)
+    assert SCREW.positionToUnits(800) == 2.5
+    assert SCREW.unitsToSpeed(10.0) == 32000000
+    assert SCREW.speedToUnits(32000000) == 10.0
+    assert SCREW.unitsToAccel(50.0) == 1600000
+    assert SCREW.accelToUnits(1600000) == 50.0
+    assert SCREW.stepTimeToSeconds(3000000) == 1.0
+
+def test_raw_units_are_rounded():
+    assert SCREW.unitsToPosition(0.0049) == 2
+    assert SCREW.unitsToPosition(-0.0049) == -2
+
+def test_current_is_rounded_down():
+    profile = AxisProfile(currentStep=40)
+    assert profile.milliampsToCurrent(1000) == 25
+    assert profile.milliampsToCurrent(1039) == 25
+    assert profile.currentToMilliamps(25) == 1000
+
+def test_arrays_are_converted_at_once():
+    positions = SCREW.unitsToPosition([0.0, 1.0, -2.5])
+    assert positions.dtype == np.int64
+    assert positions.tolist() == [0, 320, -800]
+    assert SCREW.positionToUnits(np.array([320, 640])).tolist() == [1.0, 2.0]
+    assert SCREW.milliampsToCurrent((100, 70)).tolist() == [3, 2]
+
+def test_fromTic_uses_the_step_mode(makeBus):
+    tic = pytic2(makeBus(), 14)
+    tic.setStepMode(4)
+
+    profile = AxisProfile.fromTic(tic, unitsPerRev=360.0)
+
+    assert profile.microsteps == 16
+    assert profile.microstepsPerUnit == pytest.approx(3200 / 360)
+
+def test_setters_take_physical_units(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    emulator = bus.devices[14]
+
+    tic.haltAndSetPosition(1.0, SCREW)
+    tic.setMaxSpeed(10.0, SCREW)
+    tic.setMaxAccel(50.0, SCREW)
+    tic.setTargetPosition(-2.5, SCREW)
+    tic.setCurrentLimit(1000, SCREW)
+
+    assert emulator.position == 320
+    assert emulator.values['maxSpeed'] == 32000000
+    assert emulator.values['maxAcceleration'] == 1600000
+    assert emulator.targetPosition == -800
+    assert emulator.values['currentLimit'] == 31
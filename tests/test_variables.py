@@ -0,0 +1,65 @@
+import ctypes
+import struct
+
+import pytest
+from smbus2.smbus2 import I2C_M_RD
+
+from pytic2 import *
+from pytic2.pytic2 import _getterName
+
+# Every byte of the variable block differs
+PATTERN = bytes((index * 37 + 11) & 0xFF for index in range(TIC_VARIABLES_LENGTH))
+
+class PatternBus():
+    '''Bus answering every get variable read from PATTERN.'''
+
+    def __init__(self):
+        self.transactions = 0
+
+    def i2c_rdwr(self, *i2c_msgs):
+        self.transactions += 1
+        offset = None
+        for msg in i2c_msgs:
+            if msg.flags & I2C_M_RD:
+                ctypes.memmove(msg.buf, PATTERN[offset:offset + msg.len], msg.len)
+            else:
+                command, offset = ctypes.string_at(msg.buf, msg.len)[:2]
+                assert command == TIC_GETVARIABLE_CMD
+
+@pytest.mark.parametrize('variable', TIC_VARIABLES, ids=lambda variable: variable.name)
+def test_getter_decodes_its_variable(variable):
+    bus = PatternBus()
+    tic = pytic2(bus, 14)
+
+    value = getattr(tic, _getterName(variable.name))()
+
+    assert value == struct.unpack_from('<' + variable.format, PATTERN, variable.offset)[0]
+    assert bus.transactions == 1
+
+def test_snapshot_decodes_every_variable():
+    snapshot = pytic2(PatternBus(), 14).getSnapshot()
+
+    for variable in TIC_VARIABLES:
+        assert getattr(snapshot, variable.name) == struct.unpack_from('<' + variable.format, PATTERN,
+                                                                      variable.offset)[0]
+
+def test_variables_do_not_overlap():
+    end = 0
+    for variable in sorted(TIC_VARIABLES, key=lambda variable: variable.offset):
+        assert variable.offset >= end
+        end = variable.offset + struct.calcsize('<' + variable.format)
+    assert end <= TIC_VARIABLES_LENGTH
+
+def test_getters_against_the_emulator(makeBus):
+    bus = makeBus()
+    tic = pytic2(bus, 14)
+    bus.devices[14].errorStatus = TIC_ERROR_SAFE_START_VIOLATION
+    tic.setDecayMode(2)
+
+    # The error status, not the misc flags next to it
+    assert tic.getErrorStatus() == TIC_ERROR_SAFE_START_VIOLATION
+    assert tic.getDecayMode() == tic.getDecayMOde() == 2
+
+def test_getters_are_documented():
+    assert 'units: microsteps' in pytic2.getCurrentPosition.__doc__
+    assert pytic2.getCurrentPosition.__name__ == 'getCurrentPosition'
@@ -0,0 +1,75 @@
+
+import time
+
+import pytest
+
+from pytic2 import *
+
+@pytest.fixture
+def sleeps(clock, monkeypatch):
+    '''Replaces the sleeps of the waits with advances of the virtual clock
+    and records them.'''
+
+    recorded = []
+
+    def sleep(seconds):
+        recorded.append(seconds)
+        clock.advance(seconds)
+
+    monkeypatch.setattr(time, 'sleep', sleep)
+    return recorded
+
+@pytest.fixture
+def tic(makeBus):
+    tic = pytic2(makeBus(), 14)
+    tic.haltAndSetPosition(0)
+    tic.exitSafeStart()
+    return tic
+
+def test_waitUntilReached_sleeps_through_the_move(tic, sleeps):
+    tic.setTargetPosition(3000)
+    duration = moveTime(3000, tic.getMaxSpeed(), tic.getMaxAcceleration(), tic.getMaxDeceleration())
+
+    polls = tic.waitUntilReached()
+
+    assert tic.getCurrentPosition() == 3000
+    # Most of the move is slept through at once, then a few short polls
+    assert sleeps[0] >= 0.85 * duration
+    assert sum(sleeps) == pytest.approx(duration, abs=0.05)
+    assert polls == len(sleeps) + 1 and polls <= 12
+
+def test_waitUntilReached_returns_at_once_when_there(tic, sleeps):
+    assert tic.waitUntilReached(0) == 1
+    assert sleeps == []
+
+def test_waitUntilStopped_in_velocity_mode(tic, sleeps):
+    tic.setTargetVelocity(1000000)
+    tic._interface.bus.devices[14].update()
+    tic.setTargetVelocity(0)
+
+    tic.waitUntilStopped()
+
+    assert tic.getCurrentVelocity() == 0
+    assert len(sleeps) <= 12
+
+def test_error_aborts_the_wait(tic, sleeps):
+    tic.setTargetPosition(3000)
+    tic._interface.bus.devices[14].errorStatus = TIC_ERROR_SAFE_START_VIOLATION
+
+    with pytest.raises(TicError) as info:
+        tic.waitUntilReached()
+    assert info.value.errorStatus == TIC_ERROR_SAFE_START_VIOLATION
+    assert info.value.address == 14
+
+def test_timeout(tic, sleeps):
+    tic.setTargetVelocity(1000000)
+
+    with pytest.raises(TimeoutError):
+        tic.waitUntilStopped(timeout=0)
+
+def test_wait_for_another_target_times_out(tic, sleeps):
+    tic.setTargetPosition(3000)
+
+    with pytest.raises(TimeoutError):
+        tic.waitUntilReached(5000, timeout=0.001)
+    assert tic._interface.bus.devices[14].targetPosition == 3000